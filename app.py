@@ -1,30 +1,71 @@
-from flask import Flask, jsonify, request, Response, send_from_directory
-import pandas as pd
-from flask_cors import CORS
+from flask import Flask, g, has_request_context, jsonify, request, Response, send_from_directory
 import json
 import os
 import logging
 from logging.handlers import RotatingFileHandler
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import webbrowser
 import threading
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 
 # Simple heuristic classifier utilities (baseline)
 import numpy as np
-import joblib
+import pandas as pd
+
+from model.utils import extract_features_batch
+from src.modeling.inference import InferenceEngine
+from src.pipeline.aggregates import AggregateStore, aggregate_path, border_rows, compute_aggregates, sort_groups, valid_columns
+from src.pipeline.fusion import FusionEngine, FusionSource
+from src.pipeline.grid import GRID_CELLS_PER_DEGREE, grid_indices, time_buckets
+from src.pipeline.store import HotspotStore, decimal_coords, file_version
+from src.serving.cache import ResultCache
+from src.serving.changes import Change, ChangeFeed
+from src.serving.geojson import gzip_chunks, iter_feature_collection
+from src.serving.logtail import LogFilter, read_after, tail
+from src.serving.metrics import PROMETHEUS_MIMETYPE, MetricsRegistry, SamplingProfiler, current_trace, detach_trace, start_trace
+from src.serving.packed import PACKED_MIMETYPE, pack_hotspots
+from src.serving.tiles import POINTS_MIN_ZOOM, bin_incidents, tile_bounds, valid_tile
+
+def _with_cors(app: Flask) -> Flask:
+    """Let the dashboard call the API from another origin (e.g. index.html opened from disk)."""
+    from flask_cors import CORS  # imported where the app is built, not with the module
+    CORS(app)
+    return app
 
-app = Flask(__name__)
-CORS(app)
+app = _with_cors(Flask(__name__))
 
 API_LOG_FILE = "api.log"
 FETCHER_LOG_FILE = "fetcher.log"
 LOG_LINES = 200
+LOG_FILES = {"api": API_LOG_FILE, "fetcher": FETCHER_LOG_FILE}
 
 MODEL_FILES = {
     "viirs": "hotspots_viirs.csv",
     "modis": "hotspots_modis.csv"
 }
+# Serve from the fetcher's partitioned storage (INGEST_MODE=incremental) instead of the CSVs
+HOTSPOT_STORAGE_DIR = os.getenv("HOTSPOT_STORAGE_DIR")
+if HOTSPOT_STORAGE_DIR:
+    MODEL_FILES = {model: os.path.join(HOTSPOT_STORAGE_DIR, model) for model in MODEL_FILES}
+# Or from the fetcher's long-history archive (ARCHIVE_DIR); its columns are memory-mapped, not read,
+# and only the last HOTSPOT_ARCHIVE_DAYS days of it are served
+HOTSPOT_ARCHIVE_DIR = os.getenv("HOTSPOT_ARCHIVE_DIR")
+HOTSPOT_ARCHIVE_DAYS = float(os.getenv("HOTSPOT_ARCHIVE_DAYS", "30"))
+if HOTSPOT_ARCHIVE_DIR:
+    MODEL_FILES = {model: os.path.join(HOTSPOT_ARCHIVE_DIR, model) for model in MODEL_FILES}
+# Regions as the fetcher defines them: BBOX plus EXTRA_BBOXES ("name=lon_min,lat_min,lon_max,lat_max;...").
+# Each extra area's detections are in their own {model}_{area} files, read by /predict/fused
+DEFAULT_REGION = "default"
+REGIONS = {DEFAULT_REGION: tuple(float(v) for v in os.getenv("BBOX", "34.2,31.2,34.65,31.6").split(","))}
+for spec in filter(None, (a.strip() for a in os.getenv("EXTRA_BBOXES", "").split(";"))):
+    area_name, _, area_bbox = spec.partition("=")
+    REGIONS[area_name.strip()] = tuple(float(v) for v in area_bbox.split(","))
+AREA_FILES = {
+    f"{model}_{area}": os.path.join(HOTSPOT_ARCHIVE_DIR or HOTSPOT_STORAGE_DIR, f"{model}_{area}")
+    if HOTSPOT_ARCHIVE_DIR or HOTSPOT_STORAGE_DIR else f"hotspots_{model}_{area}.csv"
+    for area in REGIONS if area != DEFAULT_REGION for model in MODEL_FILES
+}
 
 def setup_logger() -> logging.Logger:
     """Set up a rotating logger for API events."""
@@ -43,50 +84,131 @@ def setup_logger() -> logging.Logger:
     return logger
 
 logger = setup_logger()
-MODEL_OBJ = None
+HOTSPOT_STORE = HotspotStore({**MODEL_FILES, **AREA_FILES}, archive_days=HOTSPOT_ARCHIVE_DAYS if HOTSPOT_ARCHIVE_DAYS > 0 else None)
+PREDICT_CACHE = ResultCache(
+    max_bytes=int(os.getenv("PREDICT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("PREDICT_CACHE_TTL_SECONDS", "600")),
+)
+# Per (cell, bucket) aggregates the fetcher materializes after each ingest (AGGREGATE_WINDOWS)
+AGGREGATES = AggregateStore(os.getenv("AGGREGATES_DIR", os.path.join("data", "aggregates")))
+TILE_CACHE = ResultCache(
+    max_bytes=int(os.getenv("TILE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("PREDICT_CACHE_TTL_SECONDS", "600")),
+)
+# Cross-sensor, multi-region /predict/fused: detections of different sources this close are merged
+FUSION = FusionEngine(
+    match_km=float(os.getenv("FUSION_MATCH_KM", "1.0")),
+    match_minutes=float(os.getenv("FUSION_MATCH_MINUTES", "20")),
+    max_workers=int(os.getenv("FUSION_WORKERS", "4")),
+)
+# Change feed behind /changes and /changes/stream; sources and fetch status are polled once per process.
+# Gunicorn workers that serve the master's snapshots turn polling off: the master records each change
+# in warm_up() before re-forking, so every worker inherits the same feed and accepts the same cursors
+CHANGE_FEED_MAX_CHANGES = int(os.getenv("CHANGE_FEED_MAX_CHANGES", "256"))
+CHANGE_FEED = ChangeFeed(max_changes=CHANGE_FEED_MAX_CHANGES)
+CHANGE_POLLING = True
+CHANGE_POLL_SECONDS = float(os.getenv("CHANGE_POLL_SECONDS", "5"))
+SSE_KEEPALIVE_SECONDS = 15.0
+# Each open /changes/stream holds a server thread (gunicorn gthread: WEB_THREADS per worker); beyond
+# this many per process the stream is refused with 503 so other requests keep threads to run on
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "4"))
+_STREAM_SLOTS = threading.BoundedSemaphore(max(SSE_MAX_STREAMS, 1))
 MODEL_PATH = os.getenv("MODEL_PATH", os.path.join("model", "model_rf.pkl"))
-if os.path.exists(MODEL_PATH):
-    try:
-        MODEL_OBJ = joblib.load(MODEL_PATH)
-        logger.info(f"Loaded ML model from {MODEL_PATH}")
-    except Exception as e:
-        logger.error(f"Failed to load ML model at {MODEL_PATH}: {e}")
+# Loaded by warm_up() (a background thread at startup, so importing the app stays fast) or by the first
+# request that classifies, whichever comes first; swapped in place when the artifact changes on disk
+INFERENCE = InferenceEngine(
+    MODEL_PATH,
+    max_batch=int(os.getenv("MODEL_MAX_BATCH", "8192")),
+    n_jobs=int(os.environ["MODEL_N_JOBS"]) if os.getenv("MODEL_N_JOBS") else None,
+    logger=logger,
+)
+# Set by warm_up() once sources, aggregate tables and the model are loaded; /ready answers 503 until then
+READY = threading.Event()
+# Cleared while warm_up() runs: a process forked then would inherit store locks held by the loading
+# thread and never see them released, so the gunicorn master waits for this before forking
+WARMUP_IDLE = threading.Event()
+WARMUP_IDLE.set()
+WARMUP: Dict[str, Any] = {}
+WARMUP_WINDOWS = [int(w) for w in os.getenv("AGGREGATE_WINDOWS", "180").split(",") if w.strip()]
+# Request and stage latency histograms and row/byte counters behind /metrics (per process)
+METRICS = MetricsRegistry(prefix="api_")
+METRICS.describe("request_seconds", "histogram", "Request latency until the response body is fully sent, by endpoint.")
+METRICS.describe("requests_total", "counter", "Requests served, by endpoint and status.")
+METRICS.describe("stage_seconds", "histogram", "Time per request stage (load, filter, group, infer, serialize, compress), by endpoint.")
+METRICS.describe("rows_total", "counter", "Detections selected (filter) and incidents produced (group), by endpoint.")
+METRICS.describe("response_bytes_total", "counter", "Response body bytes sent, by endpoint.")
+METRICS.describe("inference_rows_total", "counter", "Incidents classified, by path (model, or the no_model/error heuristic fallbacks).")
+METRICS.describe("cache_hits_total", "counter", "Response cache hits, by cache.")
+METRICS.describe("cache_misses_total", "counter", "Response cache misses, by cache.")
+METRICS.describe("cache_bytes", "gauge", "Response cache size in bytes, by cache.")
+METRICS.describe("source_rows", "gauge", "Detections in the loaded snapshot, by source.")
+METRICS.describe("source_load_seconds", "gauge", "Parse time of the loaded snapshot, by source.")
+METRICS.describe("ready", "gauge", "1 once warm_up() has finished.")
+FETCHER_METRICS_FILE = os.getenv("FETCHER_METRICS_FILE", "fetcher_metrics.prom")
+UNTRACED_ENDPOINTS = {"metrics", "changes_stream"}
+# Requests slower than this are logged with their stage breakdown; with PROFILE_SLOW_REQUESTS their
+# sampled stacks are also written to PROFILE_DIR (sampling runs during every request while enabled)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILER = (
+    SamplingProfiler(interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000)
+    if os.getenv("PROFILE_SLOW_REQUESTS", "false").lower() in {"1", "true", "yes", "on"} else None
+)
 
 @app.route("/hotspots")
 def hotspots():
-    """Serve fire hotspots as GeoJSON for the requested model."""
+    """Serve fire hotspots as GeoJSON (or the packed columnar format) for the requested model.
+    Optional ``bbox`` (lon_min,lat_min,lon_max,lat_max) and ``from``/``to`` (ISO, inclusive) filters.
+    """
     model = request.args.get("model", "viirs").lower()
-    csv_file = MODEL_FILES.get(model, MODEL_FILES["viirs"])
+    if model not in MODEL_FILES:
+        model = "viirs"
     try:
-        df = pd.read_csv(csv_file, comment="#")
+        with METRICS.span("load"):
+            snapshot = HOTSPOT_STORE.get(model)
     except Exception as e:
-        logger.error(f"Failed to read {csv_file}: {e}")
+        logger.error(f"Failed to read {MODEL_FILES[model]}: {e}")
         return jsonify({"error": f"Could not read data for model {model}"}), 500
-    features = []
-    for _, row in df.iterrows():
-        # Use correct brightness column for each model
-        if model == "viirs":
-            brightness = getattr(row, "bright_ti4", None)
-        else:  # modis
-            brightness = getattr(row, "brightness", None)
-        features.append({
-            "type": "Feature",
-            "geometry": {
-                "type": "Point",
-                "coordinates": [row.longitude, row.latitude]
-            },
-            "properties": {
-                "acq_date": row.acq_date,
-                "acq_time": row.acq_time,
-                "brightness": brightness,
-                "frp": getattr(row, "frp", None),
-                "confidence": getattr(row, "confidence", None),
-                "daynight": getattr(row, "daynight", None),
-                "wind_direction": getattr(row, "wind_direction", None)
-            }
-        })
-    logger.info(f"Served {len(features)} features for model {model}")
-    return jsonify({"type": "FeatureCollection", "features": features})
+    df = snapshot.df
+    # Optional viewport/time filter, answered from the store's index
+    bbox = _parse_bbox(request.args.get("bbox"))
+    start = _parse_iso(request.args.get("from"))
+    end = _parse_iso(request.args.get("to"))
+    if bbox is not None or start is not None or end is not None:
+        with METRICS.span("filter"):
+            rows = snapshot.index.query(
+                bbox,
+                np.datetime64(start, "ns") if start is not None else None,
+                np.datetime64(end, "ns") + np.timedelta64(1, "ns") if end is not None else None,
+            )
+            df = df.iloc[rows]
+    _count_rows("filter", len(df))
+    # Use correct brightness column for each model
+    brightness_col = "bright_ti4" if model == "viirs" else "brightness"
+    if _wants_packed():
+        logger.info(f"Served {len(df)} packed hotspots for model {model}")
+        with METRICS.span("serialize"):
+            body = pack_hotspots(df, brightness_col, {"model": model})
+        return _stream_response([body], PACKED_MIMETYPE)
+    chunks = iter_feature_collection(decimal_coords(df["longitude"]), decimal_coords(df["latitude"]), _hotspot_properties(df, brightness_col))
+    chunks = METRICS.timed_chunks(chunks, "serialize")
+    logger.info(f"Served {len(df)} features for model {model}")
+    return _stream_response(chunks)
+
+def _hotspot_properties(df: Any, brightness_col: str) -> Dict[str, Any]:
+    """Per-detection GeoJSON property columns served by /hotspots."""
+    return {
+        key: df[col] if col in df.columns else None
+        for key, col in [
+            ("acq_date", "acq_date"),
+            ("acq_time", "acq_time"),
+            ("brightness", brightness_col),
+            ("frp", "frp"),
+            ("confidence", "confidence"),
+            ("daynight", "daynight"),
+            ("wind_direction", "wind_direction"),
+        ]
+    }
 
 def parse_timestamp(acq_date: str, acq_time: str) -> datetime:
     try:
@@ -94,157 +216,493 @@ def parse_timestamp(acq_date: str, acq_time: str) -> datetime:
     except Exception:
         return None
 
+def classify_features(X: np.ndarray, no_signal: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Classify a batch of feature rows; returns (event_type labels, unrounded confidences).
+
+    Rows follow ``model.utils.FEATURE_KEYS`` order; ``no_signal`` flags rows without any finite FRP. The
+    inference engine uses the loaded model in capped batches, otherwise (or on failure) the heuristic.
+    A request whose rows fell back to the heuristic although a model artifact exists is not cached.
+    """
+    with METRICS.span("infer"):
+        labels, conf = INFERENCE.classify(X, no_signal)
+    if has_request_context() and INFERENCE.last_fallback() is not None:
+        g.uncacheable = True
+    return labels, conf
+
 def classify_sequence(frps: List[float], times: List[datetime]) -> Dict[str, float]:
-    # If a trained model is present, use features to predict
-    if MODEL_OBJ is not None and frps:
-        frps_arr = np.array(frps, dtype=float)
-        frps_arr[~np.isfinite(frps_arr)] = 0.0
-        max_frp = float(frps_arr.max()) if frps_arr.size else 0.0
-        mean_frp = float(frps_arr.mean()) if frps_arr.size else 0.0
-        std_frp = float(frps_arr.std()) if frps_arr.size else 0.0
-        if frps_arr.size >= 3:
-            peak_idx = int(frps_arr.argmax())
-            left = frps_arr[peak_idx] - frps_arr[max(0, peak_idx-1)]
-            right_drop = frps_arr[peak_idx] - frps_arr[min(len(frps_arr)-1, peak_idx+1)]
-        else:
-            left = 0.0
-            right_drop = 0.0
-        duration_high = float((frps_arr > 0.25 * max_frp).mean()) if max_frp > 0 else 0.0
-        count_obs = float(len(frps_arr))
-        X = np.array([[max_frp, mean_frp, std_frp, left, right_drop, duration_high, count_obs]])
-        try:
-            proba = MODEL_OBJ.predict_proba(X)[0]
-            # Assume label order ['explosion','fire'] if available else argmax
-            if hasattr(MODEL_OBJ, 'classes_') and 'explosion' in MODEL_OBJ.classes_:
-                idx = list(MODEL_OBJ.classes_).index('explosion')
-                conf_explosion = float(proba[idx])
-                if conf_explosion >= 0.5:
-                    return {"event_type": "explosion", "confidence": round(conf_explosion, 2)}
-                else:
-                    conf_fire = float(max(proba))
-                    return {"event_type": "fire", "confidence": round(conf_fire, 2)}
-            # Fallback if classes unknown
-            label_idx = int(np.argmax(proba))
-            label = str(MODEL_OBJ.classes_[label_idx]) if hasattr(MODEL_OBJ, 'classes_') else ('explosion' if label_idx == 0 else 'fire')
-            return {"event_type": label, "confidence": round(float(max(proba)), 2)}
-        except Exception:
-            pass
-
-    # Baseline heuristic: explosions are sharp spikes with quick decay within ~1-3 timesteps
-    if not frps:
-        return {"event_type": "unknown", "confidence": 0.0}
+    """Classify a single time-ordered FRP sequence (see ``classify_features``)."""
     frps_arr = np.array(frps, dtype=float)
-    if np.all(~np.isfinite(frps_arr)):
-        return {"event_type": "unknown", "confidence": 0.0}
-    frps_arr[~np.isfinite(frps_arr)] = 0.0
-    max_frp = float(frps_arr.max())
-    if len(frps_arr) >= 3:
-        peak_idx = int(frps_arr.argmax())
-        left = frps_arr[peak_idx] - frps_arr[max(0, peak_idx-1)]
-        right_drop = frps_arr[peak_idx] - frps_arr[min(len(frps_arr)-1, peak_idx+1)]
-        sharp_rise = left > 0.6 * max_frp
-        sharp_decay = right_drop > 0.6 * max_frp
-        if sharp_rise and sharp_decay:
-            conf = min(0.99, 0.5 + (max_frp / (max_frp + 25.0)))
-            return {"event_type": "explosion", "confidence": round(conf, 2)}
-    # Otherwise treat as fire if persistent signal
-    persistence = float(np.mean(frps_arr > 0.25 * max_frp))
-    if persistence > 0.5:
-        conf = min(0.95, 0.4 + 0.5 * persistence)
-        return {"event_type": "fire", "confidence": round(conf, 2)}
-    return {"event_type": "unknown", "confidence": 0.3}
+    X = extract_features_batch(frps_arr, np.array([0, frps_arr.size]))
+    labels, conf = classify_features(X, np.array([not np.isfinite(frps_arr).any()]))
+    return {"event_type": str(labels[0]), "confidence": round(float(conf[0]), 2)}
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO timestamp to naive UTC (the store's timestamp convention); None if invalid."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def _parse_bbox(value: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """Parse ``lon_min,lat_min,lon_max,lat_max``; None if absent or malformed."""
+    if not value:
+        return None
+    try:
+        lon_min, lat_min, lon_max, lat_max = [float(x) for x in value.split(",")]
+    except ValueError:
+        return None
+    return lon_min, lat_min, lon_max, lat_max
+
+def _parse_window_minutes(value: Optional[str]) -> Optional[int]:
+    """Parse the aggregation window in minutes (default 180); None unless a positive integer."""
+    if value is None:
+        return 180
+    try:
+        minutes = int(value)
+    except ValueError:
+        return None
+    return minutes if minutes > 0 else None
+
+def _snapped_time_range(from_iso: Optional[str], to_iso: Optional[str], window_minutes: int) -> Tuple[Optional[np.datetime64], Optional[np.datetime64]]:
+    """Widen [from, to] to whole time buckets; returns (inclusive start, exclusive end)."""
+    start = _parse_iso(from_iso)
+    end = _parse_iso(to_iso)
+    step = np.timedelta64(int(window_minutes), "m")
+    lo = time_buckets(np.array([start], dtype="datetime64[ns]"), window_minutes)[0] if start is not None else None
+    hi = time_buckets(np.array([end], dtype="datetime64[ns]"), window_minutes)[0] + step if end is not None else None
+    return lo, hi
+
+def _stream_response(chunks: Iterable[bytes], mimetype: Optional[str] = None) -> Response:
+    """Stream response chunks (GeoJSON by default), gzip-compressed when the client accepts it."""
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        chunks = METRICS.timed_chunks(gzip_chunks(chunks), "compress")
+        headers["Content-Encoding"] = "gzip"
+    trace = current_trace()
+    if trace is not None:
+        chunks = _metered(chunks, trace)
+    return Response(chunks, mimetype=mimetype or app.json.mimetype, headers=headers)
+
+def _metered(chunks: Iterable[bytes], trace: Any) -> Iterator[bytes]:
+    """Pass chunks through, adding their size to the request trace."""
+    for piece in chunks:
+        trace.bytes += len(piece)
+        yield piece
+
+def _count_rows(stage: str, n: int) -> None:
+    METRICS.inc("rows_total", n, stage=stage, endpoint=request.endpoint)
+
+def _wants_packed() -> bool:
+    """True if the client asked for the packed columnar encoding (``format=packed`` or Accept)."""
+    if request.args.get("format", "").lower() == "packed":
+        return True
+    return PACKED_MIMETYPE in request.headers.get("Accept", "")
+
+def _predict_columns(snapshot: Any, model: str, window_minutes: int, time_from: Optional[np.datetime64],
+                     time_to: Optional[np.datetime64], bbox: Optional[Tuple[float, float, float, float]]) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """Compute /predict incidents for one source and normalized query as (lon, lat, property columns)."""
+    df, index = snapshot.df, snapshot.index
+    if df.empty:
+        return np.zeros(0), np.zeros(0), {}
+    # Choose brightness column
+    brightness_col = "bright_ti4" if model == "viirs" else "brightness"
+
+    # Groups materialized by the fetcher for this exact data version only need classifying;
+    # cells cut by the bbox edge are still grouped from their raw rows
+    table = AGGREGATES.get(model, window_minutes, snapshot.version)
+    if table is not None:
+        if bbox is None:
+            with METRICS.span("filter"):
+                rows = table.index.query(None, time_from, time_to)
+                columns, X = {k: v[rows] for k, v in table.columns.items()}, table.features[rows]
+        else:
+            with METRICS.span("filter"):
+                rows = table.interior(bbox, time_from, time_to)
+                edge = df.iloc[border_rows(index, bbox, time_from, time_to)]
+            _count_rows("filter", len(edge))
+            with METRICS.span("group"):
+                edge_columns, edge_X = compute_aggregates(*valid_columns(edge, brightness_col), window_minutes)
+                columns = {k: np.concatenate([v[rows], edge_columns[k]]) for k, v in table.columns.items()}
+                columns, X = sort_groups(columns, np.vstack([table.features[rows], edge_X]))
+        _count_rows("group", X.shape[0])
+        return _incident_columns(model, columns, X, table.has_frp, table.has_brightness)
+
+    # Time and BBOX filters come from the store's index; timestamps are parsed once on load
+    with METRICS.span("filter"):
+        rows = index.query(bbox, time_from, time_to)
+        selected = df.iloc[rows]
+    _count_rows("filter", len(selected))
+    # Approx 1km grid cells and time buckets, grouped in a single sort
+    with METRICS.span("group"):
+        columns, X = compute_aggregates(*valid_columns(selected, brightness_col), window_minutes)
+    _count_rows("group", X.shape[0])
+    return _incident_columns(model, columns, X, "frp" in df.columns, brightness_col in df.columns)
+
+def _incident_columns(model: str, columns: Dict[str, np.ndarray], X: np.ndarray, has_frp: bool,
+                      has_brightness: bool) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """Classify per (cell, bucket) aggregates and lay them out as /predict (lon, lat, property columns)."""
+    if X.shape[0] == 0:
+        return np.zeros(0), np.zeros(0), {}
+    labels, conf = classify_features(X, columns["no_signal"])
+    properties = {
+        "acq_start": np.char.add(np.datetime_as_string(columns["acq_start"], unit="s"), "Z"),
+        "acq_end": np.char.add(np.datetime_as_string(columns["acq_end"], unit="s"), "Z"),
+        "event_type": labels,
+        "confidence": np.array([round(c, 2) for c in conf.tolist()]),
+        "model": model,
+        "max_frp": np.ma.masked_invalid(columns["max_frp"]) if has_frp else None,
+        "max_brightness": np.ma.masked_invalid(columns["max_brightness"]) if has_brightness else None,
+        "count": columns["count"],
+    }
+    cpd = float(GRID_CELLS_PER_DEGREE)
+    return columns["lon_idx"] / cpd, columns["lat_idx"] / cpd, properties
+
+def _cache_chunks(chunks: Iterable[bytes], namespace: str, params: Any, version: Any) -> Iterator[bytes]:
+    """Pass chunks through, storing the full body in the /predict cache once complete.
+    ``version`` is the namespace version the body was computed from; the body is not stored if it changed meanwhile.
+    """
+    parts: List[bytes] = []
+    size = 0
+    for piece in chunks:
+        if size <= PREDICT_CACHE.max_bytes:
+            parts.append(piece)
+            size += len(piece)
+        yield piece
+    if size <= PREDICT_CACHE.max_bytes:
+        PREDICT_CACHE.put(namespace, params, b"".join(parts), version)
 
 @app.route("/predict")
 def predict():
     """Return classified incidents aggregated by approximate 1km grid and time window.
     Query params:
       - model: viirs|modis (default viirs)
-      - from, to: ISO timestamps (optional)
+      - from, to: ISO timestamps (optional; widened to whole time buckets)
       - bbox: lon_min,lat_min,lon_max,lat_max (optional, filters points)
       - window_minutes: aggregation window (default 180)
+    Responses are cached per (data version, model version, normalized query).
     """
     model = request.args.get("model", "viirs").lower()
-    csv_file = MODEL_FILES.get(model, MODEL_FILES["viirs"])
+    if model not in MODEL_FILES:
+        model = "viirs"
     try:
-        df = pd.read_csv(csv_file, comment="#")
+        with METRICS.span("load"):
+            snapshot = HOTSPOT_STORE.get(model)
     except Exception as e:
-        logger.error(f"Failed to read {csv_file}: {e}")
+        logger.error(f"Failed to read {MODEL_FILES[model]}: {e}")
         return jsonify({"error": f"Could not read data for model {model}"}), 500
 
-    if df.empty:
-        return jsonify({"type": "FeatureCollection", "features": []})
+    window_minutes = _parse_window_minutes(request.args.get("window_minutes"))
+    if window_minutes is None:
+        return jsonify({"error": "window_minutes must be a positive integer"}), 400
+    time_from, time_to = _snapped_time_range(request.args.get("from"), request.args.get("to"), window_minutes)
+    bbox = _parse_bbox(request.args.get("bbox"))
 
-    # Parse timestamps
-    df["timestamp"] = df.apply(lambda r: parse_timestamp(str(r.get("acq_date")), str(r.get("acq_time"))), axis=1)
-    df = df[df["timestamp"].notna()].copy()
+    namespace = f"predict:{model}"
+    params = (window_minutes, time_from, time_to, bbox)
+    INFERENCE.maybe_reload()
+    version = (snapshot.version, INFERENCE.version)
+    PREDICT_CACHE.set_version(namespace, version)
+    body = PREDICT_CACHE.get(namespace, params)
+    if body is not None:
+        logger.info(f"/predict served cached incidents for model {model}")
+        return _stream_response([body])
 
-    # Time filter
-    from_iso = request.args.get("from")
-    to_iso = request.args.get("to")
-    if from_iso:
-        try:
-            df = df[df["timestamp"] >= datetime.fromisoformat(from_iso.replace("Z", "+00:00"))]
-        except Exception:
-            pass
-    if to_iso:
-        try:
-            df = df[df["timestamp"] <= datetime.fromisoformat(to_iso.replace("Z", "+00:00"))]
-        except Exception:
-            pass
+    lon, lat, properties = _predict_columns(snapshot, model, window_minutes, time_from, time_to, bbox)
+    chunks = METRICS.timed_chunks(iter_feature_collection(lon, lat, properties), "serialize")
+    if not g.get("uncacheable"):
+        chunks = _cache_chunks(chunks, namespace, params, version)
+    logger.info(f"/predict served {len(lon)} incidents for model {model}")
+    return _stream_response(chunks)
+
+def _fusion_sources(models: List[str]) -> List[FusionSource]:
+    """Every loadable dataset of ``models`` (default area first, then the extra areas), in ``models`` order."""
+    sources = []
+    for model in models:
+        brightness_col = "bright_ti4" if model == "viirs" else "brightness"
+        for name in [model] + [n for n in AREA_FILES if n.startswith(f"{model}_")]:
+            try:
+                with METRICS.span("load"):
+                    snapshot = HOTSPOT_STORE.get(name)
+            except Exception as e:
+                if name == model:
+                    logger.error(f"Failed to read {MODEL_FILES[model]}: {e}")
+                continue
+            sources.append(FusionSource(name=name, sensor=model, snapshot=snapshot, brightness_col=brightness_col))
+    return sources
+
+@app.route("/predict/fused")
+def predict_fused():
+    """Classified incidents of several sources and regions in one pass, as one GeoJSON FeatureCollection.
+    Query params:
+      - sources: comma-separated models, finest first (default viirs,modis); detections of a later source
+        near-coincident with an earlier one's (FUSION_MATCH_KM, FUSION_MATCH_MINUTES) are merged into it
+      - regions: comma-separated configured region names (default all: BBOX and EXTRA_BBOXES), or
+      - bbox: lon_min,lat_min,lon_max,lat_max (one ad-hoc region named "bbox")
+      - from, to, window_minutes: as /predict
+    Incidents are partitioned by region (``region`` property, in request order); ``model`` lists the
+    sources that saw each one (e.g. "viirs+modis"). Responses are cached like /predict.
+    """
+    models = [m for m in dict.fromkeys(m.strip().lower() for m in request.args.get("sources", ",".join(MODEL_FILES)).split(",")) if m in MODEL_FILES]
+    if not models:
+        return jsonify({"error": f"sources must be among {', '.join(MODEL_FILES)}"}), 400
+    bbox = _parse_bbox(request.args.get("bbox"))
+    if bbox is not None:
+        regions = {"bbox": bbox}
+    else:
+        names = [r.strip() for r in request.args.get("regions", ",".join(REGIONS)).split(",") if r.strip()]
+        unknown = [r for r in names if r not in REGIONS]
+        if unknown or not names:
+            return jsonify({"error": f"Unknown region(s) {', '.join(unknown)}; configured: {', '.join(REGIONS)}"}), 400
+        regions = {r: REGIONS[r] for r in dict.fromkeys(names)}
+    sources = _fusion_sources(models)
+    if not sources:
+        return jsonify({"error": f"Could not read data for {', '.join(models)}"}), 500
+
+    window_minutes = _parse_window_minutes(request.args.get("window_minutes"))
+    if window_minutes is None:
+        return jsonify({"error": "window_minutes must be a positive integer"}), 400
+    time_from, time_to = _snapped_time_range(request.args.get("from"), request.args.get("to"), window_minutes)
+    namespace = "predict:fused"
+    params = (tuple(s.name for s in sources), tuple(regions.items()), window_minutes, time_from, time_to)
+    INFERENCE.maybe_reload()
+    version = (tuple(s.snapshot.version for s in sources), INFERENCE.version)
+    PREDICT_CACHE.set_version(namespace, version)
+    body = PREDICT_CACHE.get(namespace, params)
+    if body is not None:
+        logger.info(f"/predict/fused served cached incidents for {'+'.join(models)}")
+        return _stream_response([body])
+
+    result = FUSION.query(sources, regions, window_minutes, time_from, time_to)
+    trace = current_trace()
+    for stage, seconds in (("filter", result.seconds["select"]), ("fuse", result.seconds["fuse"]), ("group", result.seconds["group"])):
+        METRICS.record_stage(stage, seconds, trace)
+    _count_rows("filter", result.rows)
+    parts = result.partitions
+    columns = {k: np.concatenate([p.columns[k] for p in parts]) for k in parts[0].columns}
+    X = np.vstack([p.features for p in parts])
+    _count_rows("group", X.shape[0])
+    # All regions are classified in one batch; a sensor without FRP or brightness leaves its groups null
+    has_frp = any("frp" in s.snapshot.df.columns for s in sources)
+    has_brightness = any(s.brightness_col in s.snapshot.df.columns for s in sources)
+    lon, lat, properties = _incident_columns("fused", columns, X, has_frp, has_brightness)
+    if len(lon):
+        properties["model"] = result.source_labels(columns["sources"])
+        properties["region"] = np.repeat(np.array([p.name for p in parts], dtype=object), [p.features.shape[0] for p in parts])
+    chunks = METRICS.timed_chunks(iter_feature_collection(lon, lat, properties), "serialize")
+    if not g.get("uncacheable"):
+        chunks = _cache_chunks(chunks, namespace, params, version)
+    logger.info(
+        f"/predict/fused served {len(lon)} incidents for {'+'.join(models)} in {len(regions)} region(s) "
+        f"from {result.rows} detections ({result.duplicates} repeated, {result.matched} merged across sources)"
+    )
+    return _stream_response(chunks)
 
-    # BBOX filter if provided
-    bbox = request.args.get("bbox")
-    if bbox:
+@app.route("/tiles/<int:z>/<int:x>/<int:y>")
+def tiles(z: int, x: int, y: int):
+    """Serve web-mercator tile z/x/y as GeoJSON: classified incidents binned to a TILE_BINS grid below
+    POINTS_MIN_ZOOM (count, max FRP, dominant event type per bin), raw detections from there on.
+    Query params as /predict: model, window_minutes, from, to. Tiles are cached per data and model version.
+    """
+    if not valid_tile(z, x, y):
+        return jsonify({"error": f"Invalid tile {z}/{x}/{y}"}), 404
+    model = request.args.get("model", "viirs").lower()
+    if model not in MODEL_FILES:
+        model = "viirs"
+    try:
+        with METRICS.span("load"):
+            snapshot = HOTSPOT_STORE.get(model)
+    except Exception as e:
+        logger.error(f"Failed to read {MODEL_FILES[model]}: {e}")
+        return jsonify({"error": f"Could not read data for model {model}"}), 500
+
+    window_minutes = _parse_window_minutes(request.args.get("window_minutes"))
+    if window_minutes is None:
+        return jsonify({"error": "window_minutes must be a positive integer"}), 400
+    time_from, time_to = _snapped_time_range(request.args.get("from"), request.args.get("to"), window_minutes)
+    points = z >= POINTS_MIN_ZOOM
+    namespace = f"tiles:{model}"
+    params = (z, x, y, time_from, time_to) if points else (z, x, y, window_minutes, time_from, time_to)
+    if not points:
+        INFERENCE.maybe_reload()
+    version = (snapshot.version, INFERENCE.version)
+    TILE_CACHE.set_version(namespace, version)
+    body = TILE_CACHE.get(namespace, params)
+    if body is not None:
+        return _stream_response([body])
+
+    bounds = tile_bounds(z, x, y)
+    if points and snapshot.df.empty:
+        lon, lat, properties = np.zeros(0), np.zeros(0), {}
+    elif points:
+        with METRICS.span("filter"):
+            df = snapshot.df.iloc[snapshot.index.query(bounds, time_from, time_to)]
+        _count_rows("filter", len(df))
+        brightness_col = "bright_ti4" if model == "viirs" else "brightness"
+        properties = {"kind": "point", **_hotspot_properties(df, brightness_col)}
+        lon, lat = decimal_coords(df["longitude"]), decimal_coords(df["latitude"])
+    else:
+        lon, lat, incidents = _predict_columns(snapshot, model, window_minutes, time_from, time_to, bounds)
+        if len(lon):
+            lon, lat, properties = bin_incidents(lon, lat, incidents["count"], incidents["max_frp"], incidents["event_type"], z, x, y)
+        else:
+            properties = {}
+    with METRICS.span("serialize"):
+        body = b"".join(iter_feature_collection(lon, lat, properties))
+    if not g.get("uncacheable"):
+        TILE_CACHE.put(namespace, params, body, version)
+    return _stream_response([body])
+
+def poll_changes() -> None:
+    """Feed changed sources and fetch status into CHANGE_FEED; only stats files when nothing changed."""
+    for model in MODEL_FILES:
         try:
-            lon_min, lat_min, lon_max, lat_max = [float(x) for x in bbox.split(",")]
-            df = df[(df["longitude"].between(lon_min, lon_max)) & (df["latitude"].between(lat_min, lat_max))]
-        except Exception:
-            pass
+            snapshot = HOTSPOT_STORE.get(model)
+        except Exception as e:
+            logger.warning(f"Change feed could not read {MODEL_FILES[model]}: {e}")
+            continue
+        change = CHANGE_FEED.observe(model, snapshot.df, snapshot.version)
+        if change is not None:
+            logger.info(f"Change feed: {len(change.added)} new detections for model {model} (seq {change.seq})")
+    CHANGE_FEED.observe_status("fetch_status.json")
 
-    if df.empty:
-        return jsonify({"type": "FeatureCollection", "features": []})
+_change_poller: Optional[threading.Thread] = None
+_change_poller_lock = threading.Lock()
 
-    # Choose brightness column
-    brightness_col = "bright_ti4" if model == "viirs" else "brightness"
-    frp_col = "frp" if "frp" in df.columns else None
-
-    # Approx 1km grid index using rounding of lat/lon
-    def grid_key(row):
-        return (round(float(row["latitude"]) * 100) / 100.0, round(float(row["longitude"]) * 100) / 100.0)
-
-    df["grid_latlon"] = df.apply(grid_key, axis=1)
-
-    # Windowing by time (group into buckets)
-    window_minutes = int(request.args.get("window_minutes", "180"))
-    df["time_bucket"] = df["timestamp"].dt.floor(f"{window_minutes}T")
-
-    features = []
-    for (cell, t_bucket), g in df.groupby(["grid_latlon", "time_bucket" ]):
-        g_sorted = g.sort_values("timestamp")
-        times = list(g_sorted["timestamp"]) 
-        frps = list(g_sorted[frp_col]) if frp_col else [0.0] * len(times)
-        result = classify_sequence(frps, times)
-        lat, lon = cell
-        max_frp = float(g_sorted[frp_col].max()) if frp_col and not g_sorted[frp_col].isna().all() else None
-        brightness_max = float(g_sorted[brightness_col].max()) if brightness_col in g_sorted else None
-        props = {
-            "acq_start": min(times).isoformat() + "Z",
-            "acq_end": max(times).isoformat() + "Z",
-            "event_type": result["event_type"],
-            "confidence": result["confidence"],
-            "model": model,
-            "max_frp": max_frp,
-            "max_brightness": brightness_max,
-            "count": int(len(g_sorted))
-        }
-        features.append({
-            "type": "Feature",
-            "geometry": {"type": "Point", "coordinates": [lon, lat]},
-            "properties": props
-        })
-
-    logger.info(f"/predict served {len(features)} incidents for model {model}")
-    return jsonify({"type": "FeatureCollection", "features": features})
+def _ensure_change_poller() -> None:
+    """Start the background poller on first use of the change feed."""
+    global _change_poller
+    with _change_poller_lock:
+        if _change_poller is not None or not CHANGE_POLLING:
+            return
+        def loop() -> None:
+            while True:
+                try:
+                    poll_changes()
+                except Exception as e:
+                    logger.error(f"Change feed poll failed: {e}")
+                time.sleep(CHANGE_POLL_SECONDS)
+        poll_changes()
+        _change_poller = threading.Thread(target=loop, name="change-poller", daemon=True)
+        _change_poller.start()
+
+def _touched_incidents(snapshot: Any, model: str, added: Any, brightness_col: str,
+                       window_minutes: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """/predict incidents of the (cell, bucket) groups that contain at least one of the ``added`` rows."""
+    lat, lon, ts, _, _ = valid_columns(added, brightness_col)
+    if ts.size == 0 or snapshot.df.empty:
+        return np.zeros(0), np.zeros(0), {}
+    def group_keys(lat: np.ndarray, lon: np.ndarray, ts: np.ndarray) -> Any:
+        lat_idx, lon_idx = grid_indices(lat, lon)
+        return pd.MultiIndex.from_arrays([lat_idx, lon_idx, time_buckets(ts, window_minutes)])
+    touched = group_keys(lat, lon, ts)
+    # Every row sharing a group with an added row lies within one cell of it, in the same buckets
+    margin = 1.0 / GRID_CELLS_PER_DEGREE
+    bbox = (lon.min() - margin, lat.min() - margin, lon.max() + margin, lat.max() + margin)
+    buckets = touched.get_level_values(2)
+    rows = snapshot.index.query(bbox, buckets.min().to_datetime64(), (buckets.max() + pd.Timedelta(minutes=window_minutes)).to_datetime64())
+    lat, lon, ts, frp, brightness = valid_columns(snapshot.df.iloc[rows], brightness_col)
+    keep = group_keys(lat, lon, ts).isin(touched)
+    columns, X = compute_aggregates(
+        lat[keep], lon[keep], ts[keep],
+        frp[keep] if frp is not None else None,
+        brightness[keep] if brightness is not None else None,
+        window_minutes,
+    )
+    return _incident_columns(model, columns, X, frp is not None, brightness is not None)
+
+def _change_payload(change: Change, window_minutes: int) -> bytes:
+    """JSON for one change: the new detections (as /hotspots features) and the /predict incidents of
+    the time buckets they touch, recomputed from the current data; encoded once per change and version."""
+    version = CHANGE_FEED.cursor_at(change.seq)
+    if change.kind == "status":
+        return json.dumps({"fetch_status": change.status, "kind": "status", "version": version}, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    snapshot = HOTSPOT_STORE.get(change.model)
+    key = (window_minutes, snapshot.version, INFERENCE.version)
+    body = change.encoded.get(key)
+    if body is not None:
+        return body
+    added = change.added
+    brightness_col = "bright_ti4" if change.model == "viirs" else "brightness"
+    if added.empty:
+        hotspots = b"".join(iter_feature_collection([], [], {}))
+        lon, lat, properties = np.zeros(0), np.zeros(0), {}
+    else:
+        hotspots = b"".join(iter_feature_collection(decimal_coords(added["longitude"]), decimal_coords(added["latitude"]), _hotspot_properties(added, brightness_col)))
+        lon, lat, properties = _touched_incidents(snapshot, change.model, added, brightness_col, window_minutes)
+    incidents = b"".join(iter_feature_collection(lon, lat, properties))
+    tail = json.dumps({"kind": "data", "model": change.model, "removed": change.removed, "version": version}, sort_keys=True, separators=(",", ":"))
+    body = b'{"hotspots":' + hotspots.rstrip(b"\n") + b',"incidents":' + incidents.rstrip(b"\n") + b"," + tail[1:].encode("utf-8")
+    change.encoded = {key: body}
+    return body
+
+def _changes_since(cursor: Optional[str], model: Optional[str]) -> Tuple[bool, List[Change], int]:
+    reset, changes, seq = CHANGE_FEED.since(cursor)
+    return reset, [c for c in changes if c.kind == "status" or model is None or c.model == model], seq
+
+@app.route("/changes")
+def changes():
+    """Delta of the change feed after cursor ``since`` (for clients without SSE).
+    Query params: since (cursor from a previous response), model (optional source filter), window_minutes (incidents).
+    ``reset: true`` (no, unknown or expired cursor) means: reload /hotspots and /predict in full, then poll from ``version``.
+    """
+    _ensure_change_poller()
+    if CHANGE_POLLING:
+        poll_changes()
+    model = request.args.get("model")
+    model = model.lower() if model and model.lower() in MODEL_FILES else None
+    window_minutes = _parse_window_minutes(request.args.get("window_minutes"))
+    if window_minutes is None:
+        return jsonify({"error": "window_minutes must be a positive integer"}), 400
+    reset, pending, seq = _changes_since(request.args.get("since"), model)
+    cursor = CHANGE_FEED.cursor_at(seq)
+    parts = [_change_payload(c, window_minutes) for c in pending]
+    body = b'{"changes":[' + b",".join(parts) + b'],"reset":' + (b"true" if reset else b"false") + b',"version":' + json.dumps(cursor).encode("utf-8") + b"}\n"
+    return _stream_response([body])
+
+@app.route("/changes/stream")
+def changes_stream():
+    """Server-sent events: ``change`` events (same JSON as /changes entries, ``id`` = cursor) as new data
+    or fetch status arrive, ``reset`` when the cursor is unknown, comment keep-alives in between.
+    Resumes from ``since`` or the ``Last-Event-ID`` header; query params as /changes.
+    At most SSE_MAX_STREAMS streams per process; beyond that 503 (clients fall back to polling /changes).
+    """
+    _ensure_change_poller()
+    model = request.args.get("model")
+    model = model.lower() if model and model.lower() in MODEL_FILES else None
+    window_minutes = _parse_window_minutes(request.args.get("window_minutes"))
+    if window_minutes is None:
+        return jsonify({"error": "window_minutes must be a positive integer"}), 400
+    start = request.args.get("since") or request.headers.get("Last-Event-ID")
+    if SSE_MAX_STREAMS <= 0 or not _STREAM_SLOTS.acquire(blocking=False):
+        response = jsonify({"error": "Too many open change streams; poll /changes instead"})
+        response.headers["Retry-After"] = str(int(SSE_KEEPALIVE_SECONDS))
+        return response, 503
+
+    def events() -> Iterator[bytes]:
+        cursor = start
+        yield b"retry: 5000\n\n"
+        while True:
+            reset, pending, seq = _changes_since(cursor, model)
+            if reset:
+                yield f"id: {CHANGE_FEED.cursor_at(seq)}\nevent: reset\ndata: {json.dumps({'version': CHANGE_FEED.cursor_at(seq)})}\n\n".encode("utf-8")
+            for change in pending:
+                yield f"id: {CHANGE_FEED.cursor_at(change.seq)}\nevent: change\ndata: ".encode("utf-8") + _change_payload(change, window_minutes) + b"\n\n"
+            cursor = CHANGE_FEED.cursor_at(seq)
+            # Ends, after what is pending, when the worker shuts down; the client resumes on another one
+            if CHANGE_FEED.closed:
+                return
+            if not CHANGE_FEED.wait(seq, SSE_KEEPALIVE_SECONDS) and not CHANGE_FEED.closed:
+                yield b": keepalive\n\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    response = Response(events(), mimetype="text/event-stream", headers=headers)
+    response.call_on_close(_STREAM_SLOTS.release)
+    return response
 
 @app.route("/fetch_status")
 def fetch_status():
@@ -257,19 +715,203 @@ def fetch_status():
         logger.warning("fetch_status.json not found")
         return jsonify({"status": "unknown", "timestamp": None, "message": "No status file found."}), 404
 
+@app.route("/stats")
+def stats():
+    """Report hotspot store state, /predict and tile cache and aggregate table hit/miss counters and inference engine counters."""
+    return jsonify({
+        "hotspot_store": HOTSPOT_STORE.stats(),
+        "predict_cache": PREDICT_CACHE.stats(),
+        "tile_cache": TILE_CACHE.stats(),
+        "aggregates": AGGREGATES.stats(),
+        "change_feed": CHANGE_FEED.stats(),
+        "inference": INFERENCE.stats(),
+    })
+
+def _collect_metrics() -> Iterator[Tuple[str, Dict[str, Any], float]]:
+    """/metrics samples read from the store, caches and inference engine at scrape time."""
+    inference = INFERENCE.stats()
+    yield "inference_rows_total", {"path": "model"}, inference["model_rows"]
+    for reason, n in inference["fallback_rows"].items():
+        yield "inference_rows_total", {"path": reason}, n
+    for name, cache in (("predict", PREDICT_CACHE), ("tiles", TILE_CACHE)):
+        cache_stats = cache.stats()
+        yield "cache_hits_total", {"cache": name}, cache_stats["hits"]
+        yield "cache_misses_total", {"cache": name}, cache_stats["misses"]
+        yield "cache_bytes", {"cache": name}, cache_stats["bytes"]
+    for model in MODEL_FILES:
+        snapshot = HOTSPOT_STORE.peek(model)
+        if snapshot is not None:
+            yield "source_rows", {"source": model}, snapshot.rows
+            yield "source_load_seconds", {"source": model}, snapshot.load_seconds
+    yield "ready", {}, 1 if READY.is_set() else 0
+
+METRICS.register(_collect_metrics)
+
+@app.before_request
+def begin_trace() -> None:
+    """Time every request; spans in the handler add its stage breakdown."""
+    if request.endpoint in UNTRACED_ENDPOINTS:
+        return
+    trace = start_trace(request.endpoint or "unmatched", request.full_path)
+    if PROFILER is not None:
+        PROFILER.watch(trace)
+
+@app.after_request
+def end_trace(response: Response) -> Response:
+    """Finish the request's trace once its body has been sent (streamed bodies outlive the view)."""
+    trace = detach_trace()
+    if trace is not None:
+        response.call_on_close(lambda: _record_request(trace, response))
+    return response
+
+def _record_request(trace: Any, response: Response) -> None:
+    elapsed = trace.elapsed
+    if PROFILER is not None:
+        PROFILER.unwatch(trace)
+    if response.content_length is not None:
+        trace.bytes = response.content_length
+    METRICS.observe("request_seconds", elapsed, endpoint=trace.name)
+    METRICS.inc("requests_total", endpoint=trace.name, status=response.status_code)
+    METRICS.inc("response_bytes_total", trace.bytes, endpoint=trace.name)
+    if elapsed * 1000 >= SLOW_REQUEST_MS:
+        profile = PROFILER.dump(trace, PROFILE_DIR) if PROFILER is not None else None
+        logger.warning(
+            f"Slow request {trace.path} took {elapsed * 1000:.0f} ms: {trace.summary()}"
+            + (f"; profile: {profile}" if profile else "")
+        )
+
+@app.route("/metrics")
+def metrics() -> Response:
+    """Prometheus text format: this process's request/stage latency histograms, row, byte, cache and
+    inference fallback counters, followed by the fetcher's metrics file (FETCHER_METRICS_FILE) if present.
+    """
+    body = METRICS.render()
+    try:
+        with open(FETCHER_METRICS_FILE) as f:
+            body += f.read()
+    except OSError:
+        pass
+    return Response(body, content_type=PROMETHEUS_MIMETYPE)
+
+def warm_up() -> None:
+    """Load every source snapshot, its aggregate tables and the model so no request pays for parsing.
+
+    Runs in a background thread so the server answers /health right away. Under gunicorn it runs in
+    the master, which then re-forks the workers so they all share the parsed arrays copy-on-write
+    instead of each holding its own copy.
+    """
+    t0 = time.perf_counter()
+    sources: Dict[str, bool] = {}
+    WARMUP_IDLE.clear()
+    try:
+        for model in MODEL_FILES:
+            try:
+                snapshot = HOTSPOT_STORE.get(model)
+            except Exception as e:
+                logger.warning(f"Warm-up could not read {MODEL_FILES[model]}: {e}")
+                sources[model] = False
+                continue
+            for window in WARMUP_WINDOWS:
+                AGGREGATES.get(model, window, snapshot.version)
+            sources[model] = True
+        INFERENCE.maybe_reload()
+        poll_changes()
+    finally:
+        WARMUP_IDLE.set()
+    WARMUP.update(sources=sources, seconds=round(time.perf_counter() - t0, 6), at=time.time())
+    READY.set()
+    logger.info(f"Warm-up done in {WARMUP['seconds']:.2f}s (sources: {sources})")
+
+def data_versions() -> Dict[str, Optional[Tuple[int, int]]]:
+    """(mtime_ns, size) of every file warm_up() loads or watches; the gunicorn master re-forks workers when one changes."""
+    paths = dict(MODEL_FILES)
+    for model in MODEL_FILES:
+        for window in WARMUP_WINDOWS:
+            paths[f"{model}:{window}"] = aggregate_path(AGGREGATES.root, model, window)
+    paths["model"] = MODEL_PATH
+    paths["fetch_status"] = "fetch_status.json"
+    versions: Dict[str, Optional[Tuple[int, int]]] = {}
+    for name, path in paths.items():
+        try:
+            versions[name] = file_version(path)
+        except OSError:
+            versions[name] = None
+    return versions
+
+def after_fork(shared: bool = False) -> None:
+    """Set up a forked worker.
+
+    With ``shared`` the master reloads changed files, records them in the change feed and replaces
+    the workers, so this worker keeps the snapshots, tables, model and change feed it inherited
+    instead of re-parsing them into its own memory; cursors then work on any worker. Otherwise the
+    worker polls into a change feed of its own, and a cursor from another worker asks for a reload.
+    """
+    global CHANGE_FEED, CHANGE_POLLING, _change_poller
+    _change_poller = None
+    if shared:
+        HOTSPOT_STORE.auto_reload = AGGREGATES.auto_reload = INFERENCE.auto_reload = False
+        CHANGE_POLLING = False
+    else:
+        CHANGE_FEED = ChangeFeed(max_changes=CHANGE_FEED_MAX_CHANGES)
+
+def shutdown() -> None:
+    """End open /changes/stream responses so a worker being replaced exits without waiting them out."""
+    CHANGE_FEED.close()
+
+@app.route("/health")
+def health():
+    """Liveness probe: 200 as soon as the process serves requests, whether or not warm-up has finished."""
+    return jsonify({"status": "ok", "ready": READY.is_set(), "pid": os.getpid()})
+
+@app.route("/ready")
+def ready():
+    """Readiness probe: 503 until warm_up() has finished, then 200 with what it loaded."""
+    body = {"ready": READY.is_set(), "pid": os.getpid(), **WARMUP}
+    return jsonify(body), 200 if READY.is_set() else 503
+
 @app.route("/logs")
 def logs() -> Response:
-    """Stream the last N lines of both fetcher and API logs as plain text."""
-    def tail(filename: str, n: int) -> str:
-        try:
-            with open(filename, "r") as f:
-                return ''.join(f.readlines()[-n:])
-        except Exception:
-            return f"(No log file: {filename})\n"
-    api_log = tail(API_LOG_FILE, LOG_LINES)
-    fetcher_log = tail(FETCHER_LOG_FILE, LOG_LINES)
-    combined = f"--- API LOG ---\n{api_log}\n--- FETCHER LOG ---\n{fetcher_log}"
-    return Response(combined, mimetype="text/plain")
+    """Last N lines of both fetcher and API logs as plain text, read backward from the end of each file.
+    Query params: lines (default 200), level (minimum, e.g. WARNING), q (substring).
+    With ``file=api|fetcher`` returns JSON ``{lines, offset, inode}`` for that log; pass ``after=<offset>``
+    (and ``inode``) from the previous response to get only the lines appended since, across rotation.
+    """
+    log_filter = LogFilter.parse(request.args.get("level"), request.args.get("q"))
+    try:
+        n = int(request.args.get("lines", str(LOG_LINES)))
+        after = int(request.args["after"]) if "after" in request.args else None
+        inode = int(request.args["inode"]) if request.args.get("inode") else None
+    except ValueError:
+        return jsonify({"error": "lines, after and inode must be integers"}), 400
+    if n <= 0:
+        return jsonify({"error": "lines must be positive"}), 400
+    name = request.args.get("file")
+    if name is None:
+        def section(filename: str) -> str:
+            try:
+                return "".join(tail(filename, n, log_filter, partial=True).lines)
+            except OSError:
+                return f"(No log file: {filename})\n"
+        combined = f"--- API LOG ---\n{section(API_LOG_FILE)}\n--- FETCHER LOG ---\n{section(FETCHER_LOG_FILE)}"
+        return Response(combined, mimetype="text/plain")
+
+    if name not in LOG_FILES:
+        return jsonify({"error": f"Unknown log {name}"}), 404
+    try:
+        if after is None:
+            chunk = tail(LOG_FILES[name], n, log_filter)
+        else:
+            chunk = read_after(LOG_FILES[name], after, inode, log_filter)
+    except OSError:
+        return jsonify({"error": f"No log file: {LOG_FILES[name]}"}), 404
+    return jsonify({
+        "file": name,
+        "lines": chunk.lines[-n:],
+        "offset": chunk.offset,
+        "inode": chunk.inode,
+        "rotated": chunk.rotated,
+        "truncated": chunk.truncated or len(chunk.lines) > n,
+    })
 
 # Serve index.html at the root URL
 @app.route('/')
@@ -295,5 +937,6 @@ def open_browser():
     webbrowser.open_new('http://localhost:5000/')
 
 if __name__ == '__main__':
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
     threading.Timer(1.25, open_browser).start()
     app.run() 
\ No newline at end of file
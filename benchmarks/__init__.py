@@ -0,0 +1 @@
+"""Benchmark harness: synthetic FIRMS data (synthetic.py) and timed scenarios (run.py)."""
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import sys
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Median time ratio (new / base) of every scenario both reports ran on the same number of rows."""
+    rows = []
+    for name, b in base["results"].items():
+        n = new["results"].get(name)
+        if n is None or n["rows"] != b["rows"] or not b["median_s"]:
+            continue
+        ratio = n["median_s"] / b["median_s"]
+        rows.append({
+            "scenario": name,
+            "base_s": b["median_s"],
+            "new_s": n["median_s"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1.0 + threshold,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Compare two benchmark result files; exits 1 if a scenario got slower than the threshold."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("base", help="results JSON of the reference commit")
+    parser.add_argument("new", help="results JSON to check")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown of the median time (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = compare(base, new, args.threshold)
+    print(f"base {base['meta'].get('commit')}  new {new['meta'].get('commit')}")
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['scenario']:44s} {r['base_s'] * 1000:10.2f} ms -> {r['new_s'] * 1000:10.2f} ms  x{r['ratio']:.2f}{flag}")
+    if any(r["regression"] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
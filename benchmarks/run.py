@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import DEFAULT_BBOX, write_csv
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+SCENARIOS = ["ingest", "query", "cluster", "features", "inference", "startup"]
+WINDOW_MINUTES = 180
+# Libraries worth keeping out of a process's import; the startup probes report which ones got loaded
+HEAVY_MODULES = ("numpy", "pandas", "pyarrow", "joblib", "sklearn", "scipy")
+# Run by bench_startup in a fresh interpreter: import ``module``, then ``after``; prints the timings in ``marks``
+STARTUP_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module} as m
+marks = {{"import_s": time.perf_counter() - t0, "modules": [n for n in {heavy!r} if n in sys.modules]}}
+{after}
+print(json.dumps(marks))
+"""
+APP_STARTUP = """
+assert m.app.test_client().get("/health").status_code == 200
+marks["health_s"] = time.perf_counter() - t0
+m.warm_up()
+marks["ready_s"] = time.perf_counter() - t0
+"""
+
+
+def _timed(fn: Callable[[], Any], repeat: int, rows: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Run ``fn`` ``repeat`` times (``setup`` untimed before each) and summarize wall times."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return _summary(times, rows)
+
+
+def _summary(times: List[float], rows: int) -> Dict[str, Any]:
+    best = min(times)
+    return {
+        "rows": int(rows),
+        "repeat": len(times),
+        "min_s": round(best, 6),
+        "median_s": round(statistics.median(times), 6),
+        "mean_s": round(statistics.fmean(times), 6),
+        "max_s": round(max(times), 6),
+        "rows_per_s": round(rows / best, 1) if best > 0 else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def _center_bbox(fraction: float) -> tuple:
+    """The central ``fraction`` (per side) of the generator's default area."""
+    lon_min, lat_min, lon_max, lat_max = DEFAULT_BBOX
+    dx, dy = (lon_max - lon_min) * (1 - fraction) / 2, (lat_max - lat_min) * (1 - fraction) / 2
+    return lon_min + dx, lat_min + dy, lon_max - dx, lat_max - dy
+
+
+def _tile(bbox: tuple, z: int) -> str:
+    """``x/y`` of the zoom ``z`` web-mercator tile holding the centre of ``bbox``."""
+    lon, lat = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+    n = 2 ** z
+    rad = math.radians(lat)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.log(math.tan(rad) + 1.0 / math.cos(rad)) / math.pi) / 2.0 * n)
+    return f"{x}/{y}"
+
+
+def bench_ingest(ctx: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    from src.pipeline.aggregates import materialize
+    from src.pipeline.archive import HotspotArchive
+    from src.pipeline.store import build_index, load_hotspot_csv
+    from src.pipeline.storage import PartitionedStorage
+
+    csv, rows = ctx["viirs_csv"], ctx["rows"]
+    df = load_hotspot_csv(csv)
+    scratch = os.path.join(ctx["work_dir"], "ingest")
+    archive_dir = os.path.join(scratch, "archive")
+    raw = pd.read_csv(csv)
+
+    def reset() -> None:
+        shutil.rmtree(scratch, ignore_errors=True)
+        os.makedirs(scratch)
+
+    results = {
+        "ingest.parse_csv": _timed(lambda: load_hotspot_csv(csv), repeat, rows),
+        "ingest.build_index": _timed(lambda: build_index(df), repeat, rows),
+        "ingest.storage_append": _timed(lambda: PartitionedStorage(scratch).append("viirs", raw), repeat, rows, reset),
+        "ingest.archive_append": _timed(lambda: HotspotArchive(archive_dir).append(df), repeat, rows, reset),
+        "ingest.materialize_aggregates": _timed(
+            lambda: materialize(csv, os.path.join(scratch, "viirs_w180.npz"), "bright_ti4", WINDOW_MINUTES), repeat, rows, reset),
+    }
+    HotspotArchive(archive_dir).append(df)
+    results["ingest.archive_open_read"] = _timed(lambda: HotspotArchive(archive_dir).read(), repeat, rows)
+    shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def bench_query(ctx: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    from src.pipeline.aggregates import aggregate_path, materialize
+
+    api = ctx["api"]
+    client = api.app.test_client()
+    rows = ctx["rows"]
+    snapshot = api.HOTSPOT_STORE.get("viirs")
+    bbox = _center_bbox(0.5)
+    bbox_arg = ",".join(f"{v:.5f}" for v in bbox)
+    ts = snapshot.df["timestamp"].to_numpy(dtype="datetime64[ns]")
+    t_mid = ts.min() + (ts.max() - ts.min()) // 2
+    day = np.timedelta64(1, "D")
+    since = str(t_mid.astype("datetime64[s]"))
+    until = str((t_mid + day).astype("datetime64[s]"))
+
+    def get(path: str) -> None:
+        response = client.get(path)
+        response.get_data()
+        assert response.status_code == 200, (path, response.status_code)
+
+    def clear() -> None:
+        api.PREDICT_CACHE.clear()
+        api.TILE_CACHE.clear()
+
+    aggregates_root = api.AGGREGATES.root
+    api.AGGREGATES.root = os.path.join(ctx["work_dir"], "no_aggregates")
+    results = {
+        "query.index_bbox_day": _timed(lambda: snapshot.index.query(bbox, t_mid, t_mid + day), repeat, rows),
+        "query.hotspots_full": _timed(lambda: get("/hotspots?model=viirs"), repeat, rows),
+        "query.hotspots_packed": _timed(lambda: get("/hotspots?model=viirs&format=packed"), repeat, rows),
+        "query.hotspots_bbox_day": _timed(lambda: get(f"/hotspots?model=viirs&bbox={bbox_arg}&from={since}&to={until}"), repeat, rows),
+        "query.predict_cold": _timed(lambda: get("/predict?model=viirs"), repeat, rows, clear),
+        "query.predict_warm": _timed(lambda: get("/predict?model=viirs"), repeat, rows),
+        "query.predict_bbox_day_cold": _timed(lambda: get(f"/predict?model=viirs&bbox={bbox_arg}&from={since}&to={until}"), repeat, rows, clear),
+        "query.tile_z10_cold": _timed(lambda: get(f"/tiles/10/{_tile(bbox, 10)}?model=viirs"), repeat, rows, clear),
+        # One fused viirs+modis pass over the default region, against the two single-source requests it replaces
+        "query.predict_modis_cold": _timed(lambda: get("/predict?model=modis"), repeat, rows, clear),
+        "query.predict_fused_cold": _timed(lambda: get("/predict/fused?sources=viirs,modis&regions=default"), repeat, rows, clear),
+    }
+    api.AGGREGATES.root = os.path.join(ctx["work_dir"], "aggregates")
+    os.makedirs(api.AGGREGATES.root, exist_ok=True)
+    materialize(api.MODEL_FILES["viirs"], aggregate_path(api.AGGREGATES.root, "viirs", WINDOW_MINUTES), "bright_ti4", WINDOW_MINUTES)
+    results["query.predict_cold_aggregates"] = _timed(lambda: get("/predict?model=viirs"), repeat, rows, clear)
+    results["query.predict_bbox_day_cold_aggregates"] = _timed(
+        lambda: get(f"/predict?model=viirs&bbox={bbox_arg}&from={since}&to={until}"), repeat, rows, clear)
+    api.AGGREGATES.root = aggregates_root
+    return results
+
+
+def bench_cluster(ctx: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    from src.pipeline.events import cluster_events
+    from src.pipeline.store import load_hotspot_csv
+
+    df = load_hotspot_csv(ctx["viirs_csv"])
+    sample = df.iloc[: ctx["cluster_rows"]]
+    n = len(sample)
+    return {
+        "cluster.dbscan": _timed(lambda: cluster_events(sample), repeat, n),
+        "cluster.slabs": _timed(lambda: cluster_events(sample, slab_minutes=1440), repeat, n),
+    }
+
+
+def bench_features(ctx: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    from model.utils import extract_features_batch
+    from src.pipeline.grid import group_cells
+    from src.pipeline.store import decimal_coords, load_hotspot_csv
+
+    df = load_hotspot_csv(ctx["viirs_csv"])
+    lat, lon = decimal_coords(df["latitude"]), decimal_coords(df["longitude"])
+    ts = df["timestamp"].to_numpy(dtype="datetime64[ns]")
+    frp = df["frp"].to_numpy(dtype=float)
+    groups = group_cells(lat, lon, ts, WINDOW_MINUTES)
+    ordered = frp[groups.order]
+    ctx["features"] = (extract_features_batch(ordered, groups.offsets), ordered, groups.offsets)
+    rows = ctx["rows"]
+    return {
+        "features.group_cells": _timed(lambda: group_cells(lat, lon, ts, WINDOW_MINUTES), repeat, rows),
+        "features.extract_batch": _timed(lambda: extract_features_batch(ordered, groups.offsets), repeat, rows),
+    }
+
+
+def bench_inference(ctx: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    api = ctx["api"]
+    if "features" not in ctx:
+        bench_features(ctx, 1)
+    X, ordered, offsets = ctx["features"]
+    no_signal = np.zeros(X.shape[0], dtype=bool)
+    k = min(ctx["sequence_count"], offsets.size - 1)
+    sequences = [ordered[offsets[i]:offsets[i + 1]].tolist() for i in range(k)]
+    t0 = datetime(2025, 7, 1)
+    times = [[t0 + timedelta(minutes=m) for m in range(len(s))] for s in sequences]
+
+    def each_sequence() -> None:
+        for frps, ts in zip(sequences, times):
+            api.classify_sequence(frps, ts)
+
+    return {
+        "inference.classify_batch": _timed(lambda: api.INFERENCE.classify(X, no_signal), repeat, X.shape[0]),
+        "inference.classify_sequence": _timed(each_sequence, repeat, k),
+    }
+
+
+def _probe_startup(module: str, after: str = "pass", env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Timings of ``STARTUP_PROBE`` for ``module``, run in a fresh interpreter in the current (work) directory."""
+    code = STARTUP_PROBE.format(module=module, heavy=HEAVY_MODULES, after=after)
+    pythonpath = os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")]))
+    proc = subprocess.run([sys.executable, "-c", code], env={**os.environ, **(env or {}), "PYTHONPATH": pythonpath},
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(ctx: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    """Cold start of each process: import time (and heavy libraries loaded), first /health, warm-up."""
+    api_runs = [_probe_startup("app", APP_STARTUP) for _ in range(repeat)]
+    fetcher_runs = [_probe_startup("fetch_hotspots", env={"RUN_ONCE": "true"}) for _ in range(repeat)]
+    return {
+        "startup.import_app": {**_summary([r["import_s"] for r in api_runs], 0), "modules": api_runs[0]["modules"]},
+        "startup.app_first_health": _summary([r["health_s"] for r in api_runs], 0),
+        "startup.app_ready": _summary([r["ready_s"] for r in api_runs], ctx["rows"]),
+        "startup.import_fetcher_run_once": {**_summary([r["import_s"] for r in fetcher_runs], 0), "modules": fetcher_runs[0]["modules"]},
+    }
+
+
+BENCHES = {
+    "ingest": bench_ingest,
+    "query": bench_query,
+    "cluster": bench_cluster,
+    "features": bench_features,
+    "inference": bench_inference,
+    "startup": bench_startup,
+}
+
+
+def run(rows: int, scenarios: List[str], repeat: int = 3, seed: int = 0, work_dir: Optional[str] = None,
+        model_path: Optional[str] = None, cluster_rows: int = 50_000, sequence_count: int = 2_000) -> Dict[str, Any]:
+    """Generate synthetic data in ``work_dir`` and time the selected scenario groups; returns the report."""
+    work_dir = os.path.abspath(work_dir or tempfile.mkdtemp(prefix="firms-bench-"))
+    os.makedirs(work_dir, exist_ok=True)
+    previous_cwd = os.getcwd()
+    os.chdir(work_dir)  # app.py reads hotspots_{model}.csv and writes api.log relative to the cwd
+    try:
+        t0 = time.perf_counter()
+        write_csv("hotspots_viirs.csv", rows, "viirs", seed=seed)
+        write_csv("hotspots_modis.csv", max(1, rows // 4), "modis", seed=seed + 1)
+        generate_seconds = time.perf_counter() - t0
+        os.environ["MODEL_PATH"] = os.path.abspath(os.path.join(previous_cwd, model_path)) if model_path else os.path.join(work_dir, "no_model.pkl")
+        os.environ.setdefault("AGGREGATES_DIR", os.path.join(work_dir, "aggregates"))
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        import app as api
+        api.INFERENCE.maybe_reload()  # the app loads its model in warm_up() or on first use
+
+        ctx: Dict[str, Any] = {
+            "api": api,
+            "rows": rows,
+            "work_dir": work_dir,
+            "viirs_csv": os.path.join(work_dir, "hotspots_viirs.csv"),
+            "cluster_rows": min(rows, cluster_rows),
+            "sequence_count": sequence_count,
+        }
+        results: Dict[str, Any] = {}
+        for name in scenarios:
+            t1 = time.perf_counter()
+            results.update(BENCHES[name](ctx, repeat))
+            print(f"{name}: {time.perf_counter() - t1:.1f}s", file=sys.stderr)
+    finally:
+        os.chdir(previous_cwd)
+    import sklearn
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "rows": rows,
+            "modis_rows": max(1, rows // 4),
+            "seed": seed,
+            "repeat": repeat,
+            "scenarios": scenarios,
+            "model": "model" if api.INFERENCE.model is not None else "heuristic",
+            "generate_seconds": round(generate_seconds, 3),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Time ingest, query, clustering, feature extraction and inference on synthetic FIRMS data."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--rows", type=float, default=100_000, help="VIIRS detections (MODIS gets a quarter)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=None, help="where data is generated (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated work directory")
+    parser.add_argument("--model", default=None, help="model artifact for inference (default: heuristic)")
+    parser.add_argument("--cluster-rows", type=int, default=50_000, help="detections clustered by cluster_events")
+    parser.add_argument("--sequences", type=int, default=2_000, help="sequences classified one by one with classify_sequence")
+    parser.add_argument("--out", default=None, help=f"results JSON (default: {os.path.relpath(RESULTS_DIR)}/<commit>-<rows>.json)")
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = sorted(set(scenarios) - set(BENCHES))
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    rows = int(args.rows)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="firms-bench-")
+    try:
+        report = run(rows, scenarios, repeat=args.repeat, seed=args.seed, work_dir=work_dir, model_path=args.model,
+                     cluster_rows=args.cluster_rows, sequence_count=args.sequences)
+    finally:
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"{(report['meta']['commit'] or 'unknown')[:12]}-{rows}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, r in report["results"].items():
+        print(f"{name:44s} {r['median_s'] * 1000:10.2f} ms  {r['rows_per_s'] or 0:14,.0f} rows/s")
+    for name, r in report["results"].items():
+        if "modules" in r:
+            print(f"{name}: imported {', '.join(r['modules']) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+    print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
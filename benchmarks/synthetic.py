@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import math
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_BBOX = (34.2, 31.2, 34.65, 31.6)  # the fetcher's default area (lon_min, lat_min, lon_max, lat_max)
+CHUNK_ROWS = 500_000
+KM_PER_DEGREE = 111.32
+
+
+@dataclass(frozen=True)
+class SourceSchema:
+    """Column layout and sensor characteristics of one FIRMS product."""
+
+    columns: Tuple[str, ...]
+    brightness_col: str
+    background_col: str
+    instrument: str
+    version: str
+    satellites: Dict[str, Tuple[float, float]]  # satellite -> (day, night) local solar overpass hours
+    pixel_km: float
+    decimals: int
+    scan_range: Tuple[float, float]
+
+
+SCHEMAS = {
+    "viirs": SourceSchema(
+        columns=("latitude", "longitude", "bright_ti4", "scan", "track", "acq_date", "acq_time", "satellite",
+                 "instrument", "confidence", "version", "bright_ti5", "frp", "daynight"),
+        brightness_col="bright_ti4", background_col="bright_ti5", instrument="VIIRS", version="2.0NRT",
+        satellites={"N": (13.5, 25.5), "N20": (14.3, 26.3)}, pixel_km=0.375, decimals=5, scan_range=(0.32, 0.8),
+    ),
+    "modis": SourceSchema(
+        columns=("latitude", "longitude", "brightness", "scan", "track", "acq_date", "acq_time", "satellite",
+                 "instrument", "confidence", "version", "bright_t31", "frp", "daynight"),
+        brightness_col="brightness", background_col="bright_t31", instrument="MODIS", version="6.1NRT",
+        satellites={"Terra": (10.5, 22.5), "Aqua": (13.5, 25.5)}, pixel_km=1.0, decimals=4, scan_range=(1.0, 4.8),
+    ),
+}
+
+
+def _events(rng: np.random.Generator, rows: int, days: int, bbox: Tuple[float, float, float, float],
+            regions: np.ndarray, explosion_fraction: float) -> Dict[str, np.ndarray]:
+    """Fire and explosion events covering at least ``rows`` detections.
+
+    Fires persist over a geometric number of overpasses (cut off at the end of the ``days`` span)
+    with a few detections each; explosions are a single overpass burst of adjacent pixels. 80% of
+    events sit around one of ``regions``.
+    """
+    lon_min, lat_min, lon_max, lat_max = bbox
+    n = rows // 4 + 16  # ~10 detections per event on average, so this overshoots
+    while True:
+        explosion = rng.random(n) < explosion_fraction
+        first_slot = rng.integers(0, days * 2, n)
+        passes = np.minimum(np.where(explosion, 1, rng.geometric(0.35, n)), days * 2 - first_slot)
+        per_pass = np.where(explosion, rng.integers(3, 11, n), rng.poisson(2.5, n) + 1)
+        sizes = passes * per_pass
+        if int(sizes.sum()) >= rows:
+            break
+        n *= 2
+    n = int(np.searchsorted(np.cumsum(sizes), rows)) + 1
+    clustered = rng.random(n) < 0.8
+    region = rng.integers(0, len(regions), n)
+    lat = np.where(clustered, regions[region, 0] + rng.normal(0, 0.03, n), lat_min + rng.random(n) * (lat_max - lat_min))
+    lon = np.where(clustered, regions[region, 1] + rng.normal(0, 0.03, n), lon_min + rng.random(n) * (lon_max - lon_min))
+    return {
+        "lat": np.clip(lat, lat_min, lat_max),
+        "lon": np.clip(lon, lon_min, lon_max),
+        "explosion": explosion[:n],
+        "first_slot": first_slot[:n],
+        "passes": passes[:n],
+        "per_pass": per_pass[:n],
+        "peak_frp": np.where(explosion[:n], rng.lognormal(math.log(80.0), 0.6, n), rng.lognormal(math.log(12.0), 0.8, n)),
+    }
+
+
+def _chunk(rng: np.random.Generator, rows: int, schema: SourceSchema, start: np.datetime64, days: int,
+           bbox: Tuple[float, float, float, float], regions: np.ndarray, explosion_fraction: float) -> pd.DataFrame:
+    ev = _events(rng, rows, days, bbox, regions, explosion_fraction)
+    sizes = ev["passes"] * ev["per_pass"]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    event = np.repeat(np.arange(sizes.size), sizes)[:rows]
+    pos = np.arange(rows) - offsets[event]
+    per_pass = ev["per_pass"][event]
+    pass_idx, pixel = pos // per_pass, pos % per_pass
+    passes = ev["passes"][event]
+
+    # Overpass time: one satellite per (event, pass), at its local solar overpass hour shifted to
+    # UTC by longitude, drifting day to day with the orbit; pixels of one pass share the scan time
+    names = list(schema.satellites)
+    hours = np.array([schema.satellites[s] for s in names])
+    sat = (ev["first_slot"][event] * 7 + pass_idx * 3 + event) % len(names)
+    slot = ev["first_slot"][event] + pass_idx
+    day, night = slot // 2, slot % 2
+    lat0, lon0 = ev["lat"][event], ev["lon"][event]
+    drift = ((day * 37 + sat * 11) % 17 - 8) * 6.0
+    local_hours = hours[sat, night]
+    # The last night pass can fall just past midnight UTC; keep it on the span's last day
+    minutes = np.minimum(day * 1440 + (local_hours - lon0 / 15.0) * 60.0 + drift, days * 1440 - 1)
+    timestamps = start + np.round(minutes).astype("timedelta64[m]")
+
+    km_lat = schema.pixel_km * 1.5 / KM_PER_DEGREE
+    lat = lat0 + rng.normal(0, km_lat, rows)
+    lon = lon0 + rng.normal(0, km_lat / np.cos(np.radians(lat0)), rows)
+
+    # FRP: fires ramp up and down over their passes; an explosion is one pixel far above its neighbours
+    peak = ev["peak_frp"][event]
+    explosion = ev["explosion"][event]
+    envelope = np.sin(np.pi * (pass_idx + 0.5) / passes)
+    fire_frp = peak * envelope * rng.lognormal(0, 0.4, rows)
+    burst_frp = np.where(pixel == per_pass // 2, peak, peak * rng.uniform(0.05, 0.2, rows))
+    frp = np.round(np.where(explosion, burst_frp, fire_frp), 2)
+    frp[rng.random(rows) < 0.005] = np.nan
+
+    log_frp = np.log1p(np.nan_to_num(frp))
+    if schema.instrument == "VIIRS":
+        brightness = np.minimum(367.0, 295.0 + 18.0 * log_frp + rng.normal(0, 3, rows))
+        background = 285.0 + 4.0 * log_frp + rng.normal(0, 2, rows)
+        confidence = np.where(log_frp + rng.normal(0, 0.5, rows) > 3.4, "h", np.where(log_frp > 1.8, "n", "l"))
+    else:
+        brightness = 300.0 + 25.0 * log_frp + rng.normal(0, 4, rows)
+        background = 290.0 + 5.0 * log_frp + rng.normal(0, 2, rows)
+        confidence = np.clip(np.round(40.0 + 15.0 * log_frp + rng.normal(0, 10, rows)), 0, 100).astype(np.int64)
+    scan = np.round(rng.uniform(*schema.scan_range, rows), 2)
+
+    utc = timestamps.astype("datetime64[m]")
+    minute_of_day = (utc - utc.astype("datetime64[D]")).astype(np.int64)
+    columns = {
+        "latitude": np.round(lat, schema.decimals),
+        "longitude": np.round(lon, schema.decimals),
+        schema.brightness_col: np.round(brightness, 2),
+        "scan": scan,
+        "track": np.round(scan * rng.uniform(0.75, 1.0, rows), 2),
+        "acq_date": utc.astype("datetime64[D]").astype(str),
+        "acq_time": (minute_of_day // 60) * 100 + minute_of_day % 60,
+        "satellite": np.asarray(names, dtype=object)[sat],
+        "instrument": schema.instrument,
+        "confidence": confidence,
+        "version": schema.version,
+        schema.background_col: np.round(background, 2),
+        "frp": frp,
+        "daynight": np.where(night == 0, "D", "N"),
+    }
+    df = pd.DataFrame({col: columns[col] for col in schema.columns})
+    return df.iloc[np.argsort(timestamps, kind="stable")].reset_index(drop=True)
+
+
+def generate(rows: int, source: str = "viirs", seed: int = 0, start: str = "2025-07-01", days: int = 30,
+             bbox: Tuple[float, float, float, float] = DEFAULT_BBOX, explosion_fraction: float = 0.1,
+             chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield ``rows`` synthetic FIRMS detections of ``source`` ("viirs" or "modis") in frames of at most ``chunk_rows``.
+
+    Columns and value ranges follow the FIRMS area CSVs; detections come from spatially clustered
+    fire and explosion events seen at the satellites' diurnal overpass times, all within the
+    ``days`` days from ``start``. The output depends
+    only on the arguments, so a given (rows, seed, chunk_rows) always produces the same data.
+    """
+    schema = SCHEMAS[source]
+    n_chunks = max(1, math.ceil(rows / chunk_rows))
+    region_seq, *chunk_seqs = np.random.SeedSequence(seed).spawn(n_chunks + 1)
+    lon_min, lat_min, lon_max, lat_max = bbox
+    region_rng = np.random.default_rng(region_seq)
+    regions = np.column_stack([lat_min + region_rng.random(8) * (lat_max - lat_min),
+                               lon_min + region_rng.random(8) * (lon_max - lon_min)])
+    t0 = np.datetime64(start, "m")
+    for k, seq in enumerate(chunk_seqs):
+        n = min(chunk_rows, rows - k * chunk_rows)
+        if n > 0:
+            yield _chunk(np.random.default_rng(seq), n, schema, t0, days, bbox, regions, explosion_fraction)
+
+
+def generate_frame(rows: int, source: str = "viirs", **kwargs) -> pd.DataFrame:
+    """All of ``generate`` in one frame."""
+    frames: List[pd.DataFrame] = list(generate(rows, source, **kwargs))
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def write_csv(path: str, rows: int, source: str = "viirs", **kwargs) -> int:
+    """Write ``generate(rows, source, ...)`` to ``path`` as a FIRMS CSV chunk by chunk; returns the row count."""
+    written = 0
+    with open(path, "w", newline="") as f:
+        for df in generate(rows, source, **kwargs):
+            df.to_csv(f, index=False, header=written == 0)
+            written += len(df)
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Write a synthetic FIRMS CSV (VIIRS or MODIS schema) for benchmarks."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--rows", type=float, required=True, help="number of detections (e.g. 1e6)")
+    parser.add_argument("--source", default="viirs", choices=sorted(SCHEMAS))
+    parser.add_argument("--out", default=None, help="output CSV (default: hotspots_{source}.csv)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default="2025-07-01", help="first day (UTC)")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--bbox", default=",".join(str(v) for v in DEFAULT_BBOX), help="lon_min,lat_min,lon_max,lat_max")
+    parser.add_argument("--explosion-fraction", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    bbox = tuple(float(v) for v in args.bbox.split(","))
+    out = args.out or f"hotspots_{args.source}.csv"
+    n = write_csv(out, int(args.rows), args.source, seed=args.seed, start=args.start, days=args.days,
+                  bbox=bbox, explosion_fraction=args.explosion_fraction)
+    print(f"Wrote {n} {args.source} detections to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,20 @@
-import requests
 import time
-import pandas as pd
+import csv
+import io
+import math
 from datetime import datetime
 import json
-import traceback
 import logging
 from logging.handlers import RotatingFileHandler
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import os
 from dotenv import load_dotenv
 
+# pandas (and the aggregate, archive and storage modules built on it) is imported only by the steps
+# that need a frame, so a one-shot overwrite fetch runs without it
+from src.pipeline.scheduler import FetchJob, FetchScheduler
+from src.serving.metrics import MetricsRegistry
+
 # Load environment variables from .env if present
 load_dotenv()
 
@@ -22,12 +27,46 @@ DAY_RANGE = os.getenv("DAY_RANGE", "10")
 
 SOURCES = {
     "viirs": "VIIRS_SNPP_NRT",
-    "modis": "MODIS_NRT"
+    "modis": "MODIS_NRT",
+    "viirs_noaa20": "VIIRS_NOAA20_NRT",
+    "viirs_noaa21": "VIIRS_NOAA21_NRT",
 }
+# Products fetched each cycle (keys of SOURCES)
+FETCH_SOURCES = [s.strip() for s in os.getenv("FETCH_SOURCES", "viirs,modis").split(",") if s.strip() in SOURCES]
+# Extra areas as "name=lon_min,lat_min,lon_max,lat_max;..." fetched alongside BBOX
+DEFAULT_AREA = "default"
+AREAS = {DEFAULT_AREA: BBOX}
+for spec in filter(None, (a.strip() for a in os.getenv("EXTRA_BBOXES", "").split(";"))):
+    area_name, _, area_bbox = spec.partition("=")
+    AREAS[area_name.strip()] = area_bbox.strip()
 
-BASE = "https://firms.modaps.eosdis.nasa.gov/api/area/csv"
+BASE = os.getenv("FIRMS_BASE_URL", "https://firms.modaps.eosdis.nasa.gov/api/area/csv")
 INTERVAL_MINUTES = int(os.getenv("INTERVAL_MINUTES", "10"))
+# Fetch once and exit (cron-style) instead of looping every INTERVAL_MINUTES
+RUN_ONCE = os.getenv("RUN_ONCE", "false").lower() in {"1","true","yes","on"}
 LOG_FILE = "fetcher.log"
+# "overwrite" rewrites hotspots_{model}.csv each cycle; "incremental" appends new rows to STORAGE_DIR
+INGEST_MODE = os.getenv("INGEST_MODE", "overwrite").lower()
+STORAGE_DIR = os.getenv("STORAGE_DIR", os.path.join("data", "hotspots"))
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "4"))
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "60"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+# Every fetched detection is also kept in a columnar archive per job under ARCHIVE_DIR (unset: off)
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR")
+# Window sizes (minutes) whose per (cell, bucket) aggregates are materialized after each ingest.
+# RUN_ONCE runs only materialize when this is set explicitly: it is the one step that loads pandas
+AGGREGATE_WINDOWS = [int(w) for w in os.getenv("AGGREGATE_WINDOWS", "" if RUN_ONCE else "180").split(",") if w.strip()]
+AGGREGATES_DIR = os.getenv("AGGREGATES_DIR", os.path.join("data", "aggregates"))
+# A job whose last success is older than this is reported as stale
+STALE_AFTER_MINUTES = float(os.getenv("STALE_AFTER_MINUTES", str(3 * INTERVAL_MINUTES)))
+# Stage timings and counters, rewritten after each cycle; the API appends this file to its /metrics
+METRICS_FILE = os.getenv("FETCHER_METRICS_FILE", "fetcher_metrics.prom")
+METRICS = MetricsRegistry(prefix="fetcher_")
+METRICS.describe("stage_seconds", "histogram", "Time per fetch stage (fetch, parse, write, archive, aggregate) and job.")
+METRICS.describe("jobs_total", "counter", "Fetch jobs run, by job and outcome.")
+METRICS.describe("rows_total", "counter", "Detections received, by job.")
+METRICS.describe("bytes_total", "counter", "Response bytes downloaded, by job.")
+METRICS.describe("last_cycle_timestamp_seconds", "gauge", "Unix time the last fetch cycle finished.")
 
 status: Dict[str, Any] = {
     "status": "unknown",
@@ -59,69 +98,192 @@ def write_status(status: Dict[str, Any]) -> None:
     with open("fetch_status.json", "w") as f:
         json.dump(status, f)
 
-def fetch_and_report(model: str) -> bool:
-    """Fetch data for a given model, log results, and update status."""
-    source = SOURCES[model]
-    url = f"{BASE}/{MAP_KEY}/{source}/{BBOX}/{DAY_RANGE}"
-    try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-        fname = f"hotspots_{model}.csv"
+class FirmsApiError(Exception):
+    """FIRMS answered 200 with an error message instead of CSV."""
+
+def check_api_text(text: str) -> None:
+    # Check for API error in the CSV
+    if text.startswith("Invalid") or text.lower().startswith("error"):
+        raise FirmsApiError(f"API returned error: {text.strip()}")
+
+def read_detections(text: str) -> Any:
+    """Parse a FIRMS CSV response into a DataFrame (importing pandas on first use)."""
+    import pandas as pd
+    return pd.read_csv(io.StringIO(text))
+
+def scan_detections(text: str) -> Tuple[int, Optional[datetime]]:
+    """Row count and newest acquisition time (UTC) of a FIRMS CSV response, read with the csv module."""
+    reader = csv.reader(io.StringIO(text))
+    header = next(reader, None)
+    if not header:
+        raise ValueError("No columns to parse from the response")
+    count, newest = 0, ""
+    for row in reader:
+        if not row:
+            continue
+        if count == 0:
+            date_col, time_col = header.index("acq_date"), header.index("acq_time")
+        count += 1
+        # "YYYY-MM-DD HHMM" strings sort chronologically
+        stamp = f"{row[date_col]} {row[time_col].zfill(4)}"
+        if stamp > newest:
+            newest = stamp
+    return count, datetime.strptime(newest, "%Y-%m-%d %H%M") if count else None
+
+def save_snapshot(job: FetchJob, text: str) -> str:
+    """Overwrite hotspots_{job}.csv with the latest window and summarize it.
+    The response is only scanned, not parsed into a frame, unless it is also archived.
+    """
+    fname = f"hotspots_{job.name}.csv"
+    with METRICS.span("parse", job=job.name):
+        check_api_text(text)
+        count, newest = scan_detections(text)
+    METRICS.inc("rows_total", count, job=job.name)
+    if count == 0:
+        # Overwrite with just the header if no data rows
+        if job.model.startswith("viirs"):
+            header = "latitude,longitude,bright_ti4,scan,track,acq_date,acq_time,satellite,instrument,confidence,version,bright_ti5,frp,daynight\n"
+        else:
+            header = "latitude,longitude,brightness,scan,track,acq_date,acq_time,satellite,instrument,confidence,version,bright_t31,frp,daynight\n"
         with open(fname, "w") as f:
-            f.write(resp.text)
-        # Check for API error in the CSV
-        if resp.text.startswith("Invalid") or resp.text.lower().startswith("error"):
-            msg = f"API returned error: {resp.text.strip()}"
-            logger.error(f"[{model.upper()}] {msg}")
-            status["status"] = "error"
-            status["message"] = f"{model.upper()}: {msg}"
-            write_status(status)
-            return False
-        df = pd.read_csv(fname)
-        if df.empty:
-            # Overwrite with just the header if no data rows
-            if model == "viirs":
-                header = "latitude,longitude,bright_ti4,scan,track,acq_date,acq_time,satellite,instrument,confidence,version,bright_ti5,frp,daynight\n"
-            else:
-                header = "latitude,longitude,brightness,scan,track,acq_date,acq_time,satellite,instrument,confidence,version,bright_t31,frp,daynight\n"
-            with open(fname, "w") as f:
-                f.write(header)
-            logger.info(f"[{model.upper()}] No hotspots found. Overwrote {fname} with header only.")
-            return True
-        df['timestamp'] = pd.to_datetime(
-            df['acq_date'].astype(str) + ' ' + df['acq_time'].astype(str).str.zfill(4),
-            format='%Y-%m-%d %H%M'
-        )
-        newest = df['timestamp'].max()
-        latency = datetime.utcnow() - newest.to_pydatetime()
-        logger.info(f"[{model.upper()}] Retrieved {len(df)} records. Newest: {newest} UTC, Latency: {int(latency.total_seconds()//60)} min")
-        return True
+            f.write(header)
+        return f"No hotspots found. Overwrote {fname} with header only."
+    with METRICS.span("write", job=job.name), open(fname, "w") as f:
+        f.write(text)
+    latency = datetime.utcnow() - newest
+    archived = archive_detections(job, read_detections(text)) if ARCHIVE_DIR else ""
+    return f"Retrieved {count} records. Newest: {newest} UTC, Latency: {int(latency.total_seconds()//60)} min{archived}"
+
+def incremental_day_range(high_water: Any, max_days: int, now: Any = None) -> int:
+    """Days of history to request so the window still covers the stored high-water mark."""
+    if high_water is None:
+        return max_days
+    now = now or datetime.utcnow()
+    days = math.ceil(max((now - high_water).total_seconds(), 0) / 86400) + 1
+    return max(1, min(max_days, days))
+
+def ingest(job: FetchJob, text: str) -> str:
+    """Append the detections in ``text`` that are not stored yet."""
+    from src.pipeline.storage import PartitionedStorage
+    with METRICS.span("parse", job=job.name):
+        check_api_text(text)
+        df = read_detections(text)
+    METRICS.inc("rows_total", len(df), job=job.name)
+    with METRICS.span("write", job=job.name):
+        result = PartitionedStorage(STORAGE_DIR).append(job.name, df)
+    return (
+        f"Retrieved {result.received} records over {job.day_range} day(s); "
+        f"appended {result.appended} new, skipped {result.duplicates} duplicates. High-water mark: {result.high_water} UTC"
+        f"{archive_detections(job, df)}"
+    )
+
+def archive_detections(job: FetchJob, df: Any) -> str:
+    """Add the job's detections to its archive; returns a summary suffix ("" when archiving is off or failed)."""
+    if not ARCHIVE_DIR or df.empty:
+        return ""
+    from src.pipeline.archive import HotspotArchive
+    try:
+        with METRICS.span("archive", job=job.name):
+            result = HotspotArchive(os.path.join(ARCHIVE_DIR, job.name)).append(df)
     except Exception as e:
-        tb = traceback.format_exc()
-        logger.error(f"[{model.upper()}] Error: {e}\n{tb}")
-        status["status"] = "error"
-        status["message"] = f"{model.upper()}: {e}\n{tb}"
-        write_status(status)
-        return False
+        logger.error(f"[{job.name.upper()}] Archive append failed: {e}")
+        return ""
+    return f"; archived {result.appended} new"
+
+def materialize_aggregates(job: FetchJob) -> None:
+    """Refresh the job's aggregate tables; only time buckets whose detections changed are regrouped."""
+    if not AGGREGATE_WINDOWS:
+        return
+    from src.pipeline.aggregates import aggregate_path, materialize
+    source = os.path.join(STORAGE_DIR, job.name) if INGEST_MODE == "incremental" else f"hotspots_{job.name}.csv"
+    brightness_col = "bright_ti4" if job.model.startswith("viirs") else "brightness"
+    os.makedirs(AGGREGATES_DIR, exist_ok=True)
+    for window in AGGREGATE_WINDOWS:
+        try:
+            with METRICS.span("aggregate", job=job.name):
+                result = materialize(source, aggregate_path(AGGREGATES_DIR, job.name, window), brightness_col, window)
+        except Exception as e:
+            logger.error(f"[{job.name.upper()}] Aggregates ({window} min) failed: {e}")
+            continue
+        logger.info(
+            f"[{job.name.upper()}] Aggregates ({window} min): {result.groups} groups, "
+            f"{result.buckets_updated}/{result.buckets} buckets updated, {result.buckets_removed} removed in {result.seconds:.2f}s"
+        )
+
+def build_jobs() -> List[FetchJob]:
+    """One job per (source, area). Incremental jobs only ask for the days since their high-water mark."""
+    storage = None
+    if INGEST_MODE == "incremental":
+        from src.pipeline.storage import PartitionedStorage
+        storage = PartitionedStorage(STORAGE_DIR)
+    jobs = []
+    for area, bbox in AREAS.items():
+        for model in FETCH_SOURCES:
+            name = model if area == DEFAULT_AREA else f"{model}_{area}"
+            day_range = int(DAY_RANGE)
+            if storage is not None:
+                day_range = incremental_day_range(storage.high_water(name), day_range)
+            jobs.append(FetchJob(name=name, model=model, product=SOURCES[model], bbox=bbox, day_range=day_range))
+    return jobs
+
+def load_job_status() -> Dict[str, Any]:
+    try:
+        with open("fetch_status.json") as f:
+            return json.load(f).get("jobs", {})
+    except (OSError, ValueError):
+        return {}
+
+_scheduler = None
+
+def get_scheduler() -> FetchScheduler:
+    """Create the scheduler once so its pooled connections are reused across cycles."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FetchScheduler(
+            BASE, MAP_KEY,
+            handler=ingest if INGEST_MODE == "incremental" else save_snapshot,
+            max_workers=FETCH_WORKERS,
+            timeout=FETCH_TIMEOUT_SECONDS,
+            retries=FETCH_RETRIES,
+            stale_after=STALE_AFTER_MINUTES * 60,
+        )
+        _scheduler.seed(load_job_status())
+    return _scheduler
 
 def fetch_all() -> None:
-    """Fetch all models and update status/logs."""
-    all_success = True
-    for model in SOURCES:
-        ok = fetch_and_report(model)
-        if not ok:
-            all_success = False
-    if all_success:
+    """Fetch all (source, area) jobs concurrently and update status/logs."""
+    scheduler = get_scheduler()
+    results = scheduler.run(build_jobs())
+    failed = []
+    for r in results:
+        METRICS.record_stage("fetch", r.fetch_seconds, job=r.job.name)
+        METRICS.inc("bytes_total", r.bytes, job=r.job.name)
+        METRICS.inc("jobs_total", job=r.job.name, outcome="success" if r.ok else "error")
+        if r.ok:
+            logger.info(f"[{r.job.name.upper()}] {r.summary} ({r.attempts} attempt(s), {r.elapsed:.1f}s)")
+            materialize_aggregates(r.job)
+        else:
+            logger.error(f"[{r.job.name.upper()}] Error after {r.attempts} attempt(s), {r.elapsed:.1f}s: {r.error}")
+            failed.append(f"{r.job.name.upper()}: {r.error}")
+    status["jobs"] = scheduler.job_status()
+    if failed:
+        status["status"] = "error"
+        status["message"] = "\n".join(failed)
+    else:
         status["status"] = "success"
         status["message"] = "All model fetches successful."
-        write_status(status)
         logger.info("All model fetches successful.")
+    write_status(status)
+    METRICS.set("last_cycle_timestamp_seconds", time.time())
+    try:
+        METRICS.write_textfile(METRICS_FILE)
+    except OSError as e:
+        logger.warning(f"Could not write {METRICS_FILE}: {e}")
 
 def main() -> None:
     """Main loop for scheduled fetching, or single run if RUN_ONCE is set."""
-    run_once = os.getenv("RUN_ONCE", "false").lower() in {"1","true","yes","on"}
-    logger.info(f"RUN_ONCE={run_once}, INTERVAL_MINUTES={INTERVAL_MINUTES}")
-    if run_once:
+    logger.info(f"RUN_ONCE={RUN_ONCE}, INTERVAL_MINUTES={INTERVAL_MINUTES}, INGEST_MODE={INGEST_MODE}, JOBS={len(AREAS) * len(FETCH_SOURCES)}")
+    if RUN_ONCE:
         logger.info(f"Fetching latest hotspots (single run) at {datetime.utcnow():%Y-%m-%d %H:%M:%S} UTC …")
         fetch_all()
         return
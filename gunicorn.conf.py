@@ -0,0 +1,88 @@
+"""Gunicorn settings for production serving of app.py with several worker processes.
+
+The app is imported once in the master (``preload_app``, see ``wsgi.py``) and the first workers
+are forked right away, so health checks pass within a second of start-up. The master then warms
+up in a background thread (no worker is forked while it loads, see ``pre_fork``) and gracefully
+replaces the workers (SIGHUP); the new ones share the parsed hotspot arrays, aggregate tables
+and model copy-on-write, so memory does not grow with ``WEB_CONCURRENCY``. When a source file, aggregate table or the model changes on disk, the master
+reloads it and replaces the workers the same way so the new data is shared as well; workers never
+reload on their own (with ``SHARED_RELOAD_SECONDS=0`` they do, each into its own memory). The master
+also records each change in the change feed before re-forking, so all workers serve one feed and a
+stream resumes on whichever worker it reconnects to.
+"""
+import gc
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+# Parallelism comes from the worker processes: one inference/BLAS thread each
+os.environ.setdefault("MODEL_N_JOBS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+wsgi_app = "wsgi:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# Threads serve slow clients and /changes/stream without blocking a process. Each open stream holds a
+# thread, so app.py caps them at SSE_MAX_STREAMS per worker (503 beyond) to keep threads for the rest
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "8"))
+preload_app = True
+timeout = 60
+graceful_timeout = 30
+SHARED_RELOAD_SECONDS = float(os.getenv("SHARED_RELOAD_SECONDS", "30"))
+
+
+def when_ready(server):
+    """Warm up in the master, then keep watching the shared files; re-fork the workers after each load."""
+    import app as api
+
+    def load_shared():
+        try:
+            api.warm_up()
+        except Exception as e:
+            server.log.error(f"Loading shared data failed: {e}")
+            return
+        gc.freeze()
+        os.kill(os.getpid(), signal.SIGHUP)
+
+    def watch():
+        # Load only once the first workers are forked; later forks wait in pre_fork while loading
+        deadline = time.monotonic() + 10
+        while len(server.WORKERS) < server.num_workers and time.monotonic() < deadline:
+            time.sleep(0.05)
+        versions = api.data_versions()
+        load_shared()
+        while SHARED_RELOAD_SECONDS > 0:
+            time.sleep(SHARED_RELOAD_SECONDS)
+            current = api.data_versions()
+            if current == versions:
+                continue
+            versions = current
+            server.log.info("Shared data changed; reloading in the master and replacing workers")
+            load_shared()
+
+    threading.Thread(target=watch, name="shared-data-watcher", daemon=True).start()
+
+
+def pre_fork(server, worker):
+    """Hold a (re)spawn while the master is loading: the child would copy locks held by the loading thread."""
+    import app as api
+    api.WARMUP_IDLE.wait()
+
+
+def post_fork(server, worker):
+    """While the master reloads shared files, workers serve what they inherited rather than each re-parsing it."""
+    import app as api
+    api.after_fork(shared=SHARED_RELOAD_SECONDS > 0)
+
+    # SIGTERM (graceful replacement) also ends the open change streams, which would otherwise keep
+    # the old worker and its copy of the data alive until graceful_timeout
+    handle_exit = worker.handle_exit
+
+    def on_exit(sig, frame):
+        api.shutdown()
+        handle_exit(sig, frame)
+
+    worker.handle_exit = on_exit
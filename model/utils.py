@@ -4,6 +4,50 @@ from typing import List, Dict, Tuple
 import numpy as np
 
 
+FEATURE_KEYS = [
+    "max_frp",
+    "mean_frp",
+    "std_frp",
+    "rise",
+    "decay",
+    "duration_high",
+    "count_obs",
+]
+
+
+def extract_features_batch(frp_values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Compute features for many ragged FRP sequences at once.
+
+    ``frp_values`` holds all sequences back to back (each in time order) and sequence ``i``
+    is ``frp_values[offsets[i]:offsets[i + 1]]``. Returns an ``(n_groups, 7)`` array in
+    ``FEATURE_KEYS`` order. Non-finite values are treated as 0. Sequences are reduced in
+    equal-length batches so results are bit-identical to ``extract_features_from_sequence``.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    X = np.zeros((counts.size, len(FEATURE_KEYS)), dtype=float)
+    arr = np.asarray(frp_values, dtype=float)
+    arr = np.where(np.isfinite(arr), arr, 0.0)
+
+    for length in np.unique(counts[counts > 0]):
+        rows = np.flatnonzero(counts == length)
+        block = arr[offsets[rows][:, None] + np.arange(length)]
+        max_frp = block.max(axis=1)
+        X[rows, 0] = max_frp
+        X[rows, 1] = block.mean(axis=1)
+        X[rows, 2] = block.std(axis=1)
+        if length >= 3:
+            peak_idx = block.argmax(axis=1)
+            r = np.arange(rows.size)
+            peak = block[r, peak_idx]
+            X[rows, 3] = peak - block[r, np.maximum(0, peak_idx - 1)]
+            X[rows, 4] = peak - block[r, np.minimum(length - 1, peak_idx + 1)]
+        duration_high = (block > (0.25 * max_frp)[:, None]).mean(axis=1)
+        X[rows, 5] = np.where(max_frp > 0, duration_high, 0.0)
+        X[rows, 6] = float(length)
+    return X
+
+
 def extract_features_from_sequence(frp_values: List[float]) -> Dict[str, float]:
     """Compute basic features from a sequence of FRP values.
 
@@ -12,63 +56,14 @@ def extract_features_from_sequence(frp_values: List[float]) -> Dict[str, float]:
     if frp_values is None:
         frp_values = []
     arr = np.array(frp_values, dtype=float)
-    arr[~np.isfinite(arr)] = 0.0
-    if arr.size == 0:
-        return {
-            "max_frp": 0.0,
-            "mean_frp": 0.0,
-            "std_frp": 0.0,
-            "rise": 0.0,
-            "decay": 0.0,
-            "duration_high": 0.0,
-            "count_obs": 0.0,
-        }
-
-    max_frp = float(arr.max())
-    mean_frp = float(arr.mean())
-    std_frp = float(arr.std())
-    if arr.size >= 3:
-        peak_idx = int(arr.argmax())
-        left = arr[peak_idx] - arr[max(0, peak_idx - 1)]
-        right_drop = arr[peak_idx] - arr[min(arr.size - 1, peak_idx + 1)]
-    else:
-        left = 0.0
-        right_drop = 0.0
-    duration_high = float((arr > 0.25 * max_frp).mean()) if max_frp > 0 else 0.0
-    count_obs = float(arr.size)
-
-    return {
-        "max_frp": max_frp,
-        "mean_frp": mean_frp,
-        "std_frp": std_frp,
-        "rise": float(left),
-        "decay": float(right_drop),
-        "duration_high": duration_high,
-        "count_obs": count_obs,
-    }
+    X = extract_features_batch(arr, np.array([0, arr.size]))
+    return {k: float(v) for k, v in zip(FEATURE_KEYS, X[0])}
 
 
 def vectorize_features(feature_dicts: List[Dict[str, float]]) -> Tuple[np.ndarray, List[str]]:
     """Convert a list of feature dicts into a 2D numpy array and return feature order."""
+    keys = list(FEATURE_KEYS)
     if not feature_dicts:
-        return np.zeros((0, 7), dtype=float), [
-            "max_frp",
-            "mean_frp",
-            "std_frp",
-            "rise",
-            "decay",
-            "duration_high",
-            "count_obs",
-        ]
-    keys = [
-        "max_frp",
-        "mean_frp",
-        "std_frp",
-        "rise",
-        "decay",
-        "duration_high",
-        "count_obs",
-    ]
+        return np.zeros((0, len(keys)), dtype=float), keys
     X = np.array([[fd.get(k, 0.0) for k in keys] for fd in feature_dicts], dtype=float)
     return X, keys
-
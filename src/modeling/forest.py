@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import numpy as np
+
+
+CHUNK_ROWS = 2048  # rows scored together; keeps the per-step working set cache sized
+_COMPACT_EVERY = 4  # traversal steps between dropping (row, tree) pairs that reached a leaf
+
+
+@dataclass(frozen=True)
+class FlatForest:
+    """A tree ensemble flattened into contiguous pre-order node arrays.
+
+    An internal node ``i`` sends ``x[feature[i]] <= threshold[i]`` to its left child ``i + 1``
+    and everything else to ``right[i]``. Leaves have ``right[i] == i`` and a ``-inf`` threshold,
+    so they absorb further steps; ``value`` holds each node's class probabilities. Tree ``t``
+    starts at node ``roots[t]``. Inputs are compared as float32, like
+    scikit-learn trees, so float32 thresholds (rounded down) select exactly the same leaves.
+    """
+
+    feature: np.ndarray
+    threshold: np.ndarray
+    right: np.ndarray
+    value: np.ndarray
+    roots: np.ndarray
+    classes_: np.ndarray
+    n_features_in_: int
+    max_depth: int
+
+    @property
+    def n_trees(self) -> int:
+        return int(self.roots.size)
+
+    @property
+    def n_nodes(self) -> int:
+        return int(self.feature.size)
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in (self.feature, self.threshold, self.right, self.value, self.roots)))
+
+    def _apply_chunk(self, X: np.ndarray) -> np.ndarray:
+        n = X.shape[0]
+        Xf = X.T.ravel()  # feature-major, so (feature, row) is one flat offset
+        node = np.tile(self.roots.astype(np.intp), n)
+        offset = np.repeat(np.arange(n, dtype=np.intp), self.n_trees)
+        pairs = np.arange(node.size)
+        out = np.empty(node.size, dtype=np.intp)
+        right = self.right
+        while pairs.size:
+            for _ in range(_COMPACT_EVERY):
+                go_left = Xf[self.feature[node] * n + offset] <= self.threshold[node]
+                node = np.where(go_left, node + 1, right[node])
+            done = right[node] == node
+            out[pairs[done]] = node[done]
+            pending = ~done
+            pairs, node, offset = pairs[pending], node[pending], offset[pending]
+        return out.reshape(n, self.n_trees)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached by every (row, tree); shape ``(n_rows, n_trees)``."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[0] <= CHUNK_ROWS:
+            return self._apply_chunk(X)
+        return np.vstack([self._apply_chunk(X[i:i + CHUNK_ROWS]) for i in range(0, X.shape[0], CHUNK_ROWS)])
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Mean of the per-tree leaf class probabilities, like ``RandomForestClassifier.predict_proba``."""
+        return self.value[self.apply(X)].mean(axis=1, dtype=np.float64)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def _flatten_tree(tree: Any, max_depth: Optional[int]) -> Dict[str, Any]:
+    """Pre-order node arrays of one sklearn ``tree_``, cut to ``max_depth`` and with unreachable nodes dropped."""
+    left, right = tree.children_left, tree.children_right
+    order: List[int] = []
+    depth_of: List[int] = []
+    stack = [(0, 0)]
+    while stack:
+        i, depth = stack.pop()
+        order.append(i)
+        depth_of.append(depth)
+        if left[i] != -1 and (max_depth is None or depth < max_depth):
+            stack.append((right[i], depth + 1))
+            stack.append((left[i], depth + 1))
+    order_arr = np.array(order, dtype=np.int64)
+    new_id = np.full(left.size, -1, dtype=np.int64)
+    new_id[order_arr] = np.arange(order_arr.size)
+
+    is_leaf = (left[order_arr] == -1) | (new_id[left[order_arr]] < 0)
+    value = tree.value[order_arr, 0, :].astype(np.float64)
+    value /= value.sum(axis=1, keepdims=True)
+    return {
+        "feature": np.where(is_leaf, 0, tree.feature[order_arr]),
+        "threshold": np.where(is_leaf, -np.inf, tree.threshold[order_arr]),
+        "right": np.where(is_leaf, np.arange(order_arr.size), new_id[right[order_arr]]),
+        "value": value,
+        "depth": int(max(depth_of)),
+    }
+
+
+def flatten_forest(forest: Any, float32: bool = False, max_trees: Optional[int] = None,
+                   max_depth: Optional[int] = None) -> FlatForest:
+    """Flatten a fitted ``RandomForestClassifier`` (or any ``estimators_`` of sklearn trees).
+
+    ``float32`` stores thresholds and leaf probabilities as float32 (thresholds are rounded down,
+    which keeps every split decision exact); ``max_trees`` keeps the first trees only and
+    ``max_depth`` turns deeper subtrees into leaves with their node's class distribution. Pruning
+    changes predictions; check the result with ``max_proba_error``.
+    """
+    estimators = list(forest.estimators_)[:max_trees]
+    trees = [_flatten_tree(est.tree_, max_depth) for est in estimators]
+    sizes = np.array([t["feature"].size for t in trees], dtype=np.int64)
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    right = np.concatenate([t["right"] + root for t, root in zip(trees, roots)])
+    threshold = np.concatenate([t["threshold"] for t in trees])
+    value = np.concatenate([t["value"] for t in trees])
+    if float32:
+        t32 = threshold.astype(np.float32)
+        over = t32.astype(np.float64) > threshold
+        t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+        threshold, value = t32, value.astype(np.float32)
+    index_dtype = np.int32 if sizes.sum() < 2 ** 31 else np.int64
+    n_features = int(forest.n_features_in_)
+    return FlatForest(
+        feature=np.concatenate([t["feature"] for t in trees]).astype(np.int32),
+        threshold=threshold,
+        right=right.astype(index_dtype),
+        value=value,
+        roots=roots.astype(index_dtype),
+        classes_=np.asarray(forest.classes_),
+        n_features_in_=n_features,
+        max_depth=max(t["depth"] for t in trees),
+    )
+
+
+def max_proba_error(flat: FlatForest, forest: Any, X: np.ndarray) -> float:
+    """Largest absolute difference between ``flat`` and ``forest`` ``predict_proba`` on ``X``."""
+    return float(np.abs(flat.predict_proba(X) - forest.predict_proba(X)).max()) if len(X) else 0.0
+
+
+def save_flat_forest(flat: FlatForest, path: str) -> None:
+    """Write ``flat`` as an uncompressed ``.npz`` (no pickle)."""
+    meta = {"n_features_in_": flat.n_features_in_, "max_depth": flat.max_depth}
+    with open(path, "wb") as f:
+        np.savez(
+            f,
+            feature=flat.feature, threshold=flat.threshold, right=flat.right,
+            value=flat.value, roots=flat.roots, classes_=flat.classes_.astype(str),
+            meta=np.array(json.dumps(meta)),
+        )
+
+
+def load_flat_forest(path: str) -> FlatForest:
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        return FlatForest(
+            feature=data["feature"], threshold=data["threshold"], right=data["right"],
+            value=data["value"], roots=data["roots"], classes_=data["classes_"].astype(object),
+            n_features_in_=int(meta["n_features_in_"]), max_depth=int(meta["max_depth"]),
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Export a joblib RandomForest artifact to a flat ``.npz`` and report its error on sample rows."""
+    import joblib
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("src", help="joblib model artifact (e.g. model/model_rf.pkl)")
+    parser.add_argument("dst", help="output .npz path")
+    parser.add_argument("--float32", action="store_true", help="float32 thresholds and leaf values")
+    parser.add_argument("--max-trees", type=int, default=None)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--check-rows", type=int, default=10000, help="random rows used to measure the error")
+    args = parser.parse_args(argv)
+
+    forest = joblib.load(args.src)
+    flat = flatten_forest(forest, float32=args.float32, max_trees=args.max_trees, max_depth=args.max_depth)
+    save_flat_forest(flat, args.dst)
+
+    # Sample rows around the split thresholds the forest actually uses
+    rng = np.random.default_rng(0)
+    split = flat.right != np.arange(flat.n_nodes)
+    X = np.zeros((args.check_rows, flat.n_features_in_))
+    for j in range(flat.n_features_in_):
+        thresholds = flat.threshold[split & (flat.feature == j)].astype(np.float64)
+        if thresholds.size:
+            X[:, j] = rng.choice(thresholds, args.check_rows) + rng.normal(0, 1e-3 * (np.abs(thresholds).mean() + 1e-9), args.check_rows)
+    print(json.dumps({
+        "trees": flat.n_trees,
+        "nodes": flat.n_nodes,
+        "max_depth": flat.max_depth,
+        "bytes": flat.nbytes,
+        "max_proba_error": max_proba_error(flat, forest, X),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+from model.utils import FEATURE_KEYS
+from src.modeling.forest import load_flat_forest
+
+
+def heuristic_classify(X: np.ndarray, no_signal: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Spike/persistence baseline over ``FEATURE_KEYS`` rows; returns (labels, unrounded confidences)."""
+    n = X.shape[0]
+    labels = np.full(n, "unknown", dtype=object)
+    conf = np.zeros(n, dtype=float)
+    # Baseline heuristic: explosions are sharp spikes with quick decay within ~1-3 timesteps
+    max_frp, rise, decay, persistence, count_obs = X[:, 0], X[:, 3], X[:, 4], X[:, 5], X[:, 6]
+    signal = ~no_signal
+    spike = signal & (count_obs >= 3) & (rise > 0.6 * max_frp) & (decay > 0.6 * max_frp)
+    labels[spike] = "explosion"
+    conf[spike] = np.minimum(0.99, 0.5 + (max_frp[spike] / (max_frp[spike] + 25.0)))
+    # Otherwise treat as fire if persistent signal
+    fire = signal & ~spike & (persistence > 0.5)
+    labels[fire] = "fire"
+    conf[fire] = np.minimum(0.95, 0.4 + 0.5 * persistence[fire])
+    weak = signal & ~spike & ~fire
+    conf[weak] = 0.3
+    return labels, conf
+
+
+class InferenceEngine:
+    """Batched classifier over a joblib model artifact, with warm-up and hot reload.
+
+    ``classify`` takes a whole feature matrix and returns labels and confidences in one call,
+    running ``predict_proba`` in chunks of at most ``max_batch`` rows. ``maybe_reload`` swaps in
+    a new artifact when the file's mtime/size change; a failed load keeps serving the previous
+    model. Loads are serialized: callers arriving while one is in flight wait for it rather than
+    classify without the model. Rows that fall back to the heuristic (no model loaded, or a model
+    error) are counted, and ``last_fallback`` tells a caller whether its own last call fell back.
+    With ``auto_reload`` off, a loaded model is kept and ``maybe_reload`` only loads when none is.
+    """
+
+    def __init__(self, path: str, max_batch: int = 8192, n_jobs: Optional[int] = None,
+                 logger: Optional[logging.Logger] = None, auto_reload: bool = True) -> None:
+        self.path = path
+        self.auto_reload = auto_reload
+        self.max_batch = max(1, int(max_batch))
+        self.n_jobs = n_jobs
+        self.logger = logger or logging.getLogger(__name__)
+        self.model: Any = None
+        self.classes: Optional[List[Any]] = None
+        self.version: Optional[Tuple[int, int]] = None
+        self._seen_version: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self._local = threading.local()
+        self.loaded_at: Optional[float] = None
+        self.load_seconds = 0.0
+        self.warmup_seconds = 0.0
+        self.reloads = 0
+        self.reload_failures = 0
+        self.calls = 0
+        self.rows = 0
+        self.model_rows = 0
+        self.fallback_rows: Dict[str, int] = {"no_model": 0, "error": 0}
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self) -> bool:
+        """Load and warm up the artifact at ``path``; returns False (keeping any current model) on failure."""
+        with self._load_lock:
+            return self._load(self._stat())
+
+    def _load(self, version: Optional[Tuple[int, int]]) -> bool:
+        try:
+            return version is not None and self._load_version(version)
+        finally:
+            # Marked as seen only once the attempt is over, so maybe_reload() callers wait for it
+            self._seen_version = version
+
+    def _load_version(self, version: Tuple[int, int]) -> bool:
+        t0 = time.perf_counter()
+        try:
+            # .npz artifacts are flattened forests (src/modeling/forest.py); anything else is joblib,
+            # imported here so processes that never load a pickled model don't pay for it (or sklearn)
+            if self.path.endswith(".npz"):
+                model = load_flat_forest(self.path)
+            else:
+                import joblib
+                model = joblib.load(self.path)
+            if self.n_jobs is not None and hasattr(model, "n_jobs"):
+                model.n_jobs = self.n_jobs
+            t1 = time.perf_counter()
+            # Warm-up: the first predict_proba pays for lazy allocations and thread pool start-up
+            model.predict_proba(np.zeros((min(self.max_batch, 64), len(FEATURE_KEYS))))
+        except Exception as e:
+            self.reload_failures += 1
+            self.last_error = f"load {self.path}: {e}"
+            self.logger.error(f"Failed to load ML model at {self.path}: {e}")
+            return False
+        classes = list(model.classes_) if hasattr(model, "classes_") else None
+        with self._lock:
+            replaced = self.model is not None
+            self.model, self.classes, self.version = model, classes, version
+            self.loaded_at = time.time()
+            self.load_seconds = t1 - t0
+            self.warmup_seconds = time.perf_counter() - t1
+            if replaced:
+                self.reloads += 1
+        self.logger.info(f"{'Reloaded' if replaced else 'Loaded'} ML model from {self.path} (warm-up {self.warmup_seconds * 1000:.1f} ms)")
+        return True
+
+    def maybe_reload(self) -> bool:
+        """Reload if the artifact changed since the last load attempt; True if a new model is live."""
+        if self.model is not None and not self.auto_reload:
+            return False
+        if self._stat() == self._seen_version:
+            return False
+        with self._load_lock:
+            version = self._stat()
+            if version == self._seen_version:
+                return False
+            return self._load(version)
+
+    def last_fallback(self) -> Optional[str]:
+        """Why this thread's last ``classify`` used the heuristic for some rows although a model artifact
+        exists ("no_model": it failed to load, "error": inference failed), or None."""
+        return getattr(self._local, "fallback", None)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """``predict_proba`` of the current model, in chunks of at most ``max_batch`` rows."""
+        model = self.model
+        if X.shape[0] <= self.max_batch:
+            return model.predict_proba(X)
+        return np.vstack([model.predict_proba(X[i:i + self.max_batch]) for i in range(0, X.shape[0], self.max_batch)])
+
+    def classify(self, X: np.ndarray, no_signal: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Classify a batch of feature rows; returns (event_type labels, unrounded confidences).
+
+        Rows follow ``model.utils.FEATURE_KEYS`` order; ``no_signal`` flags rows without any finite
+        FRP. Rows with observations use the model when one is loaded; the rest, and every row if
+        the model fails, use the heuristic.
+        """
+        n = X.shape[0]
+        labels = np.full(n, "unknown", dtype=object)
+        conf = np.zeros(n, dtype=float)
+        pending = np.ones(n, dtype=bool)
+        rows = np.flatnonzero(X[:, 6] > 0)
+        if self.model is None:
+            self.maybe_reload()  # waits for a load in flight (e.g. warm-up) instead of using the heuristic
+        model, classes = self.model, self.classes
+        reason = "no_model" if model is None else None
+        if model is not None and rows.size:
+            try:
+                proba = self.predict_proba(X[rows])
+                best = proba.max(axis=1)
+                # Assume label order ['explosion','fire'] if available else argmax
+                if classes is not None and 'explosion' in classes:
+                    conf_explosion = proba[:, classes.index('explosion')]
+                    is_explosion = conf_explosion >= 0.5
+                    labels[rows] = np.where(is_explosion, "explosion", "fire")
+                    conf[rows] = np.where(is_explosion, conf_explosion, best)
+                else:
+                    # Fallback if classes unknown
+                    label_idx = proba.argmax(axis=1)
+                    if classes is not None:
+                        labels[rows] = [str(classes[i]) for i in label_idx]
+                    else:
+                        labels[rows] = np.where(label_idx == 0, "explosion", "fire")
+                    conf[rows] = best
+                pending[rows] = False
+            except Exception as e:
+                reason = "error"
+                with self._counts_lock:
+                    self.errors += 1
+                    self.last_error = f"predict_proba: {e}"
+                self.logger.warning(f"Model inference failed, using heuristic for {rows.size} rows: {e}")
+
+        if pending.any():
+            h_labels, h_conf = heuristic_classify(X[pending], no_signal[pending])
+            labels[pending] = h_labels
+            conf[pending] = h_conf
+        with self._counts_lock:
+            self.calls += 1
+            self.rows += n
+            self.model_rows += int(n - pending.sum())
+            if reason is not None:
+                self.fallback_rows[reason] += int(np.count_nonzero(pending[rows]))
+        fell_back = reason is not None and bool(pending[rows].any())
+        self._local.fallback = reason if fell_back and (reason == "error" or self._stat() is not None) else None
+        return labels, conf
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counts_lock:
+            return {
+                "path": self.path,
+                "loaded": self.model is not None,
+                "model_type": type(self.model).__name__ if self.model is not None else None,
+                "mtime_ns": self.version[0] if self.version else None,
+                "file_size": self.version[1] if self.version else None,
+                "loaded_at": self.loaded_at,
+                "load_seconds": round(self.load_seconds, 6),
+                "warmup_seconds": round(self.warmup_seconds, 6),
+                "reloads": self.reloads,
+                "reload_failures": self.reload_failures,
+                "max_batch": self.max_batch,
+                "n_jobs": getattr(self.model, "n_jobs", None),
+                "calls": self.calls,
+                "rows": self.rows,
+                "model_rows": self.model_rows,
+                "fallback_rows": dict(self.fallback_rows),
+                "errors": self.errors,
+                "last_error": self.last_error,
+            }
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from itertools import product
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import hashlib
+import json
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import average_precision_score, f1_score, precision_score, recall_score, roc_auc_score
+
+from model.utils import FEATURE_KEYS, extract_features_batch
+from src.pipeline.grid import group_cells
+from src.pipeline.store import decimal_coords, file_version, load_hotspot_csv
+
+
+POSITIVE = "explosion"
+DEFAULT_GRID: Dict[str, List[Any]] = {
+    "n_estimators": [100, 300],
+    "max_depth": [None, 12],
+    "min_samples_leaf": [1, 3],
+}
+
+
+def build_features(sources: Dict[str, str], window_minutes: int, start: Optional[str] = None,
+                   end: Optional[str] = None) -> pd.DataFrame:
+    """Per (source, grid cell, time bucket) feature rows, built exactly as ``/predict`` builds them.
+
+    ``start``/``end`` (ISO, inclusive) restrict the detections read; archives and storage
+    directories then only read that range.
+    """
+    frames = []
+    lo = pd.Timestamp(start).to_pydatetime() if start else None
+    hi = pd.Timestamp(end).to_pydatetime() if end else None
+    for name, path in sources.items():
+        df = load_hotspot_csv(path, lo, hi)
+        if df.empty:
+            continue
+        ts = df["timestamp"].to_numpy(dtype="datetime64[ns]")
+        lat, lon = decimal_coords(df["latitude"]), decimal_coords(df["longitude"])
+        keep = ~np.isnat(ts) & np.isfinite(lat) & np.isfinite(lon)
+        groups = group_cells(lat[keep], lon[keep], ts[keep], window_minutes)
+        frps = df["frp"].to_numpy(dtype=float)[keep][groups.order] if "frp" in df.columns else np.zeros(groups.order.size)
+        X = extract_features_batch(frps, groups.offsets)
+        frame = pd.DataFrame(X, columns=FEATURE_KEYS)
+        frame.insert(0, "source", name)
+        frame.insert(1, "cell_lat", groups.cell_lat)
+        frame.insert(2, "cell_lon", groups.cell_lon)
+        frame.insert(3, "bucket", groups.bucket)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=["source", "cell_lat", "cell_lon", "bucket"] + FEATURE_KEYS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def weak_labels(features: pd.DataFrame) -> np.ndarray:
+    """Notebook weak labels: a sharp spike (rise and decay above 60% of max FRP) is an explosion."""
+    max_frp, rise, decay = features["max_frp"], features["rise"], features["decay"]
+    return np.where((rise > 0.6 * max_frp) & (decay > 0.6 * max_frp), POSITIVE, "fire")
+
+
+def attach_labels(features: pd.DataFrame, labels_path: Optional[str]) -> np.ndarray:
+    """Labels from a CSV keyed by (source, cell_lat, cell_lon, bucket) with a ``label`` column;
+    groups it does not cover fall back to the weak labels."""
+    y = weak_labels(features)
+    if labels_path:
+        labels = pd.read_csv(labels_path, parse_dates=["bucket"])
+        merged = features[["source", "cell_lat", "cell_lon", "bucket"]].merge(
+            labels[["source", "cell_lat", "cell_lon", "bucket", "label"]], how="left", on=["source", "cell_lat", "cell_lon", "bucket"]
+        )
+        known = merged["label"].notna().to_numpy()
+        y[known] = merged["label"].to_numpy()[known]
+    return y
+
+
+def temporal_folds(buckets: np.ndarray, n_folds: int, gap_buckets: int = 1) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Forward-chaining folds over whole time buckets: fold ``k`` trains on the earliest buckets and
+    tests on the next block, skipping ``gap_buckets`` in between so adjacent windows do not leak."""
+    times = np.unique(buckets)
+    blocks = np.array_split(times, n_folds + 1)
+    folds = []
+    for k in range(1, n_folds + 1):
+        if blocks[k].size == 0:
+            continue
+        train_end = blocks[k - 1][-1] if blocks[k - 1].size else None
+        if train_end is None:
+            continue
+        cut = np.searchsorted(times, train_end, side="right")
+        test_times = blocks[k][gap_buckets:] if blocks[k].size > gap_buckets else blocks[k][-1:]
+        train = np.flatnonzero(buckets <= times[cut - 1])
+        test = np.flatnonzero(np.isin(buckets, test_times))
+        folds.append((train, test))
+    return folds
+
+
+def _cache_key(sources: Dict[str, str], window_minutes: int, n_folds: int, gap_buckets: int, labels_path: Optional[str],
+               start: Optional[str] = None, end: Optional[str] = None) -> str:
+    spec = {
+        "sources": {name: [os.path.abspath(path), list(file_version(path))] for name, path in sorted(sources.items())},
+        "window_minutes": window_minutes,
+        "n_folds": n_folds,
+        "gap_buckets": gap_buckets,
+        "labels": [os.path.abspath(labels_path), list(file_version(labels_path))] if labels_path else None,
+        "features": FEATURE_KEYS,
+        "range": [start, end],
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def prepare_folds(sources: Dict[str, str], window_minutes: int, n_folds: int, gap_buckets: int,
+                  labels_path: Optional[str], cache_dir: str, start: Optional[str] = None,
+                  end: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """Build (or reuse) the cached feature matrix and per-fold ``.npy`` arrays; returns (cache path, summary)."""
+    path = os.path.join(cache_dir, _cache_key(sources, window_minutes, n_folds, gap_buckets, labels_path, start, end))
+    summary_path = os.path.join(path, "summary.json")
+    if os.path.exists(summary_path):
+        with open(summary_path) as f:
+            summary = json.load(f)
+        summary["cache_hit"] = True
+        return path, summary
+
+    t0 = time.perf_counter()
+    features = build_features(sources, window_minutes, start, end)
+    y = attach_labels(features, labels_path)
+    X = features[FEATURE_KEYS].to_numpy(dtype=np.float64)
+    buckets = features["bucket"].to_numpy(dtype="datetime64[ns]")
+    folds = temporal_folds(buckets, n_folds, gap_buckets)
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, "X.npy"), X)
+    np.save(os.path.join(tmp, "y.npy"), y.astype(str))
+    fold_info = []
+    for k, (train, test) in enumerate(folds):
+        fold_dir = os.path.join(tmp, f"fold_{k}")
+        os.makedirs(fold_dir, exist_ok=True)
+        for name, arr in (("X_train", X[train]), ("y_train", y[train].astype(str)), ("X_test", X[test]), ("y_test", y[test].astype(str))):
+            np.save(os.path.join(fold_dir, f"{name}.npy"), arr)
+        fold_info.append({
+            "train_rows": int(train.size),
+            "test_rows": int(test.size),
+            "train_end": str(buckets[train].max()) if train.size else None,
+            "test_start": str(buckets[test].min()) if test.size else None,
+            "test_end": str(buckets[test].max()) if test.size else None,
+            "test_positives": int((y[test] == POSITIVE).sum()),
+        })
+    summary = {
+        "rows": int(X.shape[0]),
+        "positives": int((y == POSITIVE).sum()),
+        "sources": {name: int((features["source"] == name).sum()) for name in sources},
+        "window_minutes": window_minutes,
+        "first_bucket": str(buckets.min()) if buckets.size else None,
+        "last_bucket": str(buckets.max()) if buckets.size else None,
+        "folds": fold_info,
+        "build_seconds": round(time.perf_counter() - t0, 3),
+    }
+    with open(os.path.join(tmp, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp, path)
+    summary["cache_hit"] = False
+    return path, summary
+
+
+def _fit_score(params: Dict[str, Any], fold_dir: str, seed: int) -> Dict[str, Any]:
+    """Fit one forest on a cached fold (memory-mapped) and score it on the fold's test block."""
+    load = lambda name: np.load(os.path.join(fold_dir, f"{name}.npy"), mmap_mode="r")
+    X_train, y_train, X_test, y_test = load("X_train"), load("y_train"), load("X_test"), load("y_test")
+    t0 = time.perf_counter()
+    clf = RandomForestClassifier(random_state=seed, class_weight="balanced_subsample", n_jobs=1, **params)
+    clf.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - t0
+    pred = clf.predict(X_test)
+    scores = {
+        "f1": float(f1_score(y_test, pred, pos_label=POSITIVE, zero_division=0)),
+        "precision": float(precision_score(y_test, pred, pos_label=POSITIVE, zero_division=0)),
+        "recall": float(recall_score(y_test, pred, pos_label=POSITIVE, zero_division=0)),
+        "pr_auc": None,
+        "roc_auc": None,
+    }
+    classes = list(clf.classes_)
+    if POSITIVE in classes and len(set(np.asarray(y_test).tolist())) == 2:
+        proba = clf.predict_proba(X_test)[:, classes.index(POSITIVE)]
+        truth = np.asarray(y_test) == POSITIVE
+        scores["pr_auc"] = float(average_precision_score(truth, proba))
+        scores["roc_auc"] = float(roc_auc_score(truth, proba))
+    return {"params": params, "fold": os.path.basename(fold_dir), "fit_seconds": round(fit_seconds, 3), **scores}
+
+
+def param_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in product(*(grid[k] for k in keys))]
+
+
+def run(sources: Dict[str, str], out_dir: str, cache_dir: str, window_minutes: int = 180, n_folds: int = 4,
+        gap_buckets: int = 1, grid: Optional[Dict[str, Sequence[Any]]] = None, n_jobs: int = -1,
+        labels_path: Optional[str] = None, scoring: str = "f1", seed: int = 42, start: Optional[str] = None,
+        end: Optional[str] = None) -> Dict[str, Any]:
+    """Temporal CV + parallel grid search, then refit the best parameters on all rows.
+
+    Writes ``model_rf_{version}.pkl`` and ``metrics_{version}.json`` to ``out_dir`` and returns the metrics.
+    """
+    cache_path, summary = prepare_folds(sources, window_minutes, n_folds, gap_buckets, labels_path, cache_dir, start, end)
+    fold_dirs = [os.path.join(cache_path, f"fold_{k}") for k, info in enumerate(summary["folds"]) if info["test_rows"]]
+    if not fold_dirs:
+        raise ValueError("Not enough history for temporal cross-validation")
+    candidates = param_grid(grid or DEFAULT_GRID)
+
+    t0 = time.perf_counter()
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_score)(params, fold_dir, seed) for params in candidates for fold_dir in fold_dirs
+    )
+    search_seconds = time.perf_counter() - t0
+
+    ranking = []
+    for params in candidates:
+        rows = [r for r in results if r["params"] == params]
+        scored = [r[scoring] for r in rows if r[scoring] is not None]
+        ranking.append({
+            "params": params,
+            "mean_" + scoring: float(np.mean(scored)) if scored else None,
+            "mean_f1": float(np.mean([r["f1"] for r in rows])),
+            "folds": rows,
+        })
+    ranking.sort(key=lambda r: -1.0 if r["mean_" + scoring] is None else r["mean_" + scoring], reverse=True)
+    best = ranking[0]["params"]
+
+    X = np.load(os.path.join(cache_path, "X.npy"))
+    y = np.load(os.path.join(cache_path, "y.npy"))
+    t1 = time.perf_counter()
+    clf = RandomForestClassifier(random_state=seed, class_weight="balanced_subsample", n_jobs=n_jobs, **best)
+    clf.fit(X, y)
+    clf.n_jobs = None  # serving sets its own n_jobs (MODEL_N_JOBS)
+    refit_seconds = time.perf_counter() - t1
+
+    data_hash = os.path.basename(cache_path)
+    version = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{data_hash[:8]}"
+    os.makedirs(out_dir, exist_ok=True)
+    model_path = os.path.join(out_dir, f"model_rf_{version}.pkl")
+    joblib.dump(clf, model_path)
+    metrics = {
+        "version": version,
+        "model_path": model_path,
+        "feature_keys": FEATURE_KEYS,
+        "classes": [str(c) for c in clf.classes_],
+        "best_params": best,
+        "scoring": scoring,
+        "cv": ranking,
+        "data": summary,
+        "cache_path": cache_path,
+        "timings": {
+            "search_seconds": round(search_seconds, 3),
+            "refit_seconds": round(refit_seconds, 3),
+            "fits": len(results),
+        },
+    }
+    with open(os.path.join(out_dir, f"metrics_{version}.json"), "w") as f:
+        json.dump(metrics, f, indent=2, default=str)
+    return metrics
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Train the /predict RandomForest from stored hotspot history with temporal CV and a parallel grid search."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--source", action="append", default=[], metavar="NAME=PATH",
+                        help="hotspot CSV, partitioned storage or archive directory (repeatable; default: both CSVs)")
+    parser.add_argument("--from", dest="start", default=None, help="first detection time to train on (ISO)")
+    parser.add_argument("--to", dest="end", default=None, help="last detection time to train on (ISO)")
+    parser.add_argument("--out-dir", default=os.path.join("model", "artifacts"))
+    parser.add_argument("--cache-dir", default=os.path.join("data", "feature_cache"))
+    parser.add_argument("--window-minutes", type=int, default=180)
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--gap-buckets", type=int, default=1)
+    parser.add_argument("--grid", default=None, help="JSON dict of RandomForest parameter lists")
+    parser.add_argument("--scoring", default="f1", choices=["f1", "precision", "recall", "pr_auc", "roc_auc"])
+    parser.add_argument("--labels", default=None, help="CSV of source,cell_lat,cell_lon,bucket,label (default: weak labels)")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--publish", default=None, help="also copy the artifact here (e.g. model/model_rf.pkl) for the API to hot-reload")
+    args = parser.parse_args(argv)
+
+    sources = dict(s.split("=", 1) for s in args.source) or {"viirs": "hotspots_viirs.csv", "modis": "hotspots_modis.csv"}
+    metrics = run(
+        sources, args.out_dir, args.cache_dir, window_minutes=args.window_minutes, n_folds=args.folds,
+        gap_buckets=args.gap_buckets, grid=json.loads(args.grid) if args.grid else None, n_jobs=args.n_jobs,
+        labels_path=args.labels, scoring=args.scoring, seed=args.seed, start=args.start, end=args.end,
+    )
+    if args.publish:
+        tmp = f"{args.publish}.tmp"
+        joblib.dump(joblib.load(metrics["model_path"]), tmp)
+        os.replace(tmp, args.publish)
+    top = metrics["cv"][0]
+    print(json.dumps({
+        "version": metrics["version"],
+        "best_params": metrics["best_params"],
+        f"mean_{args.scoring}": top[f"mean_{args.scoring}"],
+        "rows": metrics["data"]["rows"],
+        "cache_hit": metrics["data"]["cache_hit"],
+        "timings": metrics["timings"],
+    }, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from model.utils import extract_features_batch
+from src.pipeline.grid import GRID_CELLS_PER_DEGREE, group_cells, grid_indices, segment_finite_count, segment_max, time_buckets
+from src.pipeline.archive import is_archive
+from src.pipeline.index import SpatioTemporalIndex
+from src.pipeline.storage import read_manifest
+from src.pipeline.store import decimal_coords, file_version, load_hotspot_csv
+
+
+AGGREGATE_COLUMNS = ["lat_idx", "lon_idx", "bucket", "acq_start", "acq_end", "count", "max_frp", "max_brightness", "no_signal"]
+_ORDINAL_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+@dataclass(frozen=True)
+class AggregateTable:
+    """Per (grid cell, time bucket) aggregates of one hotspot source for one window size.
+
+    Rows are in ``group_cells`` order (cell latitude, cell longitude, bucket); ``features`` holds
+    the ``FEATURE_KEYS`` rows ``/predict`` classifies. ``source_version`` is the ``file_version``
+    of the data the table was built from, and the ``sig_*`` arrays fingerprint each bucket's
+    detections so a rebuild can tell which buckets changed. ``source_parts`` counts the part files
+    per day of a partitioned storage source, so the next rebuild knows which days were appended to.
+    ``index`` looks groups up by cell centre and bucket time.
+    """
+
+    columns: Dict[str, np.ndarray]
+    features: np.ndarray
+    window_minutes: int
+    cells_per_degree: int
+    has_frp: bool
+    has_brightness: bool
+    source_version: Tuple[int, int]
+    sig_buckets: np.ndarray
+    sig_values: np.ndarray
+    index: SpatioTemporalIndex
+    source_parts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def rows(self) -> int:
+        return int(self.features.shape[0])
+
+    def interior(self, bbox: Tuple[float, float, float, float], start: Optional[np.datetime64],
+                 end: Optional[np.datetime64]) -> np.ndarray:
+        """Groups with ``start <= bucket < end`` whose whole cell lies inside ``bbox``.
+
+        Every detection of such a cell is inside the bbox, so its group equals the one computed
+        from the bbox-filtered rows; cells straddling an edge have to be computed from raw rows.
+        """
+        h = _half_cell(self.cells_per_degree)
+        lon_min, lat_min, lon_max, lat_max = bbox
+        return self.index.query((lon_min + h, lat_min + h, lon_max - h, lat_max - h), start, end)
+
+
+@dataclass(frozen=True)
+class MaterializeResult:
+    """Outcome of one ``materialize`` call."""
+
+    path: str
+    groups: int
+    buckets: int
+    buckets_updated: int
+    buckets_removed: int
+    seconds: float
+
+
+def _half_cell(cells_per_degree: int) -> float:
+    # Slightly over half a cell, so float rounding never counts an edge cell as interior
+    return 0.5 / cells_per_degree + 1e-7
+
+
+def border_strips(bbox: Tuple[float, float, float, float], cells_per_degree: int = GRID_CELLS_PER_DEGREE):
+    """The four strips of ``bbox`` holding every detection whose cell is not fully inside it."""
+    lon_min, lat_min, lon_max, lat_max = bbox
+    w = 2 * _half_cell(cells_per_degree)
+    return [
+        (lon_min, lat_min, lon_max, min(lat_min + w, lat_max)),
+        (lon_min, max(lat_max - w, lat_min), lon_max, lat_max),
+        (lon_min, lat_min, min(lon_min + w, lon_max), lat_max),
+        (max(lon_max - w, lon_min), lat_min, lon_max, lat_max),
+    ]
+
+
+def border_rows(index: SpatioTemporalIndex, bbox: Tuple[float, float, float, float], start: Optional[np.datetime64],
+                end: Optional[np.datetime64], cells_per_degree: int = GRID_CELLS_PER_DEGREE) -> np.ndarray:
+    """Ascending raw row positions inside ``bbox`` and the time range whose cell is not interior.
+
+    The complement of ``AggregateTable.interior``: together they cover every detection in the bbox.
+    """
+    parts = [index.query(strip, start, end) for strip in border_strips(bbox, cells_per_degree)]
+    rows = np.unique(np.concatenate(parts))
+    lat_idx, lon_idx = grid_indices(index.lat[rows], index.lon[rows], cells_per_degree)
+    h = _half_cell(cells_per_degree)
+    lon_min, lat_min, lon_max, lat_max = bbox
+    cell_lat, cell_lon = lat_idx / float(cells_per_degree), lon_idx / float(cells_per_degree)
+    inside = (cell_lon >= lon_min + h) & (cell_lon <= lon_max - h) & (cell_lat >= lat_min + h) & (cell_lat <= lat_max - h)
+    return rows[~inside]
+
+
+def compute_aggregates(lat: np.ndarray, lon: np.ndarray, ts: np.ndarray, frp: Optional[np.ndarray],
+                       brightness: Optional[np.ndarray], window_minutes: int,
+                       cells_per_degree: int = GRID_CELLS_PER_DEGREE,
+                       source_mask: Optional[np.ndarray] = None) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Group detections (already filtered to valid times/coordinates) exactly as ``/predict`` does.
+
+    Returns the ``AGGREGATE_COLUMNS`` arrays and the feature matrix, in ``group_cells`` order.
+    With ``source_mask`` (integer bit flags per detection) a ``sources`` column ORs each group's flags.
+    """
+    groups = group_cells(lat, lon, ts, window_minutes, cells_per_degree)
+    starts, ends = groups.offsets[:-1], groups.offsets[1:] - 1
+    frps = frp[groups.order] if frp is not None else np.zeros(groups.order.size, dtype=float)
+    times = np.asarray(ts, dtype="datetime64[ns]")[groups.order]
+    n = groups.n_groups
+    columns = {
+        "lat_idx": np.rint(groups.cell_lat * cells_per_degree).astype(np.int64),
+        "lon_idx": np.rint(groups.cell_lon * cells_per_degree).astype(np.int64),
+        "bucket": groups.bucket.astype("datetime64[ns]"),
+        "acq_start": times[starts],
+        "acq_end": times[ends],
+        "count": groups.counts.astype(np.int64),
+        "max_frp": segment_max(frps, groups.offsets) if frp is not None else np.full(n, np.nan),
+        "max_brightness": segment_max(brightness[groups.order], groups.offsets) if brightness is not None else np.full(n, np.nan),
+        "no_signal": segment_finite_count(frps, groups.offsets) == 0,
+    }
+    if source_mask is not None:
+        columns["sources"] = (np.bitwise_or.reduceat(source_mask[groups.order], groups.offsets[:-1])
+                              if n else np.zeros(0, dtype=source_mask.dtype))
+    return columns, extract_features_batch(frps, groups.offsets)
+
+
+def valid_columns(df: pd.DataFrame, brightness_col: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+    """(lat, lon, timestamp, frp, brightness) of the rows ``/predict`` would group, in frame order."""
+    ts = df["timestamp"].to_numpy(dtype="datetime64[ns]")
+    lat, lon = decimal_coords(df["latitude"]), decimal_coords(df["longitude"])
+    keep = ~np.isnat(ts) & np.isfinite(lat) & np.isfinite(lon)
+    frp = df["frp"].to_numpy(dtype=float)[keep] if "frp" in df.columns else None
+    brightness = df[brightness_col].to_numpy(dtype=float)[keep] if brightness_col in df.columns else None
+    return lat[keep], lon[keep], ts[keep], frp, brightness
+
+
+def bucket_signatures(lat: np.ndarray, lon: np.ndarray, ts: np.ndarray, frp: Optional[np.ndarray],
+                      brightness: Optional[np.ndarray], window_minutes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Order-sensitive fingerprint of the detections in each time bucket; returns (buckets, signatures)."""
+    bucket = time_buckets(ts, window_minutes)
+    if bucket.size == 0:
+        return bucket, np.zeros(0, dtype=np.uint64)
+    cols = {"lat": lat, "lon": lon, "ts": ts.astype(np.int64)}
+    if frp is not None:
+        cols["frp"] = frp
+    if brightness is not None:
+        cols["brightness"] = brightness
+    h = pd.util.hash_pandas_object(pd.DataFrame(cols), index=False).to_numpy(dtype=np.uint64)
+    order = np.argsort(bucket, kind="stable")
+    sorted_buckets = bucket[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_buckets[1:] != sorted_buckets[:-1])))
+    # Weight each row by its position within the bucket, so reordered ties change the signature
+    ordinal = np.arange(order.size, dtype=np.uint64) - np.repeat(starts, np.diff(np.append(starts, order.size))).astype(np.uint64)
+    weighted = h[order] * (ordinal * _ORDINAL_MIX | np.uint64(1))
+    return sorted_buckets[starts], np.add.reduceat(weighted, starts)
+
+
+def sort_groups(columns: Dict[str, np.ndarray], features: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    order = np.lexsort((columns["bucket"], columns["lon_idx"], columns["lat_idx"]))
+    return {k: v[order] for k, v in columns.items()}, features[order]
+
+
+def _build_table(columns: Dict[str, np.ndarray], features: np.ndarray, meta: Dict[str, Any],
+                 sig_buckets: np.ndarray, sig_values: np.ndarray) -> AggregateTable:
+    cpd = int(meta["cells_per_degree"])
+    index = SpatioTemporalIndex(columns["lat_idx"] / float(cpd), columns["lon_idx"] / float(cpd), columns["bucket"])
+    return AggregateTable(
+        columns=columns,
+        features=features,
+        window_minutes=int(meta["window_minutes"]),
+        cells_per_degree=cpd,
+        has_frp=bool(meta["has_frp"]),
+        has_brightness=bool(meta["has_brightness"]),
+        source_version=tuple(meta["source_version"]),
+        sig_buckets=sig_buckets,
+        sig_values=sig_values,
+        index=index,
+        source_parts=dict(meta.get("source_parts", {})),
+    )
+
+
+def aggregate_path(root: str, name: str, window_minutes: int) -> str:
+    return os.path.join(root, f"{name}_w{int(window_minutes)}.npz")
+
+
+def save_aggregates(table: AggregateTable, path: str) -> None:
+    """Write ``table`` as an uncompressed ``.npz`` (no pickle), replacing ``path`` atomically."""
+    meta = {
+        "window_minutes": table.window_minutes,
+        "cells_per_degree": table.cells_per_degree,
+        "has_frp": table.has_frp,
+        "has_brightness": table.has_brightness,
+        "source_version": list(table.source_version),
+        "source_parts": table.source_parts,
+    }
+    arrays = {k: (v.astype(np.int64) if v.dtype.kind == "M" else v) for k, v in table.columns.items()}
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, features=table.features, sig_buckets=table.sig_buckets.astype(np.int64),
+                 sig_values=table.sig_values, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, path)
+
+
+def load_aggregates(path: str) -> AggregateTable:
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        columns = {k: data[k] for k in AGGREGATE_COLUMNS}
+        for k in ("bucket", "acq_start", "acq_end"):
+            columns[k] = columns[k].astype("datetime64[ns]")
+        return _build_table(columns, data["features"], meta, data["sig_buckets"].astype("datetime64[ns]"), data["sig_values"])
+
+
+def _partition_counts(source_path: str) -> Dict[str, int]:
+    """Part files per day of a partitioned storage directory; {} for CSVs and archives."""
+    if not os.path.isdir(source_path) or is_archive(source_path):
+        return {}
+    return {day: len(parts) for day, parts in read_manifest(source_path)["days"].items()}
+
+
+def _appended_since(previous: AggregateTable, parts: Dict[str, int], window_minutes: int) -> Optional[np.datetime64]:
+    """Start of the first bucket appends since ``previous`` was built can touch, or None if unknown.
+
+    Storage only ever adds part files, so a day whose part count is unchanged holds the same rows
+    and every bucket before the first changed day keeps its stored groups and signatures.
+    """
+    if not parts or not previous.source_parts:
+        return None
+    if any(parts.get(day, 0) < n for day, n in previous.source_parts.items()):
+        return None  # parts disappeared: not an append
+    changed = [day for day, n in parts.items() if n != previous.source_parts.get(day)]
+    if not changed:
+        return previous.sig_buckets[-1] + np.timedelta64(int(window_minutes), "m") if previous.sig_buckets.size else None
+    return time_buckets(np.array([min(changed)], dtype="datetime64[ns]"), window_minutes)[0]
+
+
+def _read_rows(source_path: str, brightness_col: str, since: Optional[np.datetime64]):
+    df = load_hotspot_csv(source_path, pd.Timestamp(since) if since is not None else None)
+    if df.empty:
+        return np.zeros(0), np.zeros(0), np.zeros(0, dtype="datetime64[ns]"), None, None
+    return valid_columns(df, brightness_col)
+
+
+def materialize(source_path: str, out_path: str, brightness_col: str, window_minutes: int,
+                cells_per_degree: int = GRID_CELLS_PER_DEGREE) -> MaterializeResult:
+    """Bring the aggregate table at ``out_path`` up to date with the hotspot data at ``source_path``.
+
+    Buckets whose detections are unchanged since the last run keep their stored groups; only new
+    or changed buckets are regrouped, and buckets that disappeared (e.g. slid out of an overwrite
+    window) are dropped. Partitioned storage is read and fingerprinted only from the first bucket
+    of the earliest day appended to since the last run; CSVs and archives are read in full. Rows
+    are read in the same order the API store reads them, so stored groups are identical to the
+    ones ``/predict`` would compute from raw detections.
+    """
+    t0 = time.perf_counter()
+    version = file_version(source_path)
+    parts = _partition_counts(source_path)
+
+    previous = None
+    if os.path.exists(out_path):
+        try:
+            previous = load_aggregates(out_path)
+        except Exception:
+            previous = None
+    if previous is not None and (previous.window_minutes != int(window_minutes)
+                                 or previous.cells_per_degree != int(cells_per_degree)):
+        previous = None
+
+    since = _appended_since(previous, parts, window_minutes) if previous is not None else None
+    lat, lon, ts, frp, brightness = _read_rows(source_path, brightness_col, since)
+    has_frp, has_brightness = frp is not None, brightness is not None
+    if since is not None and ts.size == 0:
+        has_frp, has_brightness = previous.has_frp, previous.has_brightness
+    elif since is not None and (has_frp, has_brightness) != (previous.has_frp, previous.has_brightness):
+        since = None  # columns changed: regroup everything
+        lat, lon, ts, frp, brightness = _read_rows(source_path, brightness_col, None)
+        has_frp, has_brightness = frp is not None, brightness is not None
+    sig_buckets, sig_values = bucket_signatures(lat, lon, ts, frp, brightness, window_minutes)
+    if since is not None:
+        earlier = previous.sig_buckets < since
+        sig_buckets = np.concatenate([previous.sig_buckets[earlier], sig_buckets])
+        sig_values = np.concatenate([previous.sig_values[earlier], sig_values])
+
+    meta = {
+        "window_minutes": int(window_minutes),
+        "cells_per_degree": int(cells_per_degree),
+        "has_frp": has_frp,
+        "has_brightness": has_brightness,
+        "source_version": list(version),
+        "source_parts": parts,
+    }
+    if previous is not None and (previous.has_frp != has_frp or previous.has_brightness != has_brightness):
+        previous = None
+
+    if previous is None:
+        dirty = sig_buckets
+        keep_old = None
+    else:
+        # Both signature arrays are sorted by bucket
+        pos = np.minimum(np.searchsorted(previous.sig_buckets, sig_buckets), max(previous.sig_buckets.size - 1, 0))
+        unchanged = np.zeros(sig_buckets.size, dtype=bool)
+        if previous.sig_buckets.size:
+            unchanged = (previous.sig_buckets[pos] == sig_buckets) & (previous.sig_values[pos] == sig_values)
+        dirty = sig_buckets[~unchanged]
+        keep_old = np.isin(previous.columns["bucket"], sig_buckets[unchanged])
+
+    rows = np.flatnonzero(np.isin(time_buckets(ts, window_minutes), dirty))
+    columns, features = compute_aggregates(
+        lat[rows], lon[rows], ts[rows],
+        frp[rows] if frp is not None else None,
+        brightness[rows] if brightness is not None else None,
+        window_minutes, cells_per_degree,
+    )
+    if keep_old is not None:
+        columns = {k: np.concatenate([previous.columns[k][keep_old], v]) for k, v in columns.items()}
+        features = np.vstack([previous.features[keep_old], features])
+        columns, features = sort_groups(columns, features)
+
+    table = _build_table(columns, features, meta, sig_buckets, sig_values)
+    save_aggregates(table, out_path)
+    removed = 0 if previous is None else int(np.count_nonzero(~np.isin(previous.sig_buckets, sig_buckets)))
+    return MaterializeResult(
+        path=out_path,
+        groups=table.rows,
+        buckets=int(sig_buckets.size),
+        buckets_updated=int(dirty.size),
+        buckets_removed=removed,
+        seconds=time.perf_counter() - t0,
+    )
+
+
+class AggregateStore:
+    """Process-wide cache of materialized aggregate tables, reloaded when their file changes
+    (with ``auto_reload`` off a loaded table is kept until the process ends)."""
+
+    def __init__(self, root: str, auto_reload: bool = True) -> None:
+        self.root = root
+        self.auto_reload = auto_reload
+        self._tables: Dict[Tuple[str, int], Tuple[Tuple[int, int], AggregateTable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, window_minutes: int, source_version: Tuple[int, int]) -> Optional[AggregateTable]:
+        """The table for (source, window) if one exists and was built from ``source_version``, else None."""
+        path = aggregate_path(self.root, name, window_minutes)
+        key = (name, int(window_minutes))
+        cached = self._tables.get(key)
+        if cached is not None and not self.auto_reload:
+            version = cached[0]
+        else:
+            try:
+                version = file_version(path)
+            except OSError:
+                self.misses += 1
+                return None
+        with self._lock:
+            cached = self._tables.get(key)
+            if cached is None or cached[0] != version:
+                try:
+                    cached = (version, load_aggregates(path))
+                except Exception:
+                    self.misses += 1
+                    return None
+                self._tables[key] = cached
+        table = cached[1]
+        if table.source_version != tuple(source_version):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return table
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tables = {f"{m}:{w}": {"groups": t.rows, "source_version": list(t.source_version)} for (m, w), (_, t) in self._tables.items()}
+        return {"root": self.root, "hits": self.hits, "misses": self.misses, "tables": tables}
@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+from src.pipeline.grid import parse_timestamps
+
+
+ARCHIVE_MANIFEST = "_archive.json"
+ARCHIVE_FORMAT = 1
+COORD_COLUMNS = ("latitude", "longitude")
+KEY_COLUMNS = ("latitude", "longitude", "timestamp", "satellite")  # DEDUP_KEYS, with acq_date/acq_time as one timestamp
+TimeLike = Any  # datetime, np.datetime64, pd.Timestamp or ISO string
+
+
+@dataclass(frozen=True)
+class ArchiveAppendResult:
+    """Outcome of one archive append."""
+
+    received: int
+    appended: int
+    duplicates: int
+    segments_written: int
+    high_water: Optional[str]
+
+
+def is_archive(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, ARCHIVE_MANIFEST))
+
+
+def _ns(value: Optional[TimeLike]) -> Optional[int]:
+    if value is None:
+        return None
+    return int(pd.Timestamp(value).as_unit("ns").value)
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _column_spec(name: str, series: pd.Series) -> Dict[str, Any]:
+    """Fixed-width on-disk type for a column: float32 coordinates, int64/float64 numbers,
+    datetime64[ns] times and int32 dictionary codes for everything else."""
+    if name in COORD_COLUMNS:
+        return {"name": name, "dtype": "<f4"}
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return {"name": name, "dtype": "<M8[ns]"}
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return {"name": name, "dtype": "<i8"}
+    if pd.api.types.is_float_dtype(series):
+        return {"name": name, "dtype": "<f8"}
+    return {"name": name, "dtype": "<i4", "dictionary": []}
+
+
+def _encode(series: Optional[pd.Series], spec: Dict[str, Any], n: int) -> np.ndarray:
+    """Values of ``series`` in ``spec``'s on-disk type; new dictionary entries are appended to ``spec``.
+
+    Missing columns and values become NaN/NaT, -1 for integers and code -1 for dictionary columns.
+    """
+    dtype = np.dtype(spec["dtype"])
+    if "dictionary" in spec:
+        if series is None:
+            return np.full(n, -1, dtype=dtype)
+        values = series.astype(object)
+        values = values.where(values.isna(), values.astype(str))
+        dictionary = spec["dictionary"]
+        known = set(dictionary)
+        dictionary.extend(v for v in pd.unique(values.dropna()) if v not in known)
+        return pd.Categorical(values, categories=dictionary).codes.astype(dtype)
+    if dtype.kind == "M":
+        if series is None:
+            return np.full(n, np.datetime64("NaT"), dtype=dtype)
+        return pd.to_datetime(series).to_numpy(dtype=dtype)
+    if series is None:
+        return np.full(n, -1 if dtype.kind == "i" else np.nan, dtype=dtype)
+    numeric = pd.to_numeric(series, errors="coerce")
+    if dtype.kind == "i":
+        numeric = numeric.fillna(-1)
+    return numeric.to_numpy(dtype=dtype)
+
+
+def _key_hashes(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """Hash of each row's detection key (decimal lat/lon, timestamp, satellite code)."""
+    n = len(columns["timestamp"])
+    frame = pd.DataFrame({
+        k: np.round(columns[k].astype(np.float64), 5) if k in COORD_COLUMNS else columns[k]
+        for k in KEY_COLUMNS if k in columns
+    })
+    if frame.empty:
+        return np.zeros(n, dtype=np.uint64)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+class HotspotArchive:
+    """Append-only, memory-mapped columnar archive of one source's detections, for long histories.
+
+    Layout: ``{path}/seg-NNNNNN/{column}.bin`` raw fixed-width little-endian columns, rows sorted
+    by ``timestamp`` inside each segment, plus an ``_archive.json`` manifest with the column types,
+    text dictionaries and per-segment row count and time range. Opening reads only the manifest;
+    reads binary-search the memory-mapped timestamps of the segments overlapping the requested
+    range and map only those rows, so memory follows the slice touched. Appends in
+    time order extend the last segment in place (the manifest row count is the commit point);
+    late detections go to a new segment until ``compact`` merges them. One writer at a time.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Re-read the manifest, e.g. after another process appended."""
+        manifest_path = os.path.join(self.path, ARCHIVE_MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"format": ARCHIVE_FORMAT, "columns": [], "segments": [], "rows": 0, "next_segment": 0}
+
+    @property
+    def rows(self) -> int:
+        return int(self.manifest["rows"])
+
+    @property
+    def columns(self) -> List[str]:
+        return [c["name"] for c in self.manifest["columns"]]
+
+    @property
+    def time_range(self) -> Tuple[Optional[np.datetime64], Optional[np.datetime64]]:
+        segments = [s for s in self.manifest["segments"] if s["rows"]]
+        if not segments:
+            return None, None
+        return (np.datetime64(min(s["start"] for s in segments), "ns"),
+                np.datetime64(max(s["end"] for s in segments), "ns"))
+
+    def _spec(self, name: str) -> Dict[str, Any]:
+        for spec in self.manifest["columns"]:
+            if spec["name"] == name:
+                return spec
+        raise KeyError(f"No column {name} in archive {self.path}")
+
+    def _map(self, segment: Dict[str, Any], spec: Dict[str, Any]) -> np.ndarray:
+        dtype = np.dtype(spec["dtype"])
+        if segment["rows"] == 0:
+            return np.zeros(0, dtype=dtype)
+        path = os.path.join(self.path, segment["dir"], f"{spec['name']}.bin")
+        return np.memmap(path, dtype=dtype, mode="r", shape=(segment["rows"],))
+
+    def _slices(self, start: Optional[int], end: Optional[int]) -> List[Tuple[Dict[str, Any], int, int]]:
+        """(segment, first row, end row) of every segment holding rows in [start, end]."""
+        out = []
+        ts_spec = self._spec("timestamp") if self.manifest["columns"] else None
+        for segment in self.manifest["segments"]:
+            if not segment["rows"] or (start is not None and segment["end"] < start) or (end is not None and segment["start"] > end):
+                continue
+            lo, hi = 0, segment["rows"]
+            if start is not None and segment["start"] < start or end is not None and segment["end"] > end:
+                ts = self._map(segment, ts_spec).view(np.int64)
+                if start is not None:
+                    lo = int(np.searchsorted(ts, start, side="left"))
+                if end is not None:
+                    hi = int(np.searchsorted(ts, end, side="right"))
+            if hi > lo:
+                out.append((segment, lo, hi))
+        return out
+
+    def arrays(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None,
+               columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Raw on-disk arrays (dictionary codes for text columns) of the rows in [start, end], by time.
+
+        Within one segment these are read-only views of the mapped files; ranges spanning several
+        segments are concatenated (and re-sorted by time if the segments overlap).
+        """
+        names = list(columns) if columns is not None else self.columns
+        specs = [self._spec(name) for name in names]
+        slices = self._slices(_ns(start), _ns(end))
+        if len(slices) == 1:
+            segment, lo, hi = slices[0]
+            return {spec["name"]: self._map(segment, spec)[lo:hi] for spec in specs}
+        out = {spec["name"]: np.concatenate([self._map(seg, spec)[lo:hi] for seg, lo, hi in slices])
+               if slices else np.zeros(0, dtype=np.dtype(spec["dtype"])) for spec in specs}
+        if len(slices) > 1:
+            ts = np.concatenate([self._map(seg, self._spec("timestamp"))[lo:hi] for seg, lo, hi in slices])
+            if np.any(ts[1:] < ts[:-1]):
+                order = np.argsort(ts, kind="stable")
+                out = {name: values[order] for name, values in out.items()}
+        return out
+
+    def read(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None,
+             columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Rows with ``timestamp`` in [start, end] (inclusive) as a frame; text columns come back categorical.
+
+        Within one segment, numeric columns are read-only views of the mapped files: each becomes its
+        own Series, so the frame keeps one block per column instead of consolidating them into a copy.
+        Text columns are decoded into categoricals, whose narrowed codes (1-2 bytes per row) are copies.
+        """
+        arrays = self.arrays(start, end, columns)
+        data: Dict[str, Any] = {}
+        for name, values in arrays.items():
+            spec = self._spec(name)
+            if "dictionary" in spec:
+                data[name] = pd.Categorical.from_codes(values, categories=spec["dictionary"], validate=False)
+            else:
+                data[name] = pd.Series(values, name=name, copy=False)
+        return pd.DataFrame(data, columns=list(arrays), copy=False)
+
+    def _write_segment(self, columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        name = f"seg-{self.manifest['next_segment']:06d}"
+        self.manifest["next_segment"] += 1
+        tmp = os.path.join(self.path, f"{name}.tmp")
+        os.makedirs(tmp, exist_ok=True)
+        for spec in self.manifest["columns"]:
+            columns[spec["name"]].tofile(os.path.join(tmp, f"{spec['name']}.bin"))
+        os.replace(tmp, os.path.join(self.path, name))
+        ts = columns["timestamp"].view(np.int64)
+        return {"dir": name, "rows": int(ts.size), "start": int(ts[0]), "end": int(ts[-1])}
+
+    def _extend_segment(self, segment: Dict[str, Any], columns: Dict[str, np.ndarray]) -> None:
+        for spec in self.manifest["columns"]:
+            path = os.path.join(self.path, segment["dir"], f"{spec['name']}.bin")
+            with open(path, "r+b") as f:
+                f.truncate(segment["rows"] * np.dtype(spec["dtype"]).itemsize)  # drop bytes of an interrupted append
+                f.seek(0, os.SEEK_END)
+                f.write(columns[spec["name"]].tobytes())
+        ts = columns["timestamp"].view(np.int64)
+        segment["rows"] += int(ts.size)
+        segment["end"] = int(ts[-1])
+
+    def _save_manifest(self) -> None:
+        self.manifest["rows"] = int(sum(s["rows"] for s in self.manifest["segments"]))
+        self.manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+
+        def dump(p: str) -> None:
+            with open(p, "w") as f:
+                json.dump(self.manifest, f)
+        _write_atomic(os.path.join(self.path, ARCHIVE_MANIFEST), dump)
+
+    def append(self, df: pd.DataFrame) -> ArchiveAppendResult:
+        """Archive the detections of ``df`` not stored yet (same key as PartitionedStorage).
+
+        Rows newer than the archive's high-water mark are new by construction; older rows are
+        checked against the stored keys of their time range only.
+        """
+        self.refresh()
+        received = int(len(df))
+        if "timestamp" not in df.columns and "acq_date" in df.columns and "acq_time" in df.columns:
+            df = df.assign(timestamp=parse_timestamps(df["acq_date"].astype(str), df["acq_time"]))
+        if "timestamp" in df.columns:
+            df = df[df["timestamp"].notna()]
+        _, high_water = self.time_range
+        if df.empty or "timestamp" not in df.columns:
+            return ArchiveAppendResult(received, 0, received - int(len(df)), 0, str(high_water) if high_water is not None else None)
+
+        os.makedirs(self.path, exist_ok=True)
+        if not self.manifest["columns"]:
+            self.manifest["columns"] = [_column_spec(name, df[name]) for name in df.columns]
+        n = int(len(df))
+        columns = {spec["name"]: _encode(df[spec["name"]] if spec["name"] in df.columns else None, spec, n)
+                   for spec in self.manifest["columns"]}
+
+        keys = _key_hashes(columns)
+        _, first = np.unique(keys, return_index=True)
+        keep = np.zeros(n, dtype=bool)
+        keep[first] = True
+        ts = columns["timestamp"].view(np.int64)
+        if high_water is not None:
+            hw = int(high_water.astype(np.int64))
+            maybe_seen = keep & (ts <= hw)
+            if maybe_seen.any():
+                stored = self.arrays(np.datetime64(int(ts[maybe_seen].min()), "ns"), high_water,
+                                     [k for k in KEY_COLUMNS if k in self.columns])
+                keep[maybe_seen] = ~np.isin(keys[maybe_seen], _key_hashes(stored))
+        appended = int(keep.sum())
+        if not appended:
+            return ArchiveAppendResult(received, 0, received, 0, str(high_water))
+
+        order = np.flatnonzero(keep)[np.argsort(ts[keep], kind="stable")]
+        columns = {name: values[order] for name, values in columns.items()}
+        ts = columns["timestamp"].view(np.int64)
+        segments = self.manifest["segments"]
+        last = segments[-1] if segments else None
+        # In-order rows extend the newest segment; late ones open a new segment
+        split = int(np.searchsorted(ts, last["end"], side="left")) if last is not None and last["rows"] else 0
+        written = 0
+        if split > 0:
+            segments.append(self._write_segment({name: values[:split] for name, values in columns.items()}))
+            written += 1
+        if split < ts.size:
+            tail = {name: values[split:] for name, values in columns.items()}
+            if last is not None and last["rows"]:
+                self._extend_segment(last, tail)
+            else:
+                segments.append(self._write_segment(tail))
+                written += 1
+        self._save_manifest()
+        return ArchiveAppendResult(received, appended, received - appended, written, str(self.time_range[1]))
+
+    def compact(self) -> int:
+        """Merge all segments into one time-sorted segment; returns the number of segments replaced.
+
+        Readers holding maps of the old segments keep them until they drop them.
+        """
+        self.refresh()
+        old = [s["dir"] for s in self.manifest["segments"]]
+        if len(old) <= 1:
+            return 0
+        merged = {name: np.array(values) for name, values in self.arrays().items()}
+        self.manifest["segments"] = [self._write_segment(merged)]
+        self._save_manifest()
+        for name in old:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+        return len(old)
+
+    def info(self) -> Dict[str, Any]:
+        start, end = self.time_range
+        return {
+            "path": self.path,
+            "rows": self.rows,
+            "segments": len(self.manifest["segments"]),
+            "start": str(start) if start is not None else None,
+            "end": str(end) if end is not None else None,
+            "columns": {c["name"]: c["dtype"] for c in self.manifest["columns"]},
+            "bytes": int(sum(s["rows"] * np.dtype(c["dtype"]).itemsize for s in self.manifest["segments"] for c in self.manifest["columns"])),
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Import hotspot CSVs or partitioned storage into an archive, compact it, or describe it."""
+    from src.pipeline.store import load_hotspot_csv
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("command", choices=["import", "compact", "info"])
+    parser.add_argument("archive", help="archive directory of one source (e.g. data/archive/viirs)")
+    parser.add_argument("inputs", nargs="*", help="hotspot CSVs or storage directories to import")
+    args = parser.parse_args(argv)
+
+    archive = HotspotArchive(args.archive)
+    if args.command == "import":
+        for path in args.inputs:
+            result = archive.append(load_hotspot_csv(path))
+            print(json.dumps({"input": path, "appended": result.appended, "duplicates": result.duplicates}))
+    elif args.command == "compact":
+        print(json.dumps({"segments_merged": archive.compact()}))
+    print(json.dumps(archive.info()))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import List, Tuple, Optional, Dict
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 from sklearn.cluster import DBSCAN
+from sklearn.neighbors import KDTree
 
 
 def _to_km_coords(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
@@ -17,6 +21,136 @@ def _to_km_coords(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndar
     return lat_km, lon_km
 
 
+def _event_space(
+    df: pd.DataFrame,
+    spatial_eps_km: float,
+    temporal_eps_minutes: int,
+    timestamp_col: str,
+    lat_col: str,
+    lon_col: str,
+) -> np.ndarray:
+    df_local = df[[lat_col, lon_col, timestamp_col]].copy()
+    lat_km, lon_km = _to_km_coords(df_local[lat_col].values, df_local[lon_col].values)
+    times = pd.to_datetime(df_local[timestamp_col]).astype("int64") // 10**9  # seconds
+
+    # Normalize features so that eps in Euclidean corresponds to (spatial_eps_km, temporal_eps_minutes)
+    space_scale = spatial_eps_km
+    time_scale = (temporal_eps_minutes * 60.0) / 60.0  # seconds -> minutes; we will keep units in minutes
+    # Build feature matrix: [lat_km/space_scale, lon_km/space_scale, time_minutes/time_scale]
+    time_minutes = (times - times.min()) / 60.0
+    return np.vstack([
+        lat_km / space_scale,
+        lon_km / space_scale,
+        time_minutes / time_scale,
+    ]).T
+
+
+# Slab halos are padded a little beyond eps (= 1.0 in the scaled space) so float rounding in the
+# time coordinate can never drop a true neighbor; extra halo points do not change the result.
+_HALO = 1.0 + 1e-6
+
+
+def _cluster_slab(X: np.ndarray, ids: np.ndarray, region: slice, inner: slice, min_samples: int) -> Dict[str, np.ndarray]:
+    """DBSCAN core/link/border facts for the ``region`` rows of one time slab.
+
+    ``X``/``ids`` hold the slab plus two halos on each side (sorted by time). Neighbour counts are
+    exact for the ``inner`` rows (region plus one halo), which covers every neighbour of a region
+    row. Returns global ids of region rows and their core flags, (core, representative) links for
+    the local core components, and (border, representative) pairs for region border rows.
+    """
+    tree = KDTree(X)
+    core = np.zeros(len(X), dtype=bool)
+    core[inner] = tree.query_radius(X[inner], r=1.0, count_only=True) >= min_samples
+
+    neighbors = tree.query_radius(X[region], r=1.0)
+    src = np.repeat(np.arange(region.start, region.stop), [len(nb) for nb in neighbors])
+    dst = np.concatenate(neighbors) if len(neighbors) else np.zeros(0, dtype=np.intp)
+    to_core = core[dst]
+    src, dst = src[to_core], dst[to_core]
+
+    # Components of the local core graph; each is linked to its smallest global id
+    core_edges = core[src]
+    graph = coo_matrix((np.ones(int(core_edges.sum()), dtype=np.int8), (src[core_edges], dst[core_edges])), shape=(len(X), len(X)))
+    _, comp = connected_components(graph, directed=True, connection="weak")
+    rep = np.full(comp.max() + 1 if comp.size else 0, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(rep, comp[core], ids[core])
+    touched = np.zeros(len(X), dtype=bool)
+    touched[src[core_edges]] = True
+    touched[dst[core_edges]] = True
+    touched[region] |= core[region]
+
+    border = ~core[src]
+    border_pairs = np.unique(np.stack([ids[src[border]], rep[comp[dst[border]]]], axis=1), axis=0) if border.any() else np.zeros((0, 2), dtype=np.int64)
+    return {
+        "ids": ids[region],
+        "core": core[region],
+        "links": np.stack([ids[touched], rep[comp[touched]]], axis=1),
+        "border": border_pairs,
+    }
+
+
+def _union_find(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Vectorized union-find over edges (a, b); every node ends up pointing at its component's smallest id."""
+    parent = np.arange(n, dtype=np.int64)
+    while True:
+        ra, rb = parent[a], parent[b]
+        differ = ra != rb
+        if not differ.any():
+            return parent
+        np.minimum.at(parent, np.maximum(ra, rb)[differ], np.minimum(ra, rb)[differ])
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+
+def _cluster_slabs(X: np.ndarray, min_samples: int, slab_width: float, n_jobs: int) -> np.ndarray:
+    """DBSCAN (eps=1, euclidean) over time slabs, merged into labels identical to a single-shot run."""
+    n = len(X)
+    order = np.argsort(X[:, 2], kind="stable")
+    t = X[order, 2]
+    bounds = t[0] + slab_width * np.arange(int((t[-1] - t[0]) // slab_width) + 2)
+    cuts = np.searchsorted(t, bounds, side="left")
+    cuts[-1] = n
+    tasks = []
+    for k in range(len(bounds) - 1):
+        lo, hi = cuts[k], cuts[k + 1]
+        if hi <= lo:
+            continue
+        start, stop = t[lo], t[hi - 1]
+        e_lo, i_lo = np.searchsorted(t, [start - 2 * _HALO, start - _HALO], side="left")
+        i_hi, e_hi = np.searchsorted(t, [stop + _HALO, stop + 2 * _HALO], side="right")
+        rows = order[e_lo:e_hi]
+        tasks.append((X[rows], rows.astype(np.int64), slice(lo - e_lo, hi - e_lo), slice(i_lo - e_lo, i_hi - e_lo), min_samples))
+
+    if n_jobs != 1 and len(tasks) > 1:
+        workers = None if n_jobs < 0 else n_jobs
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_cluster_slab, *zip(*tasks)))
+    else:
+        results = [_cluster_slab(*task) for task in tasks]
+
+    is_core = np.zeros(n, dtype=bool)
+    for r in results:
+        is_core[r["ids"]] = r["core"]
+    links = np.concatenate([r["links"] for r in results]) if results else np.zeros((0, 2), dtype=np.int64)
+    root = _union_find(n, links[:, 0], links[:, 1])
+
+    # Clusters are numbered by their smallest core row, as DBSCAN discovers them in row order
+    roots = np.unique(root[is_core])
+    labels = np.full(n, -1, dtype=np.int64)
+    labels[is_core] = np.searchsorted(roots, root[is_core])
+    border = np.concatenate([r["border"] for r in results]) if results else np.zeros((0, 2), dtype=np.int64)
+    if border.size:
+        # A border point joins the first-discovered cluster among its core neighbours
+        first = np.full(n, n, dtype=np.int64)
+        np.minimum.at(first, border[:, 0], root[border[:, 1]])
+        has = first < n
+        labels[has] = np.searchsorted(roots, first[has])
+    return labels
+
+
 def cluster_events(
     df: pd.DataFrame,
     spatial_eps_km: float = 1.5,
@@ -25,9 +159,17 @@ def cluster_events(
     timestamp_col: str = "timestamp",
     lat_col: str = "latitude",
     lon_col: str = "longitude",
+    slab_minutes: Optional[int] = None,
+    n_jobs: int = 1,
 ) -> pd.Series:
     """Cluster hotspots into spatiotemporal events using DBSCAN on a fused feature space.
 
+    With ``slab_minutes`` set (>= ``temporal_eps_minutes``), detections are split into time slabs
+    with overlapping halos, neighbours are found with a KD-tree per slab and clusters are merged
+    across slab boundaries with a union-find pass; ``n_jobs`` > 1 (or -1 for all CPUs) runs slabs
+    on a process pool. Memory then scales with the slab rather than the whole history, and the
+    labels equal the single-shot result.
+
     Returns a pandas Series of integer cluster labels aligned with df.index (-1 for noise).
     """
     if df.empty:
@@ -36,21 +178,13 @@ def cluster_events(
         raise ValueError(f"Missing required column: {timestamp_col}")
     if lat_col not in df.columns or lon_col not in df.columns:
         raise ValueError("Missing latitude/longitude columns")
+    if slab_minutes is not None and slab_minutes < temporal_eps_minutes:
+        raise ValueError("slab_minutes must be at least temporal_eps_minutes")
 
-    df_local = df[[lat_col, lon_col, timestamp_col]].copy()
-    lat_km, lon_km = _to_km_coords(df_local[lat_col].values, df_local[lon_col].values)
-    times = pd.to_datetime(df_local[timestamp_col]).astype("int64") // 10**9  # seconds
-
-    # Normalize features so that eps in Euclidean corresponds to (spatial_eps_km, temporal_eps_minutes)
-    space_scale = spatial_eps_km
-    time_scale = (temporal_eps_minutes * 60.0) / 60.0  # seconds -> minutes; we will keep units in minutes
-    # Build feature matrix: [lat_km/space_scale, lon_km/space_scale, time_minutes/time_scale]
-    time_minutes = (times - times.min()) / 60.0
-    X = np.vstack([
-        lat_km / space_scale,
-        lon_km / space_scale,
-        time_minutes / time_scale,
-    ]).T
+    X = _event_space(df, spatial_eps_km, temporal_eps_minutes, timestamp_col, lat_col, lon_col)
+    if slab_minutes is not None:
+        labels = _cluster_slabs(X, min_samples, slab_minutes / temporal_eps_minutes, n_jobs)
+        return pd.Series(labels, index=df.index, name="event_id")
 
     db = DBSCAN(eps=1.0, min_samples=min_samples, metric="euclidean")
     labels = db.fit_predict(X)
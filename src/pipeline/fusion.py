@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import math
+import time
+import numpy as np
+
+from src.pipeline.aggregates import compute_aggregates
+from src.pipeline.store import decimal_coords
+
+
+KM_PER_DEGREE = 111.32
+# Detections of different sensors this close in space and time are one observation: a 1 km MODIS
+# pixel covers the 375 m VIIRS pixels of the same fire, and Aqua passes within minutes of S-NPP
+MATCH_KM = 1.0
+MATCH_MINUTES = 20.0
+MAX_GRID_KEYS = 2 ** 62
+
+Bbox = Tuple[float, float, float, float]
+
+
+@dataclass(frozen=True)
+class FusionSource:
+    """One input dataset: a store snapshot of ``sensor`` detections (e.g. one area's VIIRS file)."""
+
+    name: str
+    sensor: str
+    snapshot: Any
+    brightness_col: str
+
+
+@dataclass(frozen=True)
+class Detections:
+    """Detection columns; bit ``i`` of ``sources`` is set when the query's ``i``-th sensor saw the detection."""
+
+    lat: np.ndarray
+    lon: np.ndarray
+    ts: np.ndarray
+    frp: np.ndarray
+    brightness: np.ndarray
+    sources: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.ts.size)
+
+    def take(self, rows: np.ndarray) -> "Detections":
+        return Detections(self.lat[rows], self.lon[rows], self.ts[rows], self.frp[rows], self.brightness[rows], self.sources[rows])
+
+    @classmethod
+    def empty(cls) -> "Detections":
+        return cls(*(np.zeros(0, dtype=t) for t in (float, float, "datetime64[ns]", float, float, np.int64)))
+
+    @classmethod
+    def concat(cls, parts: Sequence["Detections"]) -> "Detections":
+        if len(parts) == 1:
+            return parts[0]
+        return cls(*(np.concatenate([getattr(p, f) for p in parts]) for f in ("lat", "lon", "ts", "frp", "brightness", "sources")))
+
+
+@dataclass(frozen=True)
+class RegionPartition:
+    """Grouped incidents of one region: ``compute_aggregates`` columns (plus ``sources``) and features."""
+
+    name: str
+    bbox: Bbox
+    detections: int
+    columns: Dict[str, np.ndarray]
+    features: np.ndarray
+
+
+@dataclass(frozen=True)
+class FusionResult:
+    sensors: List[str]
+    partitions: List[RegionPartition]
+    rows: int  # detections selected from all datasets
+    duplicates: int  # exact repeats from overlapping datasets of one sensor
+    matched: int  # detections merged into a near-coincident one of an earlier sensor
+    seconds: Dict[str, float]
+
+    def source_labels(self, mask: np.ndarray) -> np.ndarray:
+        """``"viirs+modis"``-style names of the sensors in each ``sources`` bit mask."""
+        values, inverse = np.unique(mask, return_inverse=True)
+        names = ["+".join(s for i, s in enumerate(self.sensors) if int(v) >> i & 1) for v in values]
+        return np.asarray(names, dtype=object)[inverse]
+
+
+def select(source: FusionSource, regions: Sequence[Bbox], time_from: Optional[np.datetime64],
+           time_to: Optional[np.datetime64], bit: int) -> Detections:
+    """Rows of ``source`` inside any of ``regions`` with ``time_from <= timestamp < time_to``, from its index."""
+    index, df = source.snapshot.index, source.snapshot.df
+    if df.empty or "timestamp" not in df.columns:
+        return Detections.empty()
+    parts = [index.query(bbox, time_from, time_to) for bbox in regions]
+    rows = parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+    n = rows.size
+    ts = df["timestamp"].to_numpy(dtype="datetime64[ns]")[rows]
+    lat = decimal_coords(df["latitude"].to_numpy()[rows])
+    lon = decimal_coords(df["longitude"].to_numpy()[rows])
+    keep = ~np.isnat(ts) & np.isfinite(lat) & np.isfinite(lon)
+    frp = df["frp"].to_numpy(dtype=float)[rows] if "frp" in df.columns else np.full(n, np.nan)
+    brightness = df[source.brightness_col].to_numpy(dtype=float)[rows] if source.brightness_col in df.columns else np.full(n, np.nan)
+    sources = np.full(n, 1 << bit, dtype=np.int64)
+    return Detections(lat, lon, ts, frp, brightness, sources).take(np.flatnonzero(keep))
+
+
+def drop_exact_duplicates(d: Detections) -> Tuple[Detections, int]:
+    """Keep the first of detections with equal (timestamp, lat, lon), in input order."""
+    if len(d) < 2:
+        return d, 0
+    order = np.lexsort((d.lon, d.lat, d.ts))
+    lat, lon, ts = d.lat[order], d.lon[order], d.ts[order]
+    repeat = np.concatenate(([False], (ts[1:] == ts[:-1]) & (lat[1:] == lat[:-1]) & (lon[1:] == lon[:-1])))
+    if not repeat.any():
+        return d, 0
+    return d.take(np.sort(order[~repeat])), int(repeat.sum())
+
+
+def match_nearby(ref: Detections, query: Detections, km: float = MATCH_KM,
+                 minutes: float = MATCH_MINUTES) -> np.ndarray:
+    """Position in ``ref`` of the nearest detection within ``km`` and ``minutes`` of each ``query`` detection, or -1.
+
+    Both sets are hashed into cells of ``km`` by ``minutes``, so each query only compares against
+    the ``ref`` rows of its 27 neighbouring cells (found by binary search in the sorted cell keys).
+    """
+    out = np.full(len(query), -1, dtype=np.int64)
+    if not len(ref) or not len(query):
+        return out
+    max_lat = min(89.0, float(max(np.abs(ref.lat).max(), np.abs(query.lat).max())))
+    dlat = km / KM_PER_DEGREE
+    dlon = km / (KM_PER_DEGREE * math.cos(math.radians(max_lat)))  # wide enough at the highest latitude
+    step = max(1, int(minutes * 60 * 10**9))
+
+    def cells(d: Detections) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return (np.floor(d.lat / dlat).astype(np.int64), np.floor(d.lon / dlon).astype(np.int64),
+                d.ts.astype(np.int64) // step)
+
+    ref_cells, query_cells = cells(ref), cells(query)
+    # One padded cell on each side, so neighbour keys never alias another cell
+    lows = [min(int(r.min()), int(q.min())) - 1 for r, q in zip(ref_cells, query_cells)]
+    sizes = [max(int(r.max()), int(q.max())) - lo + 2 for r, q, lo in zip(ref_cells, query_cells, lows)]
+    if sizes[0] * sizes[1] * sizes[2] >= MAX_GRID_KEYS:
+        raise ValueError(f"match grid of {sizes} cells is too large; narrow the query or widen km/minutes")
+
+    def key(i: np.ndarray, j: np.ndarray, t: np.ndarray) -> np.ndarray:
+        return ((i - lows[0]) * sizes[1] + (j - lows[1])) * sizes[2] + (t - lows[2])
+
+    ref_keys = key(*ref_cells)
+    order = np.argsort(ref_keys, kind="stable")
+    sorted_keys = ref_keys[order]
+    # Keys are linear in the cell coordinates, so a neighbour is a constant shift of the query's key and
+    # the three time neighbours of a cell are one contiguous key range; searching sorted unique keys
+    # keeps the binary searches cache friendly
+    query_keys, inverse = np.unique(key(*query_cells), return_inverse=True)
+    pairs_q, pairs_r, pairs_d = [], [], []
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            shifted = query_keys + (di * sizes[1] + dj) * sizes[2]
+            lo = np.searchsorted(sorted_keys, shifted - 1, side="left")
+            n = (np.searchsorted(sorted_keys, shifted + 1, side="right") - lo)[inverse]
+            hit = np.flatnonzero(n)
+            if not hit.size:
+                continue
+            counts = n[hit]
+            q = np.repeat(hit, counts)
+            within = np.arange(q.size) - np.repeat(np.cumsum(counts) - counts, counts)
+            r = order[np.repeat(lo[inverse[hit]], counts) + within]
+            dy = (query.lat[q] - ref.lat[r]) * KM_PER_DEGREE
+            dx = (query.lon[q] - ref.lon[r]) * KM_PER_DEGREE * np.cos(np.radians((query.lat[q] + ref.lat[r]) / 2))
+            dist2 = dx * dx + dy * dy
+            ok = (dist2 <= km * km) & (np.abs(query.ts[q] - ref.ts[r]) <= np.timedelta64(step, "ns"))
+            pairs_q.append(q[ok])
+            pairs_r.append(r[ok])
+            pairs_d.append(dist2[ok])
+    if pairs_q:
+        q, r, dist2 = np.concatenate(pairs_q), np.concatenate(pairs_r), np.concatenate(pairs_d)
+        nearest = np.lexsort((r, dist2, q))
+        first = np.concatenate(([True], q[nearest][1:] != q[nearest][:-1])) if nearest.size else nearest.astype(bool)
+        out[q[nearest][first]] = r[nearest][first]
+    return out
+
+
+def fuse(parts: Sequence[Detections], km: float = MATCH_KM, minutes: float = MATCH_MINUTES) -> Tuple[Detections, int]:
+    """Merge per-sensor detections in order; returns (fused detections, number merged).
+
+    A detection within ``km``/``minutes`` of one kept from an earlier sensor is dropped and its
+    sensor bit added to that detection, so sensors earlier in the order (finer pixels first) keep
+    their positions and FRP while coincident observations count once.
+    """
+    kept = parts[0]
+    matched = 0
+    for part in parts[1:]:
+        match = match_nearby(kept, part, km, minutes)
+        dup = match >= 0
+        if dup.any():
+            sources = kept.sources.copy()
+            np.bitwise_or.at(sources, match[dup], part.sources[dup])
+            kept = Detections(kept.lat, kept.lon, kept.ts, kept.frp, kept.brightness, sources)
+            matched += int(dup.sum())
+        kept = Detections.concat([kept, part.take(np.flatnonzero(~dup))])
+    return kept, matched
+
+
+class FusionEngine:
+    """Answer one /predict-style query across several regions and sensors in a single pass.
+
+    Each dataset contributes only the rows its index finds inside the regions and time range.
+    Datasets of one sensor are merged (exact repeats from overlapping areas dropped), then the
+    sensors are fused by ``fuse``. Every region groups its share of the fused detections into
+    the same epoch-aligned time buckets; regions are grouped in parallel on a shared pool, and
+    the caller can classify all partitions with one batched call.
+    """
+
+    def __init__(self, match_km: float = MATCH_KM, match_minutes: float = MATCH_MINUTES,
+                 max_workers: int = 4) -> None:
+        self.match_km = float(match_km)
+        self.match_minutes = float(match_minutes)
+        self.max_workers = max(1, int(max_workers))
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _map(self, fn: Any, items: List[Any]) -> List[Any]:
+        if len(items) <= 1 or self.max_workers == 1:
+            return [fn(item) for item in items]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fusion")
+        return list(self._pool.map(fn, items))
+
+    def query(self, sources: Sequence[FusionSource], regions: Dict[str, Bbox], window_minutes: int,
+              time_from: Optional[np.datetime64] = None, time_to: Optional[np.datetime64] = None) -> FusionResult:
+        """Fused incidents of ``sources`` per region (in ``regions`` order) for ``[time_from, time_to)``."""
+        t0 = time.perf_counter()
+        sensors = list(dict.fromkeys(s.sensor for s in sources))
+        bboxes = list(regions.values())
+        selected = self._map(lambda s: select(s, bboxes, time_from, time_to, sensors.index(s.sensor)), list(sources))
+        rows = sum(len(d) for d in selected)
+        per_sensor, duplicates = [], 0
+        for sensor in sensors:
+            parts = [d for s, d in zip(sources, selected) if s.sensor == sensor]
+            # Only datasets of overlapping areas repeat each other; one dataset is taken as is, like /predict
+            merged, n = drop_exact_duplicates(Detections.concat(parts)) if len(parts) > 1 else (parts[0], 0)
+            per_sensor.append(merged)
+            duplicates += n
+        t1 = time.perf_counter()
+        fused, matched = fuse(per_sensor, self.match_km, self.match_minutes) if per_sensor else (Detections.empty(), 0)
+        t2 = time.perf_counter()
+
+        def group(item: Tuple[str, Bbox]) -> RegionPartition:
+            name, (lon_min, lat_min, lon_max, lat_max) = item
+            inside = np.flatnonzero((fused.lon >= lon_min) & (fused.lon <= lon_max) & (fused.lat >= lat_min) & (fused.lat <= lat_max))
+            d = fused.take(inside)
+            columns, X = compute_aggregates(d.lat, d.lon, d.ts, d.frp, d.brightness, window_minutes, source_mask=d.sources)
+            return RegionPartition(name, item[1], int(inside.size), columns, X)
+
+        partitions = self._map(group, list(regions.items()))
+        seconds = {"select": t1 - t0, "fuse": t2 - t1, "group": time.perf_counter() - t2}
+        return FusionResult(sensors, partitions, rows, duplicates, matched, seconds)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+import pandas as pd
+
+
+GRID_CELLS_PER_DEGREE = 100  # ~1km at mid latitudes
+
+
+@dataclass(frozen=True)
+class CellGroups:
+    """Rows grouped by (grid cell, time bucket), stored CSR-style.
+
+    ``order`` permutes the input rows so each group is contiguous and sorted by time;
+    group ``i`` spans ``order[offsets[i]:offsets[i + 1]]``. Groups are ordered by
+    (cell latitude, cell longitude, bucket), matching ``DataFrame.groupby`` order.
+    """
+
+    order: np.ndarray
+    offsets: np.ndarray
+    cell_lat: np.ndarray
+    cell_lon: np.ndarray
+    bucket: np.ndarray
+
+    @property
+    def n_groups(self) -> int:
+        return int(self.offsets.size - 1)
+
+    @property
+    def counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+
+def parse_timestamps(acq_date: pd.Series, acq_time: pd.Series) -> pd.Series:
+    """Vectorized equivalent of parsing ``f"{acq_date} {str(acq_time).zfill(4)}"``.
+
+    Unparseable rows become NaT.
+    """
+    text = acq_date.astype(str) + " " + acq_time.astype(str).str.zfill(4)
+    return pd.to_datetime(text, format="%Y-%m-%d %H%M", errors="coerce")
+
+
+def grid_indices(lat: np.ndarray, lon: np.ndarray, cells_per_degree: int = GRID_CELLS_PER_DEGREE) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer grid cell indices; ``idx / cells_per_degree`` equals ``round(x * cells_per_degree) / cells_per_degree``."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    return np.rint(lat * cells_per_degree).astype(np.int64), np.rint(lon * cells_per_degree).astype(np.int64)
+
+
+def time_buckets(timestamps: np.ndarray, window_minutes: int) -> np.ndarray:
+    """Floor datetime64 values to ``window_minutes`` buckets (epoch aligned, like ``Series.dt.floor``)."""
+    ns = np.asarray(timestamps, dtype="datetime64[ns]").astype(np.int64)
+    step = int(window_minutes) * 60 * 10**9
+    return ((ns // step) * step).astype("datetime64[ns]")
+
+
+def group_cells(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    timestamps: np.ndarray,
+    window_minutes: int,
+    cells_per_degree: int = GRID_CELLS_PER_DEGREE,
+) -> CellGroups:
+    """Group detections by grid cell and time bucket in one sort.
+
+    Ties in timestamp keep their input order.
+    """
+    lat_idx, lon_idx = grid_indices(lat, lon, cells_per_degree)
+    ts = np.asarray(timestamps, dtype="datetime64[ns]")
+    bucket = time_buckets(ts, window_minutes)
+    if lat_idx.size == 0:
+        empty_i = np.zeros(0, dtype=np.int64)
+        return CellGroups(empty_i, np.zeros(1, dtype=np.int64), np.zeros(0), np.zeros(0), bucket)
+
+    order = np.lexsort((ts, bucket, lon_idx, lat_idx))
+    s_lat, s_lon, s_bucket = lat_idx[order], lon_idx[order], bucket[order]
+    starts = np.flatnonzero(
+        np.concatenate(([True], (s_lat[1:] != s_lat[:-1]) | (s_lon[1:] != s_lon[:-1]) | (s_bucket[1:] != s_bucket[:-1])))
+    )
+    offsets = np.append(starts, order.size).astype(np.int64)
+    return CellGroups(
+        order=order,
+        offsets=offsets,
+        cell_lat=s_lat[starts] / float(cells_per_degree),
+        cell_lon=s_lon[starts] / float(cells_per_degree),
+        bucket=s_bucket[starts],
+    )
+
+
+def segment_max(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """NaN-skipping max per CSR segment; all-NaN segments yield NaN."""
+    values = np.asarray(values, dtype=np.float64)
+    if offsets.size <= 1:
+        return np.zeros(0, dtype=np.float64)
+    filled = np.where(np.isnan(values), -np.inf, values)
+    out = np.maximum.reduceat(filled, offsets[:-1])
+    valid = np.add.reduceat((~np.isnan(values)).astype(np.int64), offsets[:-1])
+    out[valid == 0] = np.nan
+    return out
+
+
+def segment_finite_count(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Number of finite values in each CSR segment."""
+    finite = np.isfinite(np.asarray(values, dtype=np.float64))
+    counts = np.zeros(max(offsets.size - 1, 0), dtype=np.int64)
+    nonempty = np.diff(offsets) > 0
+    if nonempty.any():
+        counts[nonempty] = np.add.reduceat(finite.astype(np.int64), offsets[:-1][nonempty])
+    return counts
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+import numpy as np
+
+
+INDEX_CELLS_PER_DEGREE = 10  # ~11km buckets; a map viewport touches a handful per latitude row
+
+_NO_LOWER = np.iinfo(np.int64).min + 1  # just above NaT, so untimed rows never match a time filter
+_NO_UPPER = np.iinfo(np.int64).max
+
+
+def _time_bound(value: Optional[np.datetime64], default: int) -> int:
+    if value is None:
+        return default
+    return int(np.datetime64(value, "ns").astype(np.int64))
+
+
+class SpatioTemporalIndex:
+    """Time-sorted and grid-bucketed row positions of one hotspot frame.
+
+    ``time_order`` lists rows with a timestamp in time order, so a time range is two binary
+    searches. Rows with finite coordinates are also bucketed into ``cells_per_degree`` grid
+    cells stored CSR-style, sorted by (cell latitude, cell longitude, time): the cells of a bbox
+    form one contiguous run per latitude row, and each cell is searchable by time. Queries return
+    ascending row positions, i.e. the rows a full boolean mask would select, in the same order.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, timestamps: np.ndarray,
+                 cells_per_degree: int = INDEX_CELLS_PER_DEGREE) -> None:
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        ts = np.asarray(timestamps, dtype="datetime64[ns]")
+        self.n = int(ts.size)
+        self.cells_per_degree = int(cells_per_degree)
+        times = ts.astype(np.int64)
+
+        timed = np.flatnonzero(~np.isnat(ts))
+        self.time_order = timed[np.argsort(times[timed], kind="stable")]
+        self.sorted_times = times[self.time_order]
+
+        located = np.flatnonzero(np.isfinite(self.lat) & np.isfinite(self.lon))
+        lat_idx = np.floor(self.lat[located] * self.cells_per_degree).astype(np.int64)
+        lon_idx = np.floor(self.lon[located] * self.cells_per_degree).astype(np.int64)
+        if located.size:
+            self._lat0, self._lon0 = int(lat_idx.min()), int(lon_idx.min())
+            self._lat1, self._lon1 = int(lat_idx.max()), int(lon_idx.max())
+        else:
+            self._lat0 = self._lon0 = 0
+            self._lat1 = self._lon1 = -1
+        self._stride = self._lon1 - self._lon0 + 1
+        keys = (lat_idx - self._lat0) * self._stride + (lon_idx - self._lon0)
+        order = np.lexsort((times[located], keys))
+        self.cell_rows = located[order]
+        self.cell_times = times[located][order]
+        sorted_keys = keys[order]
+        self.cell_keys, starts = np.unique(sorted_keys, return_index=True)
+        self.cell_offsets = np.append(starts, sorted_keys.size).astype(np.int64)
+
+    @property
+    def n_cells(self) -> int:
+        return int(self.cell_keys.size)
+
+    def _cell_runs(self, bbox: Tuple[float, float, float, float]) -> List[Tuple[int, int]]:
+        """Runs ``[c0, c1)`` of indexed cells overlapping ``bbox``, one per latitude row."""
+        lon_min, lat_min, lon_max, lat_max = bbox
+        cpd = self.cells_per_degree
+        lat_lo = int(np.clip(np.floor(lat_min * cpd), self._lat0, self._lat1 + 1))
+        lat_hi = int(np.clip(np.floor(lat_max * cpd), self._lat0 - 1, self._lat1))
+        lon_lo = int(np.clip(np.floor(lon_min * cpd), self._lon0, self._lon1 + 1)) - self._lon0
+        lon_hi = int(np.clip(np.floor(lon_max * cpd), self._lon0 - 1, self._lon1)) - self._lon0
+        if lat_lo > lat_hi or lon_lo > lon_hi:
+            return []
+        rows = np.arange(lat_lo, lat_hi + 1, dtype=np.int64) - self._lat0
+        c0 = np.searchsorted(self.cell_keys, rows * self._stride + lon_lo, side="left")
+        c1 = np.searchsorted(self.cell_keys, rows * self._stride + lon_hi, side="right")
+        return [(a, b) for a, b in zip(c0.tolist(), c1.tolist()) if b > a]
+
+    def _in_bbox(self, rows: np.ndarray, bbox: Tuple[float, float, float, float]) -> np.ndarray:
+        lon_min, lat_min, lon_max, lat_max = bbox
+        lat, lon = self.lat[rows], self.lon[rows]
+        return rows[(lon >= lon_min) & (lon <= lon_max) & (lat >= lat_min) & (lat <= lat_max)]
+
+    def query(self, bbox: Optional[Tuple[float, float, float, float]] = None,
+              start: Optional[np.datetime64] = None, end: Optional[np.datetime64] = None) -> np.ndarray:
+        """Ascending positions of rows inside ``bbox`` (inclusive) with ``start <= timestamp < end``.
+
+        Omitted bounds do not filter; a time bound excludes rows without a timestamp and a bbox
+        excludes rows without finite coordinates. The cheaper of the time range and the spatial
+        candidate cells drives the scan; the other dimension is checked on those rows only.
+        """
+        timed = start is not None or end is not None
+        lo, hi = _time_bound(start, _NO_LOWER), _time_bound(end, _NO_UPPER)
+        if bbox is None:
+            if not timed:
+                return np.arange(self.n, dtype=np.int64)
+            a, b = np.searchsorted(self.sorted_times, [lo, hi], side="left")
+            return np.sort(self.time_order[a:b])
+        if any(np.isnan(v) for v in bbox):
+            return np.zeros(0, dtype=np.int64)
+
+        runs = self._cell_runs(bbox)
+        spatial = sum(int(self.cell_offsets[c1] - self.cell_offsets[c0]) for c0, c1 in runs)
+        if timed:
+            a, b = np.searchsorted(self.sorted_times, [lo, hi], side="left")
+            if b - a <= spatial:
+                return np.sort(self._in_bbox(self.time_order[a:b], bbox))
+
+        parts = []
+        for c0, c1 in runs:
+            if not timed:
+                parts.append(self.cell_rows[self.cell_offsets[c0]:self.cell_offsets[c1]])
+                continue
+            for c in range(c0, c1):
+                s, e = self.cell_offsets[c], self.cell_offsets[c + 1]
+                i, j = np.searchsorted(self.cell_times[s:e], [lo, hi], side="left")
+                if j > i:
+                    parts.append(self.cell_rows[s + i:s + j])
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(self._in_bbox(np.concatenate(parts), bbox))
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class FetchJob:
+    """One (source, bbox) pull. ``name`` keys the job's files, storage and status entry."""
+
+    name: str
+    model: str
+    product: str
+    bbox: str
+    day_range: int
+
+
+@dataclass
+class JobResult:
+    """Outcome of one job in a cycle; ``summary`` is whatever the handler returned."""
+
+    job: FetchJob
+    ok: bool
+    attempts: int
+    elapsed: float
+    status_code: Optional[int] = None
+    summary: Optional[str] = None
+    error: Optional[str] = None
+    fetch_seconds: float = 0.0  # time spent on HTTP requests and reading bodies, all attempts
+    bytes: int = 0  # size of the last response body
+
+
+class FetchTimeout(Exception):
+    """Raised when a job exceeds its wall-clock budget."""
+
+
+def make_session(pool_size: int) -> requests.Session:
+    """A ``requests.Session`` whose connection pool can serve ``pool_size`` concurrent jobs."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random) -> float:
+    """Full-jitter exponential backoff: uniform in ``[0, min(cap, base * 2**attempt)]``."""
+    return rng.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+class FetchScheduler:
+    """Run fetch jobs concurrently over one pooled HTTP session.
+
+    Each job gets a wall-clock ``timeout`` covering all of its attempts; connection errors,
+    read timeouts, bodies cut off mid-transfer and 429/5xx responses are retried with jittered
+    exponential backoff. The response text is passed to ``handler(job, text)`` in the worker
+    thread; its return value becomes the job's summary and any exception marks the job failed
+    (without retrying).
+    Per-job state (last attempt, last success, consecutive failures, staleness) is kept
+    across cycles and can be seeded from a previous ``job_status()`` snapshot.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        map_key: str,
+        handler: Callable[[FetchJob, str], Optional[str]],
+        max_workers: int = 4,
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+        stale_after: float = 1800.0,
+        session: Optional[requests.Session] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.map_key = map_key
+        self.handler = handler
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = float(timeout)
+        self.connect_timeout = float(connect_timeout)
+        self.retries = max(0, int(retries))
+        self.backoff_base = float(backoff_base)
+        self.backoff_cap = float(backoff_cap)
+        self.stale_after = float(stale_after)
+        self.session = session or make_session(self.max_workers)
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {}
+
+    def url(self, job: FetchJob) -> str:
+        return f"{self.base_url}/{self.map_key}/{job.product}/{job.bbox}/{job.day_range}"
+
+    def seed(self, job_status: Dict[str, Dict[str, Any]]) -> None:
+        """Restore per-job state (e.g. from fetch_status.json) so staleness survives restarts."""
+        with self._lock:
+            for name, entry in job_status.items():
+                self._state.setdefault(name, dict(entry))
+
+    def run(self, jobs: Sequence[FetchJob]) -> List[JobResult]:
+        """Run one cycle; results are returned in job order."""
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs)), thread_name_prefix="fetch") as pool:
+            results = list(pool.map(self._run_job, jobs))
+        for result in results:
+            self._record(result)
+        return results
+
+    def _get(self, url: str, deadline: float) -> Tuple[requests.Response, str, int]:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise FetchTimeout(f"no time left to request {url}")
+        resp = self.session.get(url, timeout=(min(self.connect_timeout, remaining), remaining), stream=True)
+        try:
+            chunks = []
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    raise FetchTimeout(f"job timed out after {self.timeout:.0f}s reading {url}")
+        finally:
+            resp.close()
+        body = b"".join(chunks)
+        return resp, body.decode(resp.encoding or "utf-8", errors="replace"), len(body)
+
+    def _run_job(self, job: FetchJob) -> JobResult:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        result = JobResult(job=job, ok=False, attempts=0, elapsed=0.0)
+        url = self.url(job)
+        for attempt in range(self.retries + 1):
+            result.attempts = attempt + 1
+            retry_after = None
+            t0 = time.monotonic()
+            try:
+                resp, text, result.bytes = self._get(url, deadline)
+                result.fetch_seconds += time.monotonic() - t0
+                result.status_code = resp.status_code
+                if resp.status_code in RETRY_STATUS:
+                    result.error = f"HTTP {resp.status_code}"
+                    retry_after = resp.headers.get("Retry-After")
+                else:
+                    resp.raise_for_status()
+                    result.summary = self.handler(job, text)
+                    result.ok = True
+                    result.error = None
+                    break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                result.fetch_seconds += time.monotonic() - t0
+                result.error = f"{type(e).__name__}: {e}"
+            except FetchTimeout as e:
+                result.fetch_seconds += time.monotonic() - t0
+                result.error = str(e)
+                break
+            except Exception as e:
+                # HTTP 4xx or a handler failure; retrying would not help
+                result.error = f"{type(e).__name__}: {e}"
+                break
+            if attempt == self.retries:
+                break
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap, self._rng)
+            if retry_after is not None and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            if time.monotonic() + delay >= deadline:
+                result.error = f"{result.error} (no time left to retry)"
+                break
+            self._sleep(delay)
+        result.elapsed = time.monotonic() - started
+        return result
+
+    def _record(self, result: JobResult) -> None:
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._lock:
+            entry = self._state.setdefault(result.job.name, {"last_success": None, "consecutive_failures": 0})
+            entry.update({
+                "model": result.job.model,
+                "product": result.job.product,
+                "bbox": result.job.bbox,
+                "day_range": result.job.day_range,
+                "status": "success" if result.ok else "error",
+                "last_attempt": now,
+                "attempts": result.attempts,
+                "elapsed_seconds": round(result.elapsed, 3),
+                "http_status": result.status_code,
+                "message": result.summary if result.ok else result.error,
+            })
+            if result.ok:
+                entry["last_success"] = now
+                entry["consecutive_failures"] = 0
+            else:
+                entry["consecutive_failures"] = int(entry.get("consecutive_failures") or 0) + 1
+
+    def job_status(self, now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """Per-job state with ``age_seconds`` since the last success and a ``stale`` flag."""
+        now = now or datetime.utcnow()
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for name, entry in self._state.items():
+                entry = dict(entry)
+                last = entry.get("last_success")
+                age = (now - datetime.fromisoformat(last.rstrip("Z"))).total_seconds() if last else None
+                entry["age_seconds"] = round(age, 1) if age is not None else None
+                entry["stale"] = age is None or age > self.stale_after
+                out[name] = entry
+        return out
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import os
+import pandas as pd
+
+from src.pipeline.grid import parse_timestamps
+
+
+DEDUP_KEYS = ["latitude", "longitude", "acq_date", "acq_time", "satellite"]
+MANIFEST_NAME = "_state.json"
+
+
+@dataclass(frozen=True)
+class AppendResult:
+    """Outcome of one incremental append."""
+
+    received: int
+    appended: int
+    duplicates: int
+    days: List[str]
+    high_water: Optional[str]
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def read_manifest(source_dir: str) -> Dict[str, Any]:
+    """Load a source's manifest (high-water mark, row count, part files per day)."""
+    path = os.path.join(source_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"high_water": None, "rows": 0, "next_part": 0, "days": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_partitions(source_dir: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Read the day partitions of one source overlapping [start, end] into a single frame.
+
+    Only partitions whose day falls in the range are opened; rows are then filtered on ``timestamp``.
+    """
+    import pyarrow.feather as feather  # only storage-backed processes pay for pyarrow's import
+
+    manifest = read_manifest(source_dir)
+    lo = start.strftime("%Y-%m-%d") if start is not None else None
+    hi = end.strftime("%Y-%m-%d") if end is not None else None
+    read_cols = None
+    if columns is not None:
+        read_cols = list(dict.fromkeys(list(columns) + (["timestamp"] if start is not None or end is not None else [])))
+    frames = []
+    for day in sorted(manifest["days"]):
+        if (lo is not None and day < lo) or (hi is not None and day > hi):
+            continue
+        for part in manifest["days"][day]:
+            frames.append(feather.read_feather(os.path.join(source_dir, part), columns=read_cols))
+    if not frames:
+        return pd.DataFrame(columns=read_cols or [])
+    df = pd.concat(frames, ignore_index=True)
+    if start is not None:
+        df = df[df["timestamp"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["timestamp"] <= pd.Timestamp(end)]
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
+
+
+class PartitionedStorage:
+    """Append-only, day-partitioned Feather storage for FIRMS detections.
+
+    Layout: ``{root}/{source}/acq_date=YYYY-MM-DD/part-NNNNNN.feather`` plus a ``_state.json``
+    manifest per source holding the high-water mark (newest detection time stored). Appends
+    write new part files only for the days they touch; nothing is rewritten.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def source_dir(self, source: str) -> str:
+        return os.path.join(self.root, source)
+
+    def manifest(self, source: str) -> Dict[str, Any]:
+        return read_manifest(self.source_dir(source))
+
+    def high_water(self, source: str) -> Optional[datetime]:
+        hw = self.manifest(source)["high_water"]
+        return datetime.fromisoformat(hw) if hw else None
+
+    def read(self, source: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+             columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        return read_partitions(self.source_dir(source), start, end, columns)
+
+    def append(self, source: str, df: pd.DataFrame) -> AppendResult:
+        """Deduplicate ``df`` against stored rows and append only the new detections.
+
+        Rows newer than the high-water mark are new by construction; older rows are checked
+        against the stored keys of their day partitions only.
+        """
+        received = int(len(df))
+        manifest = self.manifest(source)
+        if df.empty:
+            return AppendResult(received, 0, 0, [], manifest["high_water"])
+
+        df = df.copy()
+        df["acq_date"] = df["acq_date"].astype(str)
+        df["timestamp"] = parse_timestamps(df["acq_date"], df["acq_time"])
+        df = df[df["timestamp"].notna()]
+        keys = [k for k in DEDUP_KEYS if k in df.columns]
+        df = df.drop_duplicates(subset=keys)
+
+        hw = pd.Timestamp(manifest["high_water"]) if manifest["high_water"] else None
+        if hw is not None:
+            maybe_seen = df["timestamp"] <= hw
+            if maybe_seen.any():
+                old = df[maybe_seen]
+                stored = self._stored_keys(source, manifest, sorted(old["acq_date"].unique()), keys)
+                if not stored.empty:
+                    merged = old[keys].merge(stored.drop_duplicates(), on=keys, how="left", indicator=True)
+                    is_new = (merged["_merge"] == "left_only").to_numpy()
+                    df = pd.concat([old[is_new], df[~maybe_seen]])
+
+        duplicates = received - int(len(df))
+        if df.empty:
+            return AppendResult(received, 0, duplicates, [], manifest["high_water"])
+
+        import pyarrow.feather as feather
+
+        src_dir = self.source_dir(source)
+        days = sorted(df["acq_date"].unique())
+        for day, part in df.groupby("acq_date", sort=True):
+            rel = os.path.join(f"acq_date={day}", f"part-{manifest['next_part']:06d}.feather")
+            manifest["next_part"] += 1
+            os.makedirs(os.path.join(src_dir, f"acq_date={day}"), exist_ok=True)
+            _write_atomic(os.path.join(src_dir, rel), lambda p, part=part: feather.write_feather(part.reset_index(drop=True), p))
+            manifest["days"].setdefault(day, []).append(rel)
+
+        newest = df["timestamp"].max()
+        if hw is None or newest > hw:
+            manifest["high_water"] = newest.isoformat()
+        manifest["rows"] = int(manifest["rows"]) + int(len(df))
+        manifest["updated_at"] = datetime.utcnow().isoformat() + "Z"
+
+        def dump(p: str) -> None:
+            with open(p, "w") as f:
+                json.dump(manifest, f)
+        _write_atomic(os.path.join(src_dir, MANIFEST_NAME), dump)
+        return AppendResult(received, int(len(df)), duplicates, days, manifest["high_water"])
+
+    def _stored_keys(self, source: str, manifest: Dict[str, Any], days: List[str], keys: List[str]) -> pd.DataFrame:
+        import pyarrow.feather as feather
+
+        frames = []
+        for day in days:
+            for part in manifest["days"].get(day, []):
+                frames.append(feather.read_feather(os.path.join(self.source_dir(source), part), columns=keys))
+        if not frames:
+            return pd.DataFrame(columns=keys)
+        return pd.concat(frames, ignore_index=True)
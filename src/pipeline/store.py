@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from src.pipeline.archive import ARCHIVE_MANIFEST, HotspotArchive, is_archive
+from src.pipeline.grid import parse_timestamps
+from src.pipeline.index import SpatioTemporalIndex
+from src.pipeline.storage import MANIFEST_NAME, read_partitions
+
+
+CATEGORICAL_COLUMNS = ("acq_date", "daynight", "satellite", "instrument", "version", "confidence")
+COORD_DECIMALS = 5
+
+
+@dataclass(frozen=True)
+class HotspotSnapshot:
+    """Immutable view of one parsed hotspot file and its bbox/time index."""
+
+    df: pd.DataFrame
+    index: SpatioTemporalIndex
+    path: str
+    version: Tuple[int, int]
+    loaded_at: float
+    load_seconds: float
+    index_seconds: float
+    nbytes: int
+
+    @property
+    def rows(self) -> int:
+        return int(len(self.df))
+
+
+def load_hotspot_csv(path: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+    """Read a FIRMS CSV, a partitioned storage directory or a columnar archive into a typed columnar frame.
+
+    Adds a parsed ``timestamp`` column, stores coordinates as float32 and low-cardinality
+    text columns as categoricals. ``start``/``end`` (inclusive) keep only that time range; storage
+    and archives then read only the partitions or mapped rows it covers.
+    """
+    if is_archive(path):
+        df = HotspotArchive(path).read(start, end)
+    elif os.path.isdir(path):
+        df = read_partitions(path, start, end)
+    else:
+        df = pd.read_csv(path, comment="#")
+    if "timestamp" not in df.columns and "acq_date" in df.columns and "acq_time" in df.columns:
+        df["timestamp"] = parse_timestamps(df["acq_date"], df["acq_time"])
+    if not os.path.isdir(path) and (start is not None or end is not None) and "timestamp" in df.columns:
+        keep = np.ones(len(df), dtype=bool)
+        if start is not None:
+            keep &= (df["timestamp"] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            keep &= (df["timestamp"] <= pd.Timestamp(end)).to_numpy()
+        df = df[keep].reset_index(drop=True)
+    for col in ("latitude", "longitude"):
+        if col in df.columns and df[col].dtype != np.float32:
+            df[col] = df[col].astype(np.float32)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def decimal_coords(values: Any) -> np.ndarray:
+    """Widen float32 coordinates back to the decimal values FIRMS published.
+
+    FIRMS reports at most five decimals, which float32 resolves exactly for |x| < 128.
+    """
+    return np.round(np.asarray(values, dtype=np.float64), COORD_DECIMALS)
+
+
+def build_index(df: pd.DataFrame) -> SpatioTemporalIndex:
+    """Index a store frame on its decimal coordinates and parsed timestamps."""
+    n = len(df)
+    missing = np.full(n, np.nan)
+    lat = decimal_coords(df["latitude"]) if "latitude" in df.columns else missing
+    lon = decimal_coords(df["longitude"]) if "longitude" in df.columns else missing
+    ts = df["timestamp"].to_numpy(dtype="datetime64[ns]") if "timestamp" in df.columns else np.full(n, np.datetime64("NaT"), "datetime64[ns]")
+    return SpatioTemporalIndex(lat, lon, ts)
+
+
+def file_version(path: str) -> Tuple[int, int]:
+    """Return (mtime_ns, size) for ``path`` (its manifest for storage and archive directories).
+
+    Raises OSError if it does not exist.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, ARCHIVE_MANIFEST if is_archive(path) else MANIFEST_NAME)
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class HotspotStore:
+    """Process-wide cache of parsed hotspot files, reloaded when mtime/size change.
+
+    Columnar archives hold whole histories; with ``archive_days`` only their last ``archive_days``
+    days (counted back from the newest detection) are mapped, not everything ever archived.
+    With ``auto_reload`` off a loaded snapshot is served as is, whatever happens to its file.
+    """
+
+    def __init__(self, files: Dict[str, str], archive_days: Optional[float] = None, auto_reload: bool = True) -> None:
+        self.files = dict(files)
+        self.archive_days = archive_days
+        self.auto_reload = auto_reload
+        self._snapshots: Dict[str, HotspotSnapshot] = {}
+        self._reloads: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str) -> HotspotSnapshot:
+        """Return the current snapshot for ``model``, parsing the file only if it changed."""
+        path = self.files[model]
+        snap = self._snapshots.get(model)
+        if snap is not None and not self.auto_reload:
+            return snap
+        version = file_version(path)
+        if snap is not None and snap.version == version:
+            return snap
+        with self._lock:
+            snap = self._snapshots.get(model)
+            version = file_version(path)
+            if snap is not None and snap.version == version:
+                return snap
+            t0 = time.perf_counter()
+            df = load_hotspot_csv(path, self._window_start(path))
+            t1 = time.perf_counter()
+            index = build_index(df)
+            snap = HotspotSnapshot(
+                df=df,
+                index=index,
+                path=path,
+                version=version,
+                loaded_at=time.time(),
+                load_seconds=t1 - t0,
+                index_seconds=time.perf_counter() - t1,
+                nbytes=int(df.memory_usage(index=True, deep=True).sum()),
+            )
+            self._snapshots[model] = snap
+            self._reloads[model] = self._reloads.get(model, 0) + 1
+            return snap
+
+    def _window_start(self, path: str) -> Optional[np.datetime64]:
+        if self.archive_days is None or not is_archive(path):
+            return None
+        _, newest = HotspotArchive(path).time_range
+        if newest is None:
+            return None
+        return newest - np.timedelta64(int(self.archive_days * 86400), "s")
+
+    def peek(self, model: str) -> Optional[HotspotSnapshot]:
+        """Return the loaded snapshot without touching the filesystem."""
+        return self._snapshots.get(model)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-source load time, row count and in-memory size of the loaded snapshots."""
+        out: Dict[str, Any] = {}
+        for model, path in self.files.items():
+            snap = self._snapshots.get(model)
+            if snap is None:
+                out[model] = {"path": path, "loaded": False}
+                continue
+            out[model] = {
+                "path": path,
+                "loaded": True,
+                "rows": snap.rows,
+                "bytes": snap.nbytes,
+                "load_seconds": round(snap.load_seconds, 6),
+                "index_seconds": round(snap.index_seconds, 6),
+                "index_cells": snap.index.n_cells,
+                "loaded_at": snap.loaded_at,
+                "mtime_ns": snap.version[0],
+                "file_size": snap.version[1],
+                "reloads": self._reloads.get(model, 0),
+            }
+        return out
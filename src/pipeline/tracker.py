@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.neighbors import KDTree
+
+from src.pipeline.events import _to_km_coords
+
+
+_EPOCH = np.datetime64("2000-01-01T00:00:00", "ns")
+
+
+@dataclass
+class EventStats:
+    """Running aggregates of one tracked event (FRP mean/variance via Welford/Chan updates)."""
+
+    event_id: int
+    count: int
+    start_time: pd.Timestamp
+    end_time: pd.Timestamp
+    lat_sum: float
+    lon_sum: float
+    frp_count: int = 0
+    frp_mean: float = 0.0
+    frp_m2: float = 0.0
+    max_frp: float = float("nan")
+
+    def add_frp(self, n: int, mean: float, m2: float, max_frp: float) -> None:
+        """Fold in a batch of ``n`` FRP values with the given mean, sum of squared deviations and max."""
+        if n == 0:
+            return
+        total = self.frp_count + n
+        delta = mean - self.frp_mean
+        self.frp_mean += delta * n / total
+        self.frp_m2 += m2 + delta * delta * self.frp_count * n / total
+        self.frp_count = total
+        self.max_frp = max_frp if np.isnan(self.max_frp) else max(self.max_frp, max_frp)
+
+    def absorb(self, other: "EventStats") -> None:
+        """Merge another event's aggregates into this one."""
+        self.count += other.count
+        self.start_time = min(self.start_time, other.start_time)
+        self.end_time = max(self.end_time, other.end_time)
+        self.lat_sum += other.lat_sum
+        self.lon_sum += other.lon_sum
+        if other.frp_count:
+            self.add_frp(other.frp_count, other.frp_mean, other.frp_m2, other.max_frp)
+
+    def as_row(self) -> Dict[str, object]:
+        """Aggregates in ``aggregate_event_features`` column layout (sample std, like pandas)."""
+        std = float(np.sqrt(self.frp_m2 / (self.frp_count - 1))) if self.frp_count > 1 else float("nan")
+        return {
+            "event_id": self.event_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "count": self.count,
+            "lat_mean": self.lat_sum / self.count,
+            "lon_mean": self.lon_sum / self.count,
+            "max_frp": self.max_frp,
+            "mean_frp": self.frp_mean if self.frp_count else float("nan"),
+            "std_frp": std,
+            "duration_hours": (self.end_time - self.start_time).total_seconds() / 3600.0,
+        }
+
+
+class EventTracker:
+    """Stateful, incremental counterpart of ``cluster_events`` + ``aggregate_event_features``.
+
+    Each ``update`` links the new detections to each other and to the recent detections of open
+    events whenever they lie within the fused (``spatial_eps_km``, ``temporal_eps_minutes``)
+    radius, i.e. single-linkage with the same eps as the batch DBSCAN. A linked group joins the
+    open event it touches (merging events it bridges, into the oldest id) or starts a new event
+    once it has ``min_samples`` detections; smaller groups stay pending and can still join later.
+    Events with no detection for longer than ``temporal_eps_minutes`` behind the newest one seen
+    are closed. Only detections within ``temporal_eps_minutes`` of the newest are kept for
+    matching, so an update costs O(new rows + recent window) regardless of total history.
+    """
+
+    def __init__(self, spatial_eps_km: float = 1.5, temporal_eps_minutes: int = 240, min_samples: int = 2) -> None:
+        self.spatial_eps_km = float(spatial_eps_km)
+        self.temporal_eps_minutes = int(temporal_eps_minutes)
+        self.min_samples = int(min_samples)
+        self.open: Dict[int, EventStats] = {}
+        self.closed: List[EventStats] = []
+        self.merged_into: Dict[int, int] = {}
+        self.watermark: Optional[pd.Timestamp] = None
+        self._next_id = 0
+        # Recent detections available for matching: fused coordinates, times, event id (-1 = pending)
+        self._X = np.zeros((0, 3))
+        self._times = np.zeros(0, dtype="datetime64[ns]")
+        self._lat = np.zeros(0)
+        self._lon = np.zeros(0)
+        self._frp = np.zeros(0)
+        self._event = np.zeros(0, dtype=np.int64)
+
+    def _fused(self, lat: np.ndarray, lon: np.ndarray, times: np.ndarray) -> np.ndarray:
+        lat_km, lon_km = _to_km_coords(lat, lon)
+        minutes = (times - _EPOCH).astype("timedelta64[s]").astype(np.int64) / 60.0
+        return np.column_stack([lat_km / self.spatial_eps_km, lon_km / self.spatial_eps_km, minutes / self.temporal_eps_minutes])
+
+    def update(self, df: pd.DataFrame, timestamp_col: str = "timestamp", lat_col: str = "latitude",
+               lon_col: str = "longitude", frp_col: Optional[str] = "frp") -> pd.Series:
+        """Track a batch of new detections; returns their event ids aligned with ``df.index`` (-1 = pending)."""
+        if df.empty:
+            return pd.Series([], dtype=np.int64, name="event_id")
+        times = pd.to_datetime(df[timestamp_col]).to_numpy(dtype="datetime64[ns]")
+        lat = df[lat_col].to_numpy(dtype=float)
+        lon = df[lon_col].to_numpy(dtype=float)
+        frp = df[frp_col].to_numpy(dtype=float) if frp_col and frp_col in df.columns else np.full(len(df), np.nan)
+        valid = ~np.isnat(times) & np.isfinite(lat) & np.isfinite(lon)
+        out = np.full(len(df), -1, dtype=np.int64)
+        rows = np.flatnonzero(valid)
+        if rows.size == 0:
+            return pd.Series(out, index=df.index, name="event_id")
+
+        X_new = self._fused(lat[rows], lon[rows], times[rows])
+        n_old = self._X.shape[0]
+        X = np.vstack([self._X, X_new])
+        all_times = np.concatenate([self._times, times[rows]])
+        all_lat = np.concatenate([self._lat, lat[rows]])
+        all_lon = np.concatenate([self._lon, lon[rows]])
+        all_frp = np.concatenate([self._frp, frp[rows]])
+        event = np.concatenate([self._event, np.full(rows.size, -1, dtype=np.int64)])
+
+        # Link new detections to everything within eps (old-old links are already resolved)
+        neighbors = KDTree(X).query_radius(X_new, r=1.0)
+        src = np.repeat(np.arange(n_old, X.shape[0]), [len(nb) for nb in neighbors])
+        dst = np.concatenate(neighbors)
+        graph = coo_matrix((np.ones(src.size, dtype=np.int8), (src, dst)), shape=(X.shape[0], X.shape[0]))
+        _, comp = connected_components(graph, directed=True, connection="weak")
+
+        new_comp = comp[n_old:]
+        touched = np.unique(new_comp)
+        members = np.flatnonzero(np.isin(comp, touched))
+        order = members[np.argsort(comp[members], kind="stable")]
+        splits = np.flatnonzero(np.diff(comp[order])) + 1
+        for group in np.split(order, splits):
+            fresh = group[group >= n_old]
+            pending = group[(group < n_old) & (event[group] < 0)]
+            ids = np.unique(event[group][event[group] >= 0])
+            if ids.size == 0 and group.size < self.min_samples:
+                continue
+            if ids.size == 0:
+                target = self._new_event(all_times[fresh[0]])
+            else:
+                target = int(ids[0])
+                for other in ids[1:].tolist():
+                    self.open[target].absorb(self.open.pop(other))
+                    self.merged_into[other] = target
+                    event[event == other] = target
+            joined = np.concatenate([pending, fresh])
+            self._add(self.open[target], all_times[joined], all_lat[joined], all_lon[joined], all_frp[joined])
+            event[joined] = target
+
+        out[rows] = event[n_old:]
+        newest = pd.Timestamp(all_times[n_old:].max())
+        self.watermark = newest if self.watermark is None else max(self.watermark, newest)
+        self._retain(X, all_times, all_lat, all_lon, all_frp, event)
+        return pd.Series(out, index=df.index, name="event_id")
+
+    def _new_event(self, first_time: np.datetime64) -> int:
+        event_id = self._next_id
+        self._next_id += 1
+        ts = pd.Timestamp(first_time)
+        self.open[event_id] = EventStats(event_id=event_id, count=0, start_time=ts, end_time=ts, lat_sum=0.0, lon_sum=0.0)
+        return event_id
+
+    def _add(self, stats: EventStats, times: np.ndarray, lat: np.ndarray, lon: np.ndarray, frp: np.ndarray) -> None:
+        stats.count += int(times.size)
+        stats.start_time = min(stats.start_time, pd.Timestamp(times.min()))
+        stats.end_time = max(stats.end_time, pd.Timestamp(times.max()))
+        stats.lat_sum += float(lat.sum())
+        stats.lon_sum += float(lon.sum())
+        frp = frp[np.isfinite(frp)]
+        if frp.size:
+            mean = float(frp.mean())
+            stats.add_frp(int(frp.size), mean, float(((frp - mean) ** 2).sum()), float(frp.max()))
+
+    def _retain(self, X: np.ndarray, times: np.ndarray, lat: np.ndarray, lon: np.ndarray, frp: np.ndarray, event: np.ndarray) -> None:
+        """Close quiet events and keep only detections recent enough to match future ones."""
+        horizon = self.watermark - pd.Timedelta(minutes=self.temporal_eps_minutes)
+        for event_id in [e for e, s in self.open.items() if s.end_time < horizon]:
+            self.closed.append(self.open.pop(event_id))
+        keep = times >= np.datetime64(horizon.to_datetime64(), "ns")
+        keep &= (event < 0) | np.isin(event, np.fromiter(self.open, dtype=np.int64, count=len(self.open)))
+        self._X, self._times, self._lat, self._lon, self._frp, self._event = X[keep], times[keep], lat[keep], lon[keep], frp[keep], event[keep]
+
+    def resolve(self, event_id: int) -> int:
+        """Follow merges to the id that now holds ``event_id``'s detections."""
+        while event_id in self.merged_into:
+            event_id = self.merged_into[event_id]
+        return event_id
+
+    def drain_closed(self) -> List[EventStats]:
+        """Return and forget the events closed since the last call."""
+        closed, self.closed = self.closed, []
+        return closed
+
+    def to_frame(self, include_closed: bool = True) -> pd.DataFrame:
+        """Open (and not yet drained closed) events as an ``aggregate_event_features``-style frame."""
+        events = list(self.open.values()) + (self.closed if include_closed else [])
+        if not events:
+            return pd.DataFrame()
+        frame = pd.DataFrame([e.as_row() for e in events])
+        frame["open"] = frame["event_id"].isin(list(self.open))
+        return frame.sort_values("event_id").reset_index(drop=True)
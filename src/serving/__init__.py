@@ -0,0 +1,2 @@
+"""API serving helpers (response caching, encoding, streaming)."""
+
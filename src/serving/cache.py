@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+
+class ResultCache:
+    """Thread-safe LRU cache of encoded responses with a TTL and a total byte cap.
+
+    Keys are ``(namespace, params)`` tuples. Each namespace carries a version (e.g. data file
+    and model versions); calling ``set_version`` with a new value drops that namespace's entries.
+    ``put`` takes the version the value was computed from and ignores values of a superseded version.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 600.0) -> None:
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[bytes, float]]" = OrderedDict()
+        self._versions: Dict[str, Hashable] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def set_version(self, namespace: str, version: Hashable) -> None:
+        """Record the current version of ``namespace``, dropping its entries if it changed."""
+        with self._lock:
+            if self._versions.get(namespace, version) != version:
+                for key in [k for k in self._entries if k[0] == namespace]:
+                    self._drop(key)
+                self.invalidations += 1
+            self._versions[namespace] = version
+
+    def get(self, namespace: str, params: Hashable) -> Optional[bytes]:
+        key = (namespace, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, namespace: str, params: Hashable, value: bytes, version: Hashable = None) -> None:
+        """Store ``value``; entries larger than the whole budget are not cached.
+
+        With ``version``, the value is dropped if the namespace has moved to another version since
+        (e.g. the data changed while the response was computed).
+        """
+        if len(value) > self.max_bytes:
+            return
+        key = (namespace, params)
+        with self._lock:
+            if version is not None and self._versions.get(namespace, version) != version:
+                self.stale_puts += 1
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: Tuple[str, Hashable]) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import json
+import threading
+import time
+import uuid
+import numpy as np
+import pandas as pd
+
+from src.pipeline.storage import DEDUP_KEYS
+from src.pipeline.store import file_version
+
+
+@dataclass
+class Change:
+    """One entry of the change feed: new detections of one source, or a fetch status update."""
+
+    seq: int
+    kind: str  # "data" or "status"
+    model: Optional[str]
+    at: float
+    data_version: Optional[Tuple[int, int]] = None
+    added: Optional[pd.DataFrame] = None
+    removed: int = 0
+    status: Optional[Dict[str, Any]] = None
+    encoded: Dict[Any, bytes] = field(default_factory=dict)  # memoized response fragments
+
+
+def row_keys(df: pd.DataFrame) -> np.ndarray:
+    """Hash of each detection's dedup key (lat/lon/acq_date/acq_time/satellite)."""
+    keys = [k for k in DEDUP_KEYS if k in df.columns]
+    if not keys or df.empty:
+        return np.zeros(len(df), dtype=np.uint64)
+    frame = df[keys].copy()
+    if "acq_date" in frame.columns:
+        frame["acq_date"] = frame["acq_date"].astype(str)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+class ChangeFeed:
+    """Bounded, in-memory log of data and fetch status changes with a resumable cursor.
+
+    ``observe`` diffs each new store snapshot against the previous one by detection key and
+    appends the added rows; ``observe_status`` appends fetch status updates. Cursors are
+    ``"{epoch}-{seq}"``: the epoch is drawn once per feed, so processes forked from the one that
+    records the changes (gunicorn workers) share its cursors, while a cursor from a restarted
+    server (or one older than the retained history) asks the client for a full reload.
+    """
+
+    def __init__(self, max_changes: int = 256) -> None:
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self._changes: Deque[Change] = deque(maxlen=max_changes)
+        self._keys: Dict[str, Tuple[Tuple[int, int], np.ndarray]] = {}
+        self._status_version: Optional[Tuple[int, int]] = None
+        self._cond = threading.Condition()
+        self.closed = False
+
+    @property
+    def cursor(self) -> str:
+        return self.cursor_at(self.seq)
+
+    def cursor_at(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def _append(self, change: Change) -> None:
+        with self._cond:
+            self._changes.append(change)
+            self.seq = change.seq
+            self._cond.notify_all()
+
+    def observe(self, model: str, df: pd.DataFrame, data_version: Tuple[int, int]) -> Optional[Change]:
+        """Record ``df`` as the current data of ``model``; returns the change if it differs from the last one seen."""
+        seen = self._keys.get(model)
+        if seen is not None and seen[0] == data_version:
+            return None
+        keys = row_keys(df)
+        known = np.sort(keys)
+        with self._cond:
+            seen = self._keys.get(model)
+            if seen is not None and seen[0] == data_version:
+                return None
+            self._keys[model] = (data_version, known)
+            if seen is None:
+                return None  # first sighting is the baseline clients load in full
+            previous = seen[1]
+            is_new = ~np.isin(keys, previous, assume_unique=False)
+            removed = int(np.count_nonzero(~np.isin(previous, known)))
+            change = Change(
+                seq=self.seq + 1, kind="data", model=model, at=time.time(),
+                data_version=data_version, added=df[is_new], removed=removed,
+            )
+            self._append(change)
+            return change
+
+    def observe_status(self, path: str) -> Optional[Change]:
+        """Record the fetch status file at ``path`` if its mtime/size changed since the last call."""
+        try:
+            version = file_version(path)
+        except OSError:
+            return None
+        if version == self._status_version:
+            return None
+        try:
+            with open(path) as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._cond:
+            if version == self._status_version:
+                return None
+            first = self._status_version is None
+            self._status_version = version
+            if first:
+                return None
+            change = Change(seq=self.seq + 1, kind="status", model=None, at=time.time(), status=status)
+            self._append(change)
+            return change
+
+    def since(self, cursor: Optional[str]) -> Tuple[bool, List[Change], int]:
+        """Changes after ``cursor`` as (reset, changes, current seq); ``reset`` means the client must reload in full."""
+        with self._cond:
+            changes = list(self._changes)
+            seq = self.seq
+        if not cursor:
+            return True, [], seq
+        epoch, _, value = cursor.partition("-")
+        try:
+            after = int(value)
+        except ValueError:
+            return True, [], seq
+        if epoch != self.epoch or after > seq:
+            return True, [], seq
+        oldest = changes[0].seq if changes else seq + 1
+        if after < oldest - 1:
+            return True, [], seq
+        return False, [c for c in changes if c.seq > after], seq
+
+    def wait(self, after_seq: int, timeout: float) -> bool:
+        """Block until a change newer than ``after_seq`` exists, the feed closes or ``timeout`` passes; True if a change does."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > after_seq or self.closed, timeout=timeout)
+            return self.seq > after_seq
+
+    def close(self) -> None:
+        """Wake every waiter and mark the feed closed so open streams end (e.g. on worker shutdown)."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "cursor": self.cursor,
+                "retained": len(self._changes),
+                "oldest_seq": self._changes[0].seq if self._changes else None,
+                "sources": {m: {"mtime_ns": v[0], "file_size": v[1]} for m, (v, _) in self._keys.items()},
+            }
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import os
+import re
+
+
+BLOCK_SIZE = 64 * 1024
+MAX_READ_BYTES = 1024 * 1024  # cap on one incremental read; older lines are skipped beyond it
+
+# "%(asctime)s %(levelname)s %(message)s" records; other lines continue the previous record
+_RECORD = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} ([A-Z]+) ")
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+
+@dataclass(frozen=True)
+class LogFilter:
+    """Keep records at or above ``min_level`` whose line contains ``contains`` (case-insensitive).
+
+    Continuation lines (e.g. tracebacks) take the level of the record they belong to; lines
+    before the first record header in the window only pass when no level is required.
+    """
+
+    min_level: Optional[int] = None
+    contains: Optional[str] = None
+
+    @classmethod
+    def parse(cls, level: Optional[str], contains: Optional[str]) -> "LogFilter":
+        min_level = LEVELS.get(level.upper()) if level else None
+        return cls(min_level=min_level, contains=contains.lower() if contains else None)
+
+    @property
+    def active(self) -> bool:
+        return self.min_level is not None or self.contains is not None
+
+    def apply(self, lines: List[str]) -> List[str]:
+        if not self.active:
+            return lines
+        out = []
+        level = None
+        for line in lines:
+            m = _RECORD.match(line)
+            if m is not None:
+                level = LEVELS.get(m.group(1), 0)
+            if self.min_level is not None and (level is None or level < self.min_level):
+                continue
+            if self.contains is not None and self.contains not in line.lower():
+                continue
+            out.append(line)
+        return out
+
+
+@dataclass(frozen=True)
+class LogChunk:
+    """Lines read from a log file and the cursor (inode, byte offset after the last complete line)."""
+
+    lines: List[str]
+    offset: int
+    inode: int
+    rotated: bool = False
+    truncated: bool = False
+
+
+def _decode(raw: List[bytes]) -> List[str]:
+    return [line.decode("utf-8", errors="replace") + "\n" for line in raw]
+
+
+def tail(path: str, n: int, log_filter: Optional[LogFilter] = None, block_size: int = BLOCK_SIZE,
+         partial: bool = False) -> LogChunk:
+    """Last ``n`` (matching) lines of ``path``, read backward from the end in ``block_size`` blocks.
+
+    With ``partial`` a trailing line without newline is included, like ``readlines()``; otherwise
+    it is left for the next incremental read and the returned offset stops before it.
+    """
+    log_filter = log_filter or LogFilter()
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        end = st.st_size
+        pos = end
+        head = b""  # start of the earliest line read so far, which may begin in the previous block
+        held: List[str] = []  # continuation lines whose record header lies further back
+        tail_bytes: Optional[bytes] = None
+        blocks: List[List[str]] = []  # matching lines of each block, newest first
+        found = 0
+        while pos > 0 and found < n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            raw = (f.read(step) + head).split(b"\n")
+            head = raw[0]
+            complete = raw[1:]
+            if tail_bytes is None:
+                if not complete:
+                    continue
+                tail_bytes = complete.pop()
+            if pos == 0:
+                complete.insert(0, head)
+            # Only the new block's lines are filtered; continuation lines wait for their header
+            lines = _decode(complete) + held
+            held = []
+            if log_filter.active and pos > 0:
+                first = next((i for i, line in enumerate(lines) if _RECORD.match(line)), len(lines))
+                held, lines = lines[:first], lines[first:]
+            lines = log_filter.apply(lines)
+            blocks.append(lines)
+            found += len(lines)
+        if tail_bytes is None:
+            tail_bytes = head
+        lines = [line for block in reversed(blocks) for line in block]
+        if partial and tail_bytes and not log_filter.active:
+            lines = lines + [tail_bytes.decode("utf-8", errors="replace")]
+        return LogChunk(lines=lines[-n:] if n > 0 else [], offset=end - len(tail_bytes), inode=st.st_ino)
+
+
+def _read_range(path: str, start: int, end: int, skip_partial: bool = False) -> Tuple[List[bytes], int]:
+    """Complete lines in ``[start, end)`` and the offset just after the last one.
+
+    With ``skip_partial`` a first line that starts mid-line (``start`` does not follow a newline)
+    is dropped.
+    """
+    with open(path, "rb") as f:
+        mid_line = False
+        if skip_partial and start > 0:
+            f.seek(start - 1)
+            mid_line = f.read(1) != b"\n"
+        f.seek(start)
+        data = f.read(max(end - start, 0))
+    cut = data.rfind(b"\n")
+    if cut < 0:
+        return [], start
+    lines = data[:cut].split(b"\n")
+    return lines[1:] if mid_line else lines, start + cut + 1
+
+
+def read_after(path: str, offset: int, inode: Optional[int] = None, log_filter: Optional[LogFilter] = None,
+               max_bytes: int = MAX_READ_BYTES) -> LogChunk:
+    """Complete lines appended to ``path`` since byte ``offset``.
+
+    A different inode, or a file shorter than ``offset``, means the handler rotated it: the rest of
+    the previous file (``path.1``, if it is the one the cursor pointed into) is returned first,
+    then the new file from the start. At most ``max_bytes`` are read; beyond that the oldest new
+    lines are skipped and ``truncated`` is set.
+    """
+    log_filter = log_filter or LogFilter()
+    st = os.stat(path)
+    raw: List[bytes] = []
+    rotated = (inode is not None and st.st_ino != inode) or offset > st.st_size
+    truncated = False
+    if rotated:
+        previous = f"{path}.1"
+        try:
+            prev_st = os.stat(previous)
+        except OSError:
+            prev_st = None
+        if prev_st is not None and (inode is None or prev_st.st_ino == inode) and prev_st.st_size >= offset:
+            start = max(offset, prev_st.st_size - max_bytes)
+            truncated = start > offset
+            raw, _ = _read_range(previous, start, prev_st.st_size, skip_partial=truncated)
+        offset = 0
+    size = st.st_size
+    start = offset
+    if size - start > max_bytes:
+        start, truncated = size - max_bytes, True
+    new, end = _read_range(path, start, size, skip_partial=start > offset)
+    raw.extend(new)
+    return LogChunk(lines=log_filter.apply(_decode(raw)), offset=max(end, offset), inode=st.st_ino,
+                    rotated=rotated, truncated=truncated)
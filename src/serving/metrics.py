@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import bisect
+import math
+import os
+import sys
+import threading
+import time
+
+
+# Seconds; upper bounds of the latency histograms (+Inf is implicit)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, Any], float]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in key) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int) -> None:
+        self.counts = [0] * n_buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms rendered in the Prometheus text format.
+
+    Series are created on first use, keyed by metric name and labels; every name gets ``prefix``.
+    ``describe`` sets a metric's type and help line. Values owned by other objects (cache, store
+    and inference engine counters) are added at scrape time by ``register``-ed collectors, which
+    return ``(name, labels, value)`` samples for described metrics.
+    """
+
+    def __init__(self, prefix: str = "", buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._scalars: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        """Declare ``name`` as a ``counter``, ``gauge`` or ``histogram`` with a help line."""
+        self._meta[name] = (kind, help_text)
+
+    def register(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append(collector)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._scalars.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._scalars.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(len(self.buckets))
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(hist.counts):
+                hist.counts[i] += 1
+            hist.sum += value
+            hist.count += 1
+
+    def value(self, name: str, **labels: Any) -> float:
+        """Current value of a counter or gauge series (0 if never set)."""
+        with self._lock:
+            return self._scalars.get(name, {}).get(_label_key(labels), 0)
+
+    def render(self) -> str:
+        """All series in the Prometheus text exposition format (version 0.0.4)."""
+        collected: Dict[str, Dict[LabelKey, float]] = {}
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                collected.setdefault(name, {})[_label_key(labels)] = value
+        with self._lock:
+            scalars = {name: dict(series) for name, series in self._scalars.items()}
+            histograms = {
+                name: {key: (list(h.counts), h.sum, h.count) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+        for name, series in collected.items():
+            scalars.setdefault(name, {}).update(series)
+
+        lines: List[str] = []
+        for name in sorted(set(scalars) | set(histograms)):
+            kind, help_text = self._meta.get(name, ("histogram" if name in histograms else "untyped", ""))
+            full = f"{self.prefix}{name}"
+            if help_text:
+                lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            for key, value in sorted(scalars.get(name, {}).items()):
+                lines.append(f"{full}{_format_labels(key)} {_format_value(value)}")
+            for key, (counts, total, count) in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append(f"{full}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f"{full}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{full}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{full}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write_textfile(self, path: str) -> None:
+        """Atomically write ``render()`` to ``path`` (for processes without an HTTP endpoint)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    @contextmanager
+    def span(self, stage: str, **labels: Any) -> Iterator[None]:
+        """Time the block into ``stage_seconds{stage=...}`` and the current thread's trace, if any.
+
+        Inside a trace the trace's ``endpoint`` label is added unless ``labels`` set one.
+        """
+        trace = current_trace()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - t0, trace, **labels)
+
+    def record_stage(self, stage: str, seconds: float, trace: Optional["RequestTrace"] = None, **labels: Any) -> None:
+        if trace is not None:
+            trace.add(stage, seconds)
+            labels.setdefault("endpoint", trace.name)
+        self.observe("stage_seconds", seconds, stage=stage, **labels)
+
+    def timed_chunks(self, chunks: Iterable[bytes], stage: str, trace: Optional["RequestTrace"] = None,
+                     **labels: Any) -> Iterator[bytes]:
+        """Pass ``chunks`` through, recording the time spent producing them as one ``stage`` span.
+
+        Streamed bodies are produced after the view returns, so the trace is captured here, up
+        front. Time spent in nested ``timed_chunks`` (e.g. serializing under compression) is
+        counted by the inner stage only.
+        """
+        return self._timed_chunks(iter(chunks), stage, trace or current_trace(), labels)
+
+    def _timed_chunks(self, it: Iterator[bytes], stage: str, trace: Optional["RequestTrace"],
+                      labels: Dict[str, Any]) -> Iterator[bytes]:
+        timers = _local.__dict__.setdefault("timers", [])
+        elapsed = 0.0
+        try:
+            while True:
+                timer = [0.0]  # time spent in nested timed chunks during this step
+                timers.append(timer)
+                t0 = time.perf_counter()
+                try:
+                    piece = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    step = time.perf_counter() - t0
+                    timers.pop()
+                    elapsed += step - timer[0]
+                    if timers:
+                        timers[-1][0] += step
+                yield piece
+        finally:
+            self.record_stage(stage, elapsed, trace, **labels)
+
+
+class RequestTrace:
+    """Stage timings, byte count and (when profiled) stack samples of one request."""
+
+    def __init__(self, name: str, path: str = "") -> None:
+        self.name = name
+        self.path = path or name
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.bytes = 0
+        self.samples: Counter = Counter()
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        stages = ", ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in self.stages.items())
+        return f"{stages or 'no stages'}; {self.bytes} bytes"
+
+
+_local = threading.local()
+
+
+def start_trace(name: str, path: str = "") -> RequestTrace:
+    """Begin a trace for the current thread's request; spans in this thread add to it."""
+    trace = _local.trace = RequestTrace(name, path)
+    return trace
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return getattr(_local, "trace", None)
+
+
+def detach_trace() -> Optional[RequestTrace]:
+    """Stop attributing this thread's spans to its trace; returns the trace."""
+    trace = current_trace()
+    _local.trace = None
+    return trace
+
+
+def _frame_name(frame: Any) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """Statistical profiler for individual requests.
+
+    While traces are ``watch``-ed, one daemon thread samples their threads' Python stacks every
+    ``interval`` seconds via ``sys._current_frames()`` and counts each stack in folded form
+    (``file:function;...`` from root to leaf, as read by flamegraph tools). Nothing runs while no
+    request is watched; ``dump`` writes a trace's samples for requests worth a closer look.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = max(0.001, float(interval))
+        self._watched: Dict[int, RequestTrace] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, trace: RequestTrace) -> None:
+        with self._cond:
+            self._watched[id(trace)] = trace
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def unwatch(self, trace: RequestTrace) -> None:
+        with self._cond:
+            self._watched.pop(id(trace), None)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            with self._cond:
+                while not self._watched:
+                    self._cond.wait()
+                traces = list(self._watched.values())
+            frames = sys._current_frames()
+            for trace in traces:
+                frame = frames.get(trace.thread_id)
+                if frame is None or trace.thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                trace.samples[";".join(reversed(stack))] += 1
+            del frames
+            time.sleep(self.interval)
+
+    def dump(self, trace: RequestTrace, directory: str) -> Optional[str]:
+        """Write the trace's folded stacks to ``directory``; returns the path (None without samples)."""
+        if not trace.samples:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{trace.name}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{id(trace):x}.folded")
+        with open(path, "w") as f:
+            for stack, count in trace.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import json
+import struct
+import numpy as np
+import pandas as pd
+
+
+PACKED_MAGIC = b"HSP1"
+PACKED_MIMETYPE = "application/x-hotspots-packed"
+
+_DTYPES = {"float32": np.float32, "int32": np.int32, "uint8": np.uint8, "uint16": np.uint16}
+MISSING_TIME = np.iinfo(np.int32).min
+
+
+def _code_dtype(n_categories: int) -> str:
+    # The maximum code value is reserved for missing entries
+    if n_categories < np.iinfo(np.uint8).max:
+        return "uint8"
+    if n_categories < np.iinfo(np.uint16).max:
+        return "uint16"
+    return "int32"
+
+
+def pack_table(columns: Dict[str, np.ndarray], categorical: Optional[Dict[str, pd.Categorical]] = None,
+               meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """Pack equal-length columns into one little-endian buffer of aligned typed arrays.
+
+    Layout: ``b"HSP1"``, uint32 header length, UTF-8 JSON header (padded to 4 bytes), then the
+    column data; each column starts ``offset`` bytes into the data section. Categorical columns
+    are stored as integer codes plus a ``categories`` list; the dtype's max value marks missing.
+    """
+    categorical = categorical or {}
+    names = list(columns) + list(categorical)
+    rows = len(columns[names[0]]) if names else 0
+    blobs: List[bytes] = []
+    specs: List[Dict[str, Any]] = []
+    for name, values in columns.items():
+        arr = np.asarray(values)
+        dtype = "int32" if arr.dtype.kind in "iu" else "float32"
+        blobs.append(arr.astype(np.dtype(_DTYPES[dtype]).newbyteorder("<")).tobytes())
+        specs.append({"name": name, "type": dtype})
+    for name, cat in categorical.items():
+        cat = pd.Categorical(cat)
+        dtype = _code_dtype(len(cat.categories))
+        codes = np.asarray(cat.codes, dtype=np.int64)
+        codes[codes < 0] = np.iinfo(_DTYPES[dtype]).max
+        blobs.append(codes.astype(np.dtype(_DTYPES[dtype]).newbyteorder("<")).tobytes())
+        specs.append({"name": name, "type": dtype, "categories": [c.item() if isinstance(c, np.generic) else c for c in cat.categories]})
+
+    offset = 0
+    for spec, blob in zip(specs, blobs):
+        spec["offset"] = offset
+        offset += (len(blob) + 3) // 4 * 4
+    header = json.dumps({"rows": rows, "columns": specs, "meta": meta or {}}, separators=(",", ":")).encode("utf-8")
+    header += b" " * (-len(header) % 4)
+
+    parts = [PACKED_MAGIC, struct.pack("<I", len(header)), header]
+    for blob in blobs:
+        parts.append(blob)
+        parts.append(b"\0" * (-len(blob) % 4))
+    return b"".join(parts)
+
+
+def unpack_table(buf: bytes) -> Dict[str, Any]:
+    """Decode a ``pack_table`` buffer into ``{"rows", "meta", "columns"}`` (zero-copy NumPy views)."""
+    if buf[:4] != PACKED_MAGIC:
+        raise ValueError("Not a packed hotspot buffer")
+    (header_len,) = struct.unpack_from("<I", buf, 4)
+    header = json.loads(bytes(buf[8:8 + header_len]).decode("utf-8"))
+    data_start = 8 + header_len
+    out: Dict[str, Any] = {}
+    for spec in header["columns"]:
+        dtype = np.dtype(_DTYPES[spec["type"]]).newbyteorder("<")
+        values = np.frombuffer(buf, dtype=dtype, count=header["rows"], offset=data_start + spec["offset"])
+        if "categories" in spec:
+            missing = values == np.iinfo(dtype).max
+            values = pd.Categorical.from_codes(np.where(missing, -1, values).astype(np.int64), spec["categories"])
+        out[spec["name"]] = values
+    return {"rows": header["rows"], "meta": header["meta"], "columns": out}
+
+
+def pack_hotspots(df: pd.DataFrame, brightness_col: str, meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """Pack a hotspot store frame: lon/lat float32, epoch-minute int32 ``t``, FRP/brightness float32.
+
+    Categorical store columns (confidence, daynight, satellite) are dictionary encoded; numeric
+    confidence (MODIS) is sent as float32.
+    """
+    n = len(df)
+    ts = df["timestamp"].to_numpy(dtype="datetime64[ns]") if "timestamp" in df.columns else np.full(n, np.datetime64("NaT"), "datetime64[ns]")
+    minutes = ts.astype("datetime64[m]").astype(np.int64)
+    minutes[np.isnat(ts)] = MISSING_TIME
+    columns: Dict[str, np.ndarray] = {
+        "lon": df["longitude"].to_numpy(dtype=np.float32),
+        "lat": df["latitude"].to_numpy(dtype=np.float32),
+        "t": minutes.astype(np.int32),
+        "frp": df["frp"].to_numpy(dtype=np.float32) if "frp" in df.columns else np.full(n, np.nan, np.float32),
+        "brightness": df[brightness_col].to_numpy(dtype=np.float32) if brightness_col in df.columns else np.full(n, np.nan, np.float32),
+    }
+    categorical: Dict[str, pd.Categorical] = {}
+    for name in ("confidence", "daynight", "satellite"):
+        if name not in df.columns:
+            continue
+        col = df[name]
+        if isinstance(col.dtype, pd.CategoricalDtype) or col.dtype == object:
+            categorical[name] = pd.Categorical(col)
+        else:
+            columns[name] = col.to_numpy(dtype=np.float32)
+    return pack_table(columns, categorical, meta)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+TILE_BINS = 32  # bins per tile side, i.e. 8px bins on 256px tiles
+POINTS_MIN_ZOOM = 13  # from this zoom on, tiles carry raw detections instead of bins
+MAX_ZOOM = 22
+EVENT_TYPES = ["explosion", "fire", "unknown"]
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def _lon_to_x(lon: np.ndarray, scale: float) -> np.ndarray:
+    return (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * scale
+
+
+def _lat_to_y(lat: np.ndarray, scale: float) -> np.ndarray:
+    rad = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -85.05112878, 85.05112878))
+    return (1.0 - np.log(np.tan(rad) + 1.0 / np.cos(rad)) / np.pi) / 2.0 * scale
+
+
+def _y_to_lat(y: np.ndarray, scale: float) -> np.ndarray:
+    return np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * np.asarray(y, dtype=np.float64) / scale))))
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(lon_min, lat_min, lon_max, lat_max) of web-mercator (slippy map) tile ``z/x/y``."""
+    n = 2 ** z
+    lon_min, lon_max = x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0
+    lat_max, lat_min = (float(v) for v in _y_to_lat(np.array([y, y + 1]), n))
+    return lon_min, lat_min, lon_max, lat_max
+
+
+def bin_incidents(lon: np.ndarray, lat: np.ndarray, count: np.ndarray, max_frp: Optional[np.ndarray],
+                  event_type: np.ndarray, z: int, x: int, y: int, bins: int = TILE_BINS) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """Bin classified (cell, bucket) incidents of tile ``z/x/y`` into a ``bins`` x ``bins`` pixel grid.
+
+    Returns (lon, lat, property columns) of the non-empty bins: the detection-weighted centroid,
+    total detections, max FRP (masked when no incident has one), number of incidents and the
+    event type covering the most detections (ties go to the first of ``EVENT_TYPES``).
+    """
+    n = len(lon)
+    if n == 0:
+        return np.zeros(0), np.zeros(0), {}
+    scale = float(2 ** z * bins)
+    # Cell centres can sit just outside the tile they were fetched for; clamp them to the edge bins
+    bx = np.clip(np.floor(_lon_to_x(lon, scale)).astype(np.int64) - x * bins, 0, bins - 1)
+    by = np.clip(np.floor(_lat_to_y(lat, scale)).astype(np.int64) - y * bins, 0, bins - 1)
+    ids, inverse = np.unique(by * bins + bx, return_inverse=True)
+    m = ids.size
+    weight = np.asarray(count, dtype=np.float64)
+    total = np.bincount(inverse, weights=weight, minlength=m)
+
+    codes = pd.Categorical(np.asarray(event_type, dtype=object), categories=EVENT_TYPES).codes.astype(np.int64)
+    codes[codes < 0] = EVENT_TYPES.index("unknown")
+    by_type = np.bincount(inverse * len(EVENT_TYPES) + codes, weights=weight, minlength=m * len(EVENT_TYPES))
+    dominant = np.asarray(EVENT_TYPES, dtype=object)[by_type.reshape(m, len(EVENT_TYPES)).argmax(axis=1)]
+
+    properties: Dict[str, Any] = {
+        "kind": "bin",
+        "count": total.astype(np.int64),
+        "incidents": np.bincount(inverse, minlength=m),
+        "event_type": dominant,
+        "max_frp": None,
+    }
+    if max_frp is not None:
+        frp = np.ma.filled(np.ma.masked_invalid(max_frp), -np.inf).astype(np.float64)
+        best = np.full(m, -np.inf)
+        np.maximum.at(best, inverse, frp)
+        properties["max_frp"] = np.ma.masked_invalid(np.where(np.isneginf(best), np.nan, best))
+    centroid_lon = np.bincount(inverse, weights=weight * np.asarray(lon, dtype=np.float64), minlength=m) / total
+    centroid_lat = np.bincount(inverse, weights=weight * np.asarray(lat, dtype=np.float64), minlength=m) / total
+    return np.round(centroid_lon, 5), np.round(centroid_lat, 5), properties
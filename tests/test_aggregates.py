@@ -0,0 +1,131 @@
+"""Materialized aggregate tables against grouping raw rows: /predict and /tiles output, and incremental
+``materialize`` runs against a full rebuild."""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from benchmarks.synthetic import generate_frame
+from src.pipeline.aggregates import AggregateStore, aggregate_path, load_aggregates, materialize
+from src.pipeline.storage import PartitionedStorage
+from src.pipeline.store import HotspotStore
+from tests.test_index import tile_of
+
+
+class AggregatePathTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(cls.tmp)  # app.py opens api.log in the working directory on import
+        try:
+            import app as api
+        finally:
+            os.chdir(cwd)
+        cls.api = api
+        df = generate_frame(5000, "viirs", seed=8, days=4)
+        df.loc[df.sample(100, random_state=1).index, "frp"] = np.nan
+        cls.path = os.path.join(cls.tmp, "hotspots_viirs.csv")
+        df.to_csv(cls.path, index=False)
+        cls.root = os.path.join(cls.tmp, "aggregates")
+        os.makedirs(cls.root)
+        for window in (60, 180):
+            materialize(cls.path, aggregate_path(cls.root, "viirs", window), "bright_ti4", window)
+        cls.saved = (api.HOTSPOT_STORE, api.AGGREGATES)
+        api.HOTSPOT_STORE = HotspotStore({"viirs": cls.path})
+        cls.client = api.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.api.HOTSPOT_STORE, cls.api.AGGREGATES = cls.saved
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def both(self, url: str):
+        """Response bodies with the materialized tables and with raw grouping only."""
+        bodies, hits = [], []
+        for root in (self.root, os.path.join(self.tmp, "none")):
+            self.api.AGGREGATES = AggregateStore(root)
+            self.api.PREDICT_CACHE.clear()
+            self.api.TILE_CACHE.clear()
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            bodies.append(resp.data)
+            hits.append(self.api.AGGREGATES.stats()["hits"])
+        self.assertEqual(hits, [1, 0])  # the first request really used a table
+        return bodies
+
+    def test_predict_matches_raw(self) -> None:
+        for query in ("", "&window_minutes=60", "&bbox=34.3,31.3,34.5,31.5", "&bbox=34.31,31.27,34.52,31.49&window_minutes=60",
+                      "&from=2025-07-02T00:00:00&to=2025-07-03T12:00:00", "&bbox=34.3,31.3,34.5,31.5&from=2025-07-02T05:00:00"):
+            with self.subTest(query=query):
+                table, raw = self.both(f"/predict?model=viirs{query}")
+                self.assertEqual(table, raw)
+                self.assertGreater(len(table), 100)
+
+    def test_bin_tiles_match_raw(self) -> None:
+        df = self.api.HOTSPOT_STORE.get("viirs").df
+        tiles = {(z, *tile_of(lon, lat, z)) for z in (8, 10, 11) for lon, lat in zip(df["longitude"][::211], df["latitude"][::211])}
+        self.assertGreater(len(tiles), 5)
+        for z, x, y in sorted(tiles):
+            with self.subTest(tile=(z, x, y)):
+                table, raw = self.both(f"/tiles/{z}/{x}/{y}?model=viirs")
+                self.assertEqual(table, raw)
+                self.assertIn(b'"kind":"bin"', table)
+
+
+class IncrementalMaterializeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.df = generate_frame(6000, "viirs", seed=9, days=6)
+
+    def assert_same_as_rebuild(self, source: str, incremental: str, window: int) -> None:
+        full = os.path.join(self.tmp, f"full_{window}.npz")
+        if os.path.exists(full):
+            os.remove(full)
+        materialize(source, full, "bright_ti4", window)
+        a, b = load_aggregates(incremental), load_aggregates(full)
+        self.assertEqual(a.columns.keys(), b.columns.keys())
+        for k in a.columns:
+            np.testing.assert_array_equal(a.columns[k], b.columns[k], err_msg=k)
+        np.testing.assert_array_equal(a.features, b.features)
+        np.testing.assert_array_equal(a.sig_buckets, b.sig_buckets)
+        np.testing.assert_array_equal(a.sig_values, b.sig_values)
+        self.assertEqual((a.has_frp, a.has_brightness, a.source_version, a.source_parts),
+                         (b.has_frp, b.has_brightness, b.source_version, b.source_parts))
+
+    def test_partitioned_appends(self) -> None:
+        storage = PartitionedStorage(os.path.join(self.tmp, "storage"))
+        source = storage.source_dir("viirs")
+        out = os.path.join(self.tmp, "viirs_w180.npz")
+        # Mostly in time order, with a late batch for an earlier day and a re-sent batch (all duplicates)
+        batches = [self.df.iloc[:2000], self.df.iloc[2000:3500], self.df.iloc[3500:5000].sample(frac=1.0, random_state=0),
+                   self.df.iloc[1000:1500], self.df.iloc[5000:]]
+        late = self.df.iloc[[10, 500, 1999]].copy()
+        late["latitude"] += 0.002  # new detections inside already materialized buckets
+        batches.insert(3, late)
+        for i, batch in enumerate(batches):
+            storage.append("viirs", batch)
+            result = materialize(source, out, "bright_ti4", 180)
+            with self.subTest(step=i):
+                self.assert_same_as_rebuild(source, out, 180)
+                if i > 0:
+                    self.assertLess(result.buckets_updated, result.buckets)
+
+    def test_csv_rewrites(self) -> None:
+        path = os.path.join(self.tmp, "hotspots_viirs.csv")
+        out = os.path.join(self.tmp, "viirs_w60.npz")
+        edited = self.df.copy()
+        edited.loc[100, "frp"] += 5.0
+        for frame in (self.df.iloc[:4000], self.df, edited, edited.iloc[1500:]):  # append, edit, roll window
+            frame.to_csv(path, index=False)
+            result = materialize(path, out, "bright_ti4", 60)
+            self.assert_same_as_rebuild(path, out, 60)
+        self.assertGreater(result.buckets_removed, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""ResultCache invalidation when the data or model version of a namespace changes."""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from benchmarks.synthetic import generate_frame
+from src.pipeline.aggregates import AggregateStore
+from src.pipeline.store import HotspotStore
+from src.serving.cache import ResultCache
+
+
+class ResultCacheVersionTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = ResultCache(max_bytes=1024, ttl_seconds=60)
+        self.cache.set_version("predict:viirs", ((1, 100), (5, 10)))
+        self.cache.set_version("predict:modis", ((2, 200), (5, 10)))
+        self.cache.put("predict:viirs", "q", b"viirs", ((1, 100), (5, 10)))
+        self.cache.put("predict:modis", "q", b"modis", ((2, 200), (5, 10)))
+
+    def test_same_version_keeps_entries(self) -> None:
+        self.cache.set_version("predict:viirs", ((1, 100), (5, 10)))
+        self.assertEqual(self.cache.get("predict:viirs", "q"), b"viirs")
+        self.assertEqual(self.cache.stats()["invalidations"], 0)
+
+    def test_data_version_change_drops_only_that_namespace(self) -> None:
+        self.cache.set_version("predict:viirs", ((1, 101), (5, 10)))
+        self.assertIsNone(self.cache.get("predict:viirs", "q"))
+        self.assertEqual(self.cache.get("predict:modis", "q"), b"modis")
+        self.assertEqual(self.cache.stats()["bytes"], len(b"modis"))
+
+    def test_model_version_change_drops_entries(self) -> None:
+        self.cache.set_version("predict:viirs", ((1, 100), (6, 10)))
+        self.assertIsNone(self.cache.get("predict:viirs", "q"))
+
+    def test_put_of_superseded_version_is_ignored(self) -> None:
+        self.cache.set_version("predict:viirs", ((1, 101), (5, 10)))
+        self.cache.put("predict:viirs", "q", b"old", ((1, 100), (5, 10)))
+        self.assertIsNone(self.cache.get("predict:viirs", "q"))
+        self.assertEqual(self.cache.stats()["stale_puts"], 1)
+
+
+class PredictCacheInvalidationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(cls.tmp)  # app.py opens api.log in the working directory on import
+        try:
+            import app as api
+        finally:
+            os.chdir(cwd)
+        cls.api = api
+        cls.path = os.path.join(cls.tmp, "hotspots_viirs.csv")
+        cls.df = generate_frame(2000, "viirs", seed=3, days=3)
+        cls.df.to_csv(cls.path, index=False)
+        cls.saved = (api.HOTSPOT_STORE, api.AGGREGATES)
+        api.HOTSPOT_STORE = HotspotStore({"viirs": cls.path})
+        api.AGGREGATES = AggregateStore(os.path.join(cls.tmp, "aggregates"))
+        cls.client = api.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.api.HOTSPOT_STORE, cls.api.AGGREGATES = cls.saved
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def count(self) -> int:
+        resp = self.client.get("/predict?model=viirs")
+        self.assertEqual(resp.status_code, 200)
+        return sum(f["properties"]["count"] for f in json.loads(resp.data)["features"])
+
+    def test_new_data_is_served_not_the_cached_body(self) -> None:
+        cache = self.api.PREDICT_CACHE
+        self.assertEqual(self.count(), len(self.df))
+        hits = cache.stats()["hits"]
+        self.assertEqual(self.count(), len(self.df))
+        self.assertEqual(cache.stats()["hits"], hits + 1)
+
+        invalidations = cache.stats()["invalidations"]
+        self.df.iloc[: len(self.df) // 2].to_csv(self.path, index=False)
+        os.utime(self.path, ns=(time.time_ns(), time.time_ns() + 1_000_000))  # a new mtime even on coarse clocks
+        self.assertEqual(self.count(), len(self.df) // 2)
+        self.assertEqual(cache.stats()["invalidations"], invalidations + 1)
+
+    def test_model_version_change_invalidates(self) -> None:
+        cache = self.api.PREDICT_CACHE
+        self.count()
+        engine = self.api.INFERENCE
+        saved = engine.version
+        try:
+            engine.version = (1, 1) if saved is None else (saved[0] + 1, saved[1])
+            invalidations = cache.stats()["invalidations"]
+            self.count()
+            self.assertEqual(cache.stats()["invalidations"], invalidations + 1)
+        finally:
+            engine.version = saved
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+"""``ChangeFeed`` cursors against a recorded sequence of data and fetch status changes, and /changes/stream framing."""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_frame
+from src.pipeline.store import HotspotStore
+from src.serving.changes import ChangeFeed, row_keys
+
+
+class ChangeFeedTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.df = generate_frame(600, "viirs", seed=4, days=2)
+
+    def record(self, max_changes: int = 256):
+        """A feed that saw a baseline, then three appends and a status update: seqs 1-4."""
+        feed = ChangeFeed(max_changes=max_changes)
+        self.assertIsNone(feed.observe("viirs", self.df.iloc[:300], (1, 1)))  # baseline
+        for i, end in enumerate((400, 500, 600), start=2):
+            change = feed.observe("viirs", self.df.iloc[:end], (i, i))
+            self.assertEqual(len(change.added), 100)
+            pd.testing.assert_frame_equal(change.added, self.df.iloc[end - 100:end])
+        self.assertIsNone(feed.observe("viirs", self.df, (4, 4)))  # same version: nothing new
+        status = os.path.join(self.tmp, "fetch_status.json")
+        with open(status, "w") as f:
+            json.dump({"status": "ok"}, f)
+        self.assertIsNone(feed.observe_status(status))  # baseline
+        with open(status, "w") as f:
+            json.dump({"status": "error", "message": "timeout"}, f)
+        os.utime(status, ns=(time.time_ns(), time.time_ns() + 10**9))
+        self.assertEqual(feed.observe_status(status).status["status"], "error")
+        return feed
+
+    def test_since_returns_changes_after_cursor(self) -> None:
+        feed = self.record()
+        self.assertEqual(feed.seq, 4)
+        for after in range(5):
+            reset, changes, seq = feed.since(feed.cursor_at(after))
+            self.assertFalse(reset)
+            self.assertEqual([c.seq for c in changes], list(range(after + 1, 5)))
+            self.assertEqual(seq, 4)
+        _, changes, _ = feed.since(feed.cursor_at(0))
+        self.assertEqual([c.kind for c in changes], ["data", "data", "data", "status"])
+
+    def test_unknown_cursor_resets(self) -> None:
+        feed = self.record()
+        for cursor in (None, "", "garbage", f"{feed.epoch}-x", "deadbeef-2", ChangeFeed().cursor_at(2),
+                       feed.cursor_at(5)):  # no cursor, malformed, other epoch, after the current seq
+            with self.subTest(cursor=cursor):
+                self.assertEqual(feed.since(cursor), (True, [], 4))
+
+    def test_expired_cursor_resets(self) -> None:
+        feed = self.record(max_changes=2)  # keeps seqs 3 and 4
+        self.assertEqual(feed.since(feed.cursor_at(1)), (True, [], 4))
+        self.assertEqual(feed.since(feed.cursor_at(0)), (True, [], 4))
+        reset, changes, _ = feed.since(feed.cursor_at(2))
+        self.assertFalse(reset)
+        self.assertEqual([c.seq for c in changes], [3, 4])
+
+    def test_removed_rows_are_counted(self) -> None:
+        feed = ChangeFeed()
+        feed.observe("viirs", self.df, (1, 1))
+        change = feed.observe("viirs", self.df.iloc[100:], (2, 2))
+        dropped = ~np.isin(row_keys(self.df.iloc[:100]), row_keys(self.df.iloc[100:]))
+        self.assertEqual((len(change.added), change.removed), (0, int(dropped.sum())))
+        self.assertGreater(change.removed, 0)
+
+    def test_close_wakes_waiters(self) -> None:
+        feed = self.record()
+        self.assertFalse(feed.wait(4, 0.01))
+        t0 = time.monotonic()
+        feed.close()
+        self.assertFalse(feed.wait(4, 10.0))
+        self.assertLess(time.monotonic() - t0, 5.0)
+        self.assertTrue(feed.wait(3, 0.0))
+
+
+class ChangeStreamTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(cls.tmp)  # app.py opens api.log in the working directory on import
+        try:
+            import app as api
+        finally:
+            os.chdir(cwd)
+        cls.api = api
+        cls.path = os.path.join(cls.tmp, "hotspots_viirs.csv")
+        cls.df = generate_frame(600, "viirs", seed=5, days=2)
+        cls.df.iloc[:500].to_csv(cls.path, index=False)
+        cls.saved = (api.HOTSPOT_STORE, api.CHANGE_FEED, api.CHANGE_POLLING)
+        api.HOTSPOT_STORE = HotspotStore({"viirs": cls.path})
+        api.CHANGE_FEED = ChangeFeed()
+        api.CHANGE_POLLING = False  # fed by hand below, as the gunicorn master does
+        cls.client = api.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.api.HOTSPOT_STORE, cls.api.CHANGE_FEED, cls.api.CHANGE_POLLING = cls.saved
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_stream_framing(self) -> None:
+        api = self.api
+        api.poll_changes()  # baseline
+        start = api.CHANGE_FEED.cursor
+        self.df.to_csv(self.path, index=False)
+        os.utime(self.path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        api.poll_changes()
+        api.CHANGE_FEED.close()  # ends the stream after the pending events
+        resp = self.client.get("/changes/stream?model=viirs", headers={"Last-Event-ID": start})
+        self.assertEqual(resp.mimetype, "text/event-stream")
+        events = resp.get_data().decode("utf-8").split("\n\n")
+        self.assertEqual(events[0], "retry: 5000")
+        fields = dict(line.split(": ", 1) for line in events[1].split("\n"))
+        self.assertEqual(fields["id"], api.CHANGE_FEED.cursor_at(1))
+        self.assertEqual(fields["event"], "change")
+        change = json.loads(fields["data"])
+        self.assertEqual((change["kind"], change["model"], change["version"]), ("data", "viirs", fields["id"]))
+        self.assertEqual(len(change["hotspots"]["features"]), 100)
+        self.assertGreater(len(change["incidents"]["features"]), 0)
+        self.assertEqual(events[2:], [""])
+
+        # The same change through /changes, and a reset for a cursor of another feed
+        body = json.loads(self.client.get(f"/changes?since={start}").data)
+        self.assertEqual((body["reset"], body["version"]), (False, fields["id"]))
+        self.assertEqual(body["changes"], [change])
+        resp = self.client.get("/changes/stream", headers={"Last-Event-ID": ChangeFeed().cursor_at(1)})
+        fields = dict(line.split(": ", 1) for line in resp.get_data().decode("utf-8").split("\n\n")[1].split("\n"))
+        self.assertEqual((fields["event"], json.loads(fields["data"])), ("reset", {"version": api.CHANGE_FEED.cursor_at(1)}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""Time-slab DBSCAN (``slab_minutes``) against clustering the whole frame in one shot."""
+from __future__ import annotations
+
+import unittest
+import pandas as pd
+
+from benchmarks.synthetic import generate_frame
+from src.pipeline.events import cluster_events
+
+
+class SlabClusteringTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        df = generate_frame(4000, "viirs", seed=2, days=6)
+        df["timestamp"] = pd.to_datetime(df["acq_date"] + " " + df["acq_time"].astype(str).str.zfill(4))
+        cls.df = df.sample(frac=1.0, random_state=0)  # labels must not depend on row order being by time
+
+    def assert_same_labels(self, df: pd.DataFrame, **kwargs) -> None:
+        single = cluster_events(df, **kwargs)
+        self.assertGreater(single.nunique(), 10)
+        for slab_minutes in (kwargs.get("temporal_eps_minutes", 240), 600, 1440):
+            slabs = cluster_events(df, slab_minutes=slab_minutes, **kwargs)
+            pd.testing.assert_series_equal(slabs, single, check_dtype=False, obj=f"slab_minutes={slab_minutes}")
+
+    def test_default_parameters(self) -> None:
+        self.assert_same_labels(self.df)
+
+    def test_other_eps_and_min_samples(self) -> None:
+        self.assert_same_labels(self.df, spatial_eps_km=0.8, temporal_eps_minutes=120, min_samples=3)
+
+    def test_process_pool(self) -> None:
+        single = cluster_events(self.df)
+        pd.testing.assert_series_equal(cluster_events(self.df, slab_minutes=720, n_jobs=2), single, check_dtype=False)
+
+    def test_points_exactly_eps_apart_across_a_slab_edge(self) -> None:
+        # A chain of detections every 240 minutes (exactly temporal eps) at one spot, crossing slab edges
+        times = pd.date_range("2025-07-01", periods=12, freq="240min")
+        df = pd.DataFrame({"latitude": 31.5, "longitude": 34.4, "timestamp": times})
+        labels = cluster_events(df, slab_minutes=480)
+        self.assertEqual(labels.tolist(), cluster_events(df).tolist())
+        self.assertEqual(labels.nunique(), 1)
+
+    def test_slab_narrower_than_eps_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            cluster_events(self.df, slab_minutes=60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""``extract_features_batch`` against the one-sequence-at-a-time feature computation it replaced."""
+from __future__ import annotations
+
+from typing import Dict, List
+import unittest
+import numpy as np
+
+from model.utils import FEATURE_KEYS, extract_features_batch, extract_features_from_sequence
+
+
+def reference_features(frp_values: List[float]) -> Dict[str, float]:
+    """The scalar, per-sequence reduction ``extract_features_from_sequence`` used to perform."""
+    arr = np.array(frp_values, dtype=float)
+    arr[~np.isfinite(arr)] = 0.0
+    if arr.size == 0:
+        return {k: 0.0 for k in FEATURE_KEYS}
+    max_frp = float(arr.max())
+    if arr.size >= 3:
+        peak_idx = int(arr.argmax())
+        rise = arr[peak_idx] - arr[max(0, peak_idx - 1)]
+        decay = arr[peak_idx] - arr[min(arr.size - 1, peak_idx + 1)]
+    else:
+        rise = decay = 0.0
+    return {
+        "max_frp": max_frp,
+        "mean_frp": float(arr.mean()),
+        "std_frp": float(arr.std()),
+        "rise": float(rise),
+        "decay": float(decay),
+        "duration_high": float((arr > 0.25 * max_frp).mean()) if max_frp > 0 else 0.0,
+        "count_obs": float(arr.size),
+    }
+
+
+class ExtractFeaturesBatchTest(unittest.TestCase):
+    def sequences(self) -> List[np.ndarray]:
+        rng = np.random.default_rng(7)
+        seqs = [np.zeros(0), np.array([5.0]), np.array([3.0, 3.0]), np.array([0.0, 0.0, 0.0]),
+                np.array([np.nan, np.inf, -np.inf]), np.array([1.0, 9.0, 9.0, 2.0])]  # empty, short, flat, non-finite, tied peak
+        for _ in range(500):
+            seq = rng.gamma(1.5, 20.0, size=int(rng.integers(1, 40)))
+            seq[rng.random(seq.size) < 0.1] = np.nan
+            seqs.append(seq)
+        return seqs
+
+    def test_matches_per_sequence_bit_for_bit(self) -> None:
+        seqs = self.sequences()
+        offsets = np.concatenate([[0], np.cumsum([s.size for s in seqs])])
+        X = extract_features_batch(np.concatenate(seqs), offsets)
+        self.assertEqual(X.shape, (len(seqs), len(FEATURE_KEYS)))
+        for i, seq in enumerate(seqs):
+            expected = reference_features(seq.tolist())
+            self.assertEqual(X[i].tolist(), [expected[k] for k in FEATURE_KEYS], f"sequence {i}: {seq}")
+
+    def test_single_sequence_wrapper(self) -> None:
+        for seq in self.sequences()[:50]:
+            self.assertEqual(extract_features_from_sequence(seq.tolist()), reference_features(seq.tolist()))
+        self.assertEqual(extract_features_from_sequence(None), reference_features([]))
+
+
+if __name__ == "__main__":
+    unittest.main()
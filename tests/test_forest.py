@@ -0,0 +1,73 @@
+"""``FlatForest`` against the scikit-learn forest it was flattened from."""
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from src.modeling.forest import CHUNK_ROWS, flatten_forest, load_flat_forest, max_proba_error, save_flat_forest
+
+
+class FlatForestTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Seven columns shaped like FEATURE_KEYS: skewed FRP statistics plus an integer count_obs
+        rng = np.random.default_rng(0)
+        X = rng.gamma(2.0, 10.0, size=(3000, 7))
+        X[:, 6] = rng.integers(1, 20, X.shape[0])
+        y = np.where(X[:, 0] - X[:, 1] + rng.normal(0, 5, X.shape[0]) > 5, "explosion",
+                     np.where(X[:, 2] > 8, "fire", "unknown"))
+        cls.forest = RandomForestClassifier(n_estimators=30, random_state=0).fit(X, y)
+
+        # Fresh rows, rows sitting exactly on split thresholds and rows just above them
+        X_new = rng.gamma(2.0, 10.0, size=(CHUNK_ROWS + 500, 7))
+        on_split = X_new[:1000].copy()
+        for est in cls.forest.estimators_[:5]:
+            tree = est.tree_
+            split = tree.feature >= 0
+            for j in range(7):
+                thresholds = tree.threshold[split & (tree.feature == j)]
+                if thresholds.size:
+                    on_split[:, j] = rng.choice(thresholds, on_split.shape[0])
+        above = np.nextafter(on_split.astype(np.float32), np.float32(np.inf)).astype(np.float64)
+        cls.X = np.vstack([X_new, on_split, above])
+
+    def test_matches_sklearn_exactly(self):
+        flat = flatten_forest(self.forest)
+        self.assertGreater(self.X.shape[0], CHUNK_ROWS)  # exercises the chunked path
+        self.assertEqual(max_proba_error(flat, self.forest, self.X), 0.0)
+        np.testing.assert_array_equal(flat.predict(self.X), self.forest.predict(self.X))
+        np.testing.assert_array_equal(flat.classes_, self.forest.classes_)
+
+    def test_float32_selects_the_same_leaves(self):
+        flat, flat32 = flatten_forest(self.forest), flatten_forest(self.forest, float32=True)
+        np.testing.assert_array_equal(flat32.apply(self.X), flat.apply(self.X))
+        np.testing.assert_array_equal(flat32.predict(self.X), self.forest.predict(self.X))
+        self.assertLess(max_proba_error(flat32, self.forest, self.X), 1e-6)
+        self.assertLess(flat32.nbytes, flat.nbytes)
+
+    def test_save_load_round_trip(self):
+        flat = flatten_forest(self.forest, float32=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model_rf.npz")
+            save_flat_forest(flat, path)
+            loaded = load_flat_forest(path)
+        self.assertEqual((loaded.n_trees, loaded.n_nodes, loaded.max_depth), (flat.n_trees, flat.n_nodes, flat.max_depth))
+        np.testing.assert_array_equal(loaded.predict_proba(self.X), flat.predict_proba(self.X))
+        np.testing.assert_array_equal(loaded.predict(self.X), self.forest.predict(self.X))
+
+    def test_pruning_keeps_valid_probabilities(self):
+        full = flatten_forest(self.forest)
+        pruned = flatten_forest(self.forest, max_trees=10, max_depth=4)
+        self.assertEqual(pruned.n_trees, 10)
+        self.assertLessEqual(pruned.max_depth, 4)
+        self.assertLess(pruned.n_nodes, full.n_nodes)
+        proba = pruned.predict_proba(self.X)
+        np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+        self.assertGreater(max_proba_error(pruned, self.forest, self.X), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""``SpatioTemporalIndex`` queries and the /tiles paths built on them against full boolean masks."""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import DEFAULT_BBOX, generate_frame
+from src.pipeline.aggregates import AggregateStore
+from src.pipeline.index import SpatioTemporalIndex
+from src.pipeline.store import HotspotStore, load_hotspot_csv
+from src.serving.tiles import POINTS_MIN_ZOOM, bin_incidents, tile_bounds
+
+
+def tile_of(lon: float, lat: float, z: int):
+    n = 2 ** z
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / np.pi) / 2.0 * n)
+    return x, y
+
+
+class SpatioTemporalIndexTest(unittest.TestCase):
+    def test_query_matches_mask(self) -> None:
+        rng = np.random.default_rng(0)
+        df = generate_frame(5000, "viirs", seed=2, days=4)
+        lat = df["latitude"].to_numpy(dtype=np.float64)
+        lon = df["longitude"].to_numpy(dtype=np.float64)
+        ts = pd.to_datetime(df["acq_date"]).to_numpy() + (df["acq_time"] // 100 * 60 + df["acq_time"] % 100).to_numpy() * np.timedelta64(1, "m")
+        lat[:40], lon[40:60], ts[60:80] = np.nan, np.inf, np.datetime64("NaT")  # unlocated and untimed rows
+        index = SpatioTemporalIndex(lat, lon, ts)
+        lon_min, lat_min, lon_max, lat_max = DEFAULT_BBOX
+        t0, t1 = ts[~np.isnat(ts)].min(), ts[~np.isnat(ts)].max()
+        for _ in range(300):
+            a, b = np.sort(rng.uniform(lon_min - 0.05, lon_max + 0.05, 2))
+            c, d = np.sort(rng.uniform(lat_min - 0.05, lat_max + 0.05, 2))
+            bbox = None if rng.random() < 0.2 else (a, c, b, d)
+            if bbox is not None and rng.random() < 0.1:
+                bbox = (lon[100], lat[100], lon[100], lat[100])  # a single point, inclusive
+            start = None if rng.random() < 0.3 else t0 + (t1 - t0) * rng.random()
+            end = None if rng.random() < 0.3 else t0 + (t1 - t0) * rng.random()
+            mask = np.ones(len(ts), dtype=bool)
+            if bbox is not None:
+                with np.errstate(invalid="ignore"):
+                    mask &= (lon >= bbox[0]) & (lon <= bbox[2]) & (lat >= bbox[1]) & (lat <= bbox[3])
+            if start is not None:
+                mask &= ~np.isnat(ts) & (ts >= start)
+            if end is not None:
+                mask &= ~np.isnat(ts) & (ts < end)
+            np.testing.assert_array_equal(index.query(bbox, start, end), np.flatnonzero(mask))
+
+
+class TilesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(cls.tmp)  # app.py opens api.log in the working directory on import
+        try:
+            import app as api
+        finally:
+            os.chdir(cwd)
+        cls.api = api
+        path = os.path.join(cls.tmp, "hotspots_viirs.csv")
+        generate_frame(4000, "viirs", seed=6, days=4).to_csv(path, index=False)
+        cls.saved = (api.HOTSPOT_STORE, api.AGGREGATES)
+        api.HOTSPOT_STORE = HotspotStore({"viirs": path})
+        api.AGGREGATES = AggregateStore(os.path.join(cls.tmp, "aggregates"))  # no tables: group raw rows
+        cls.df = load_hotspot_csv(path)
+        cls.client = api.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.api.HOTSPOT_STORE, cls.api.AGGREGATES = cls.saved
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def get(self, url: str):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return json.loads(resp.data)["features"]
+
+    def test_point_tiles_match_mask(self) -> None:
+        lon, lat = self.df["longitude"].to_numpy(dtype=np.float64), self.df["latitude"].to_numpy(dtype=np.float64)
+        z = POINTS_MIN_ZOOM
+        tiles = {tile_of(lo, la, z) for lo, la in zip(lon[::97], lat[::97])}
+        self.assertGreater(len(tiles), 5)
+        for x, y in sorted(tiles):
+            for query, start, end in (("", None, None), ("&from=2025-07-02T00:00:00&to=2025-07-02T23:59:59",
+                                                          np.datetime64("2025-07-02T00:00"), np.datetime64("2025-07-03T00:00"))):
+                b = tile_bounds(z, x, y)
+                mask = (lon >= b[0]) & (lon <= b[2]) & (lat >= b[1]) & (lat <= b[3])
+                if start is not None:
+                    ts = self.df["timestamp"].to_numpy()
+                    mask &= (ts >= start) & (ts < end)
+                expected = self.df[mask]
+                features = self.get(f"/tiles/{z}/{x}/{y}?model=viirs{query}")
+                self.assertEqual(len(features), len(expected))
+                self.assertEqual([f["properties"]["acq_time"] for f in features], expected["acq_time"].tolist())
+                np.testing.assert_array_equal(np.array([f["geometry"]["coordinates"] for f in features]).reshape(-1, 2),
+                                              np.column_stack([self.api.decimal_coords(expected["longitude"]),
+                                                               self.api.decimal_coords(expected["latitude"])]).astype(float))
+
+    def test_bin_tiles_match_predict(self) -> None:
+        z = 10
+        lon, lat = self.df["longitude"].to_numpy(dtype=np.float64), self.df["latitude"].to_numpy(dtype=np.float64)
+        tiles = {tile_of(lo, la, z) for lo, la in zip(lon[::53], lat[::53])}
+        self.assertGreater(len(tiles), 1)
+        for x, y in sorted(tiles):
+            b = tile_bounds(z, x, y)
+            incidents = self.get(f"/predict?model=viirs&bbox={b[0]!r},{b[1]!r},{b[2]!r},{b[3]!r}")
+            p = pd.DataFrame([f["properties"] for f in incidents])
+            coords = np.array([f["geometry"]["coordinates"] for f in incidents]).reshape(-1, 2)
+            blon, blat, props = bin_incidents(coords[:, 0], coords[:, 1], p["count"].to_numpy(),
+                                              p["max_frp"].astype(float).to_numpy(), p["event_type"].to_numpy(), z, x, y)
+            features = self.get(f"/tiles/{z}/{x}/{y}?model=viirs")
+            self.assertEqual(len(features), len(blon))
+            self.assertEqual([f["geometry"]["coordinates"] for f in features], np.column_stack([blon, blat]).tolist())
+            for key in ("count", "incidents", "event_type"):
+                self.assertEqual([f["properties"][key] for f in features], np.asarray(props[key]).tolist())
+            self.assertEqual(sum(f["properties"]["count"] for f in features), int(p["count"].sum()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""``tail`` and ``read_after`` against reading the log file whole."""
+from __future__ import annotations
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from src.serving.logtail import LogFilter, read_after, tail
+
+
+def record(i: int, level: str = "INFO", trace: int = 0) -> str:
+    lines = f"2026-10-17 01:02:03,456 {level} request {i} served\n"
+    return lines + "".join(f"  File \"app.py\", line {k}, in request {i}\n" for k in range(trace))
+
+
+class LogTailTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.path = os.path.join(self.tmp, "api.log")
+
+    def write(self, text: str, mode: str = "w") -> None:
+        with open(self.path, mode) as f:
+            f.write(text)
+
+    def test_tail_matches_readlines(self) -> None:
+        rng = random.Random(3)
+        text = "".join(record(i, rng.choice(["INFO", "WARNING", "ERROR"]), rng.choice([0, 0, 3])) for i in range(400))
+        self.write(text + "2026-10-17 01:02:03,456 INFO half a line")
+        with open(self.path) as f:
+            lines = f.readlines()
+        warnings = LogFilter.parse("WARNING", None)
+        for block_size in (16, 333, 65536):
+            for n in (1, 25, 10000):
+                with self.subTest(block_size=block_size, n=n):
+                    chunk = tail(self.path, n, block_size=block_size)
+                    self.assertEqual(chunk.lines, lines[:-1][-n:])
+                    self.assertEqual(chunk.offset, len(text))
+                    self.assertEqual(tail(self.path, n, block_size=block_size, partial=True).lines, lines[-n:])
+                    # Filtered: tracebacks keep the level of their record across block boundaries
+                    self.assertEqual(tail(self.path, n, warnings, block_size=block_size).lines, warnings.apply(lines[:-1])[-n:])
+                    errors = LogFilter.parse("ERROR", "line 2")
+                    self.assertEqual(tail(self.path, n, errors, block_size=block_size).lines, errors.apply(lines[:-1])[-n:])
+
+    def test_read_after_appended_lines(self) -> None:
+        self.write(record(0) + record(1))
+        chunk = tail(self.path, 10)
+        self.write(record(2) + "2026-10-17 01:02:03,456 INFO part", "a")
+        new = read_after(self.path, chunk.offset, chunk.inode)
+        self.assertEqual((new.lines, new.rotated, new.truncated), ([record(2)], False, False))
+        self.write("ial\n", "a")
+        self.assertEqual(read_after(self.path, new.offset, new.inode).lines, ["2026-10-17 01:02:03,456 INFO partial\n"])
+
+    def test_read_after_rotation(self) -> None:
+        self.write(record(0))
+        chunk = tail(self.path, 10)
+        self.write(record(1), "a")
+        os.rename(self.path, f"{self.path}.1")  # what RotatingFileHandler does
+        self.write(record(2))
+        new = read_after(self.path, chunk.offset, chunk.inode)
+        self.assertTrue(new.rotated)
+        self.assertEqual(new.lines, [record(1), record(2)])
+        self.assertEqual(new.inode, os.stat(self.path).st_ino)
+        self.assertEqual(new.offset, len(record(2)))
+
+    def test_read_after_file_truncated_in_place(self) -> None:
+        self.write(record(0) + record(1))
+        chunk = tail(self.path, 10)
+        self.write(record(2))  # same inode, shorter than the cursor
+        new = read_after(self.path, chunk.offset, chunk.inode)
+        self.assertTrue(new.rotated)
+        self.assertEqual(new.lines, [record(2)])
+
+    def test_capped_read_drops_only_a_partial_first_line(self) -> None:
+        lines = [record(i) for i in range(10)]
+        self.write("".join(lines))
+        last_three = len("".join(lines[-3:]))
+        # The cap lands exactly on a line boundary: all three lines are whole
+        new = read_after(self.path, 0, max_bytes=last_three)
+        self.assertTrue(new.truncated)
+        self.assertEqual(new.lines, lines[-3:])
+        # One byte more starts inside the previous line, which is dropped
+        new = read_after(self.path, 0, max_bytes=last_three + 1)
+        self.assertEqual(new.lines, lines[-3:])
+        # The rest of a rotated file is capped the same way
+        inode = os.stat(self.path).st_ino
+        os.rename(self.path, f"{self.path}.1")
+        self.write(record(10))
+        new = read_after(self.path, 0, inode, max_bytes=last_three)
+        self.assertEqual((new.rotated, new.truncated), (True, True))
+        self.assertEqual(new.lines, lines[-3:] + [record(10)])
+
+
+if __name__ == "__main__":
+    unittest.main()
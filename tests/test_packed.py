@@ -0,0 +1,113 @@
+"""The packed (HSP1) /hotspots encoding decoded in Python against the GeoJSON response, row for row."""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_frame
+from src.pipeline.store import HotspotStore
+from src.serving.packed import MISSING_TIME, PACKED_MAGIC, PACKED_MIMETYPE, unpack_table
+
+
+class PackedHotspotsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(cls.tmp)  # app.py opens api.log in the working directory on import
+        try:
+            import app as api
+        finally:
+            os.chdir(cwd)
+        cls.api = api
+        paths = {}
+        for source, seed in (("viirs", 1), ("modis", 2)):
+            df = generate_frame(2000, source, seed=seed, days=3)
+            missing = df.sample(50, random_state=seed).index
+            df.loc[missing, "frp"] = np.nan
+            df["confidence"] = df["confidence"].astype(object)
+            df.loc[missing[:20], "confidence"] = None  # missing category codes (or NaN for MODIS)
+            paths[source] = os.path.join(cls.tmp, f"hotspots_{source}.csv")
+            df.to_csv(paths[source], index=False)
+        cls.saved = api.HOTSPOT_STORE
+        api.HOTSPOT_STORE = HotspotStore(paths)
+        cls.client = api.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.api.HOTSPOT_STORE = cls.saved
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def both(self, query: str):
+        geo = self.client.get(f"/hotspots?{query}")
+        packed = self.client.get(f"/hotspots?{query}&format=packed")
+        self.assertEqual((geo.status_code, packed.status_code), (200, 200))
+        self.assertEqual(packed.mimetype, PACKED_MIMETYPE)
+        return json.loads(geo.data)["features"], packed.data
+
+    def assert_round_trip(self, query: str) -> int:
+        features, buf = self.both(query)
+        # Layout: magic, header length, JSON header padded to 4 bytes, 4-byte aligned columns
+        self.assertEqual(buf[:4], PACKED_MAGIC)
+        (header_len,) = struct.unpack_from("<I", buf, 4)
+        self.assertEqual(header_len % 4, 0)
+        header = json.loads(buf[8:8 + header_len])
+        self.assertTrue(all(spec["offset"] % 4 == 0 for spec in header["columns"]))
+
+        table = unpack_table(buf)
+        cols = table["columns"]
+        n = table["rows"]
+        self.assertEqual(n, len(features))
+        props = pd.DataFrame([f["properties"] for f in features])
+        coords = np.array([f["geometry"]["coordinates"] for f in features], dtype=float).reshape(-1, 2)
+
+        np.testing.assert_array_equal(cols["lon"], coords[:, 0].astype(np.float32))
+        np.testing.assert_array_equal(cols["lat"], coords[:, 1].astype(np.float32))
+        # Epoch minutes against the GeoJSON acq_date/acq_time
+        hhmm = props["acq_time"].astype(int)
+        expected = (pd.to_datetime(props["acq_date"]) + pd.to_timedelta(hhmm // 100 * 60 + hhmm % 100, unit="m"))
+        self.assertFalse((cols["t"] == MISSING_TIME).any())
+        np.testing.assert_array_equal(cols["t"], expected.to_numpy(dtype="datetime64[m]").astype(np.int64))
+        for name, key in (("frp", "frp"), ("brightness", "brightness")):
+            np.testing.assert_array_equal(cols[name], props[key].astype(float).to_numpy(dtype=np.float32))  # null <-> NaN
+        # Category columns: decoded labels (missing -> NaN) against the GeoJSON strings (missing -> null)
+        for name in ("confidence", "daynight"):
+            values = cols[name]
+            expected = props[name]
+            if isinstance(values, pd.Categorical):
+                self.assertIn(name, [s["name"] for s in header["columns"] if "categories" in s])
+                decoded = pd.Series(values.astype(object)).where(pd.notna(values), None)
+                self.assertEqual(decoded.tolist(), expected.where(pd.notna(expected), None).tolist())
+            else:
+                np.testing.assert_array_equal(values, expected.astype(float).to_numpy(dtype=np.float32))
+        self.assertEqual(table["meta"], {"model": query.split("model=")[1].split("&")[0]})
+        return n
+
+    def test_viirs(self) -> None:
+        self.assertEqual(self.assert_round_trip("model=viirs"), 2000)
+        buf = self.both("model=viirs")[1]
+        cols = unpack_table(buf)["columns"]
+        self.assertTrue(pd.isna(cols["confidence"]).any())
+        self.assertTrue(np.isnan(cols["frp"]).any())
+        (header_len,) = struct.unpack_from("<I", buf, 4)
+        types = {s["name"]: s["type"] for s in json.loads(buf[8:8 + header_len])["columns"]}
+        self.assertEqual((types["confidence"], types["daynight"]), ("uint8", "uint8"))
+
+    def test_modis_numeric_confidence(self) -> None:
+        self.assertEqual(self.assert_round_trip("model=modis"), 2000)
+        self.assertNotIsInstance(unpack_table(self.both("model=modis")[1])["columns"]["confidence"], pd.Categorical)
+
+    def test_filtered(self) -> None:
+        n = self.assert_round_trip("model=viirs&bbox=34.3,31.3,34.5,31.5&from=2025-07-02T00:00:00&to=2025-07-02T23:59:59")
+        self.assertGreater(n, 0)
+        self.assertLess(n, 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
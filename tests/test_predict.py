@@ -0,0 +1,103 @@
+"""/predict's vectorized grouping and batch classification against classifying each group on its own."""
+from __future__ import annotations
+
+from datetime import timedelta
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_frame
+from src.pipeline.aggregates import AggregateStore
+from src.pipeline.grid import GRID_CELLS_PER_DEGREE
+from src.pipeline.store import HotspotStore
+
+
+class PredictMatchesPerSequenceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(cls.tmp)  # app.py opens api.log in the working directory on import
+        try:
+            import app as api
+        finally:
+            os.chdir(cwd)
+        cls.api = api
+        df = generate_frame(3000, "viirs", seed=1, days=5)
+        df.loc[df.sample(200, random_state=0).index, "frp"] = np.nan
+        path = os.path.join(cls.tmp, "hotspots_viirs.csv")
+        df.to_csv(path, index=False)
+        cls.saved = (api.HOTSPOT_STORE, api.AGGREGATES)
+        api.HOTSPOT_STORE = HotspotStore({"viirs": path})
+        api.AGGREGATES = AggregateStore(os.path.join(cls.tmp, "aggregates"))  # no tables: group raw rows
+        cls.rows = pd.read_csv(path)
+        cls.client = api.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.api.HOTSPOT_STORE, cls.api.AGGREGATES = cls.saved
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def per_sequence(self, window_minutes: int, bbox=None):
+        """Incidents keyed by (lat cell, lon cell, acq_start), one ``classify_sequence`` call per group."""
+        groups = {}
+        for row in self.rows.itertuples(index=False):
+            if bbox is not None and not (bbox[0] <= row.longitude <= bbox[2] and bbox[1] <= row.latitude <= bbox[3]):
+                continue
+            ts = self.api.parse_timestamp(row.acq_date, row.acq_time)
+            minutes = (ts.hour * 60 + ts.minute) // window_minutes * window_minutes
+            bucket = ts.replace(hour=0, minute=0) + timedelta(minutes=minutes)
+            key = (int(np.rint(row.latitude * GRID_CELLS_PER_DEGREE)), int(np.rint(row.longitude * GRID_CELLS_PER_DEGREE)), bucket)
+            groups.setdefault(key, []).append((ts, row.frp))
+        out = {}
+        for (lat_idx, lon_idx, _), members in groups.items():
+            members.sort(key=lambda m: m[0])  # stable: ties keep file order
+            frps = [m[1] for m in members]
+            result = self.api.classify_sequence(frps, [m[0] for m in members])
+            finite = [f for f in frps if np.isfinite(f)]
+            start = members[0][0].isoformat() + "Z"
+            out[(lat_idx, lon_idx, start)] = {
+                "acq_end": members[-1][0].isoformat() + "Z",
+                "event_type": result["event_type"],
+                "confidence": result["confidence"],
+                "count": len(members),
+                "max_frp": max(finite) if finite else None,
+            }
+        return out
+
+    def vectorized(self, query: str):
+        resp = self.client.get(f"/predict?model=viirs{query}")
+        self.assertEqual(resp.status_code, 200)
+        out = {}
+        for f in json.loads(resp.data)["features"]:
+            lon, lat = f["geometry"]["coordinates"]
+            p = f["properties"]
+            key = (int(np.rint(lat * GRID_CELLS_PER_DEGREE)), int(np.rint(lon * GRID_CELLS_PER_DEGREE)), p["acq_start"])
+            self.assertNotIn(key, out)
+            out[key] = {k: p[k] for k in ("acq_end", "event_type", "confidence", "count", "max_frp")}
+        return out
+
+    def test_default_window(self) -> None:
+        expected = self.per_sequence(180)
+        self.assertGreater(len(expected), 100)
+        self.assertEqual(self.vectorized(""), expected)
+
+    def test_window_and_bbox(self) -> None:
+        bbox = (34.3, 31.3, 34.5, 31.5)
+        self.assertEqual(self.vectorized("&window_minutes=60&bbox=34.3,31.3,34.5,31.5"), self.per_sequence(60, bbox))
+
+    def test_invalid_window_is_rejected(self) -> None:
+        for value in ("0", "-60", "abc", ""):
+            for path in ("/predict", "/predict/fused", "/tiles/8/152/105", "/changes", "/changes/stream"):
+                with self.subTest(path=path, window_minutes=value):
+                    resp = self.client.get(f"{path}?window_minutes={value}")
+                    self.assertEqual(resp.status_code, 400)
+                    self.assertIn("window_minutes", json.loads(resp.data)["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
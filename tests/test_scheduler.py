@@ -0,0 +1,135 @@
+"""FetchScheduler retries against a local stand-in for the FIRMS area API."""
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+import random
+import socket
+import threading
+import unittest
+
+from src.pipeline.scheduler import FetchJob, FetchScheduler
+
+
+BODY = "latitude,longitude,acq_date,acq_time\n31.5,34.4,2025-07-01,1023\n"
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers each path with the next step of its script: an HTTP status, "truncated" or "ok"."""
+
+    protocol_version = "HTTP/1.1"
+    scripts: Dict[str, List[str]] = {}
+    hits: Dict[str, int] = {}
+
+    def do_GET(self) -> None:
+        product = self.path.split("/")[2]
+        n = self.hits.get(product, 0)
+        self.hits[product] = n + 1
+        script = self.scripts[product]
+        step = script[min(n, len(script) - 1)]
+        body = BODY.encode()
+        if step == "ok":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif step == "truncated":
+            # A chunked body that stops mid-chunk, as when the upstream connection drops
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.wfile.write(b"%x\r\n" % (len(body) * 4) + body)
+            self.wfile.flush()
+            self.close_connection = True
+        else:
+            self.send_response(int(step))
+            if step == "429":
+                self.send_header("Retry-After", "2")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def job(product: str) -> FetchJob:
+    return FetchJob(name=product, model="viirs", product=product, bbox="34.2,31.2,34.65,31.6", day_range=1)
+
+
+class FetchSchedulerRetryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        StandIn.scripts = {}
+        StandIn.hits = {}
+        self.sleeps: List[float] = []
+
+    def scheduler(self, base=None, handler=None, retries: int = 3) -> FetchScheduler:
+        return FetchScheduler(
+            base or self.base, "KEY", handler=handler or (lambda j, text: f"{len(text.splitlines()) - 1} rows"),
+            max_workers=4, timeout=30, connect_timeout=2, retries=retries,
+            backoff_base=0.5, backoff_cap=4, sleep=self.sleeps.append, rng=random.Random(0),
+        )
+
+    def test_retryable_failures_then_success(self) -> None:
+        StandIn.scripts = {"A": ["503", "502", "ok"], "B": ["truncated", "ok"], "C": ["429", "ok"]}
+        sched = self.scheduler()
+        results = sched.run([job("A"), job("B"), job("C")])
+        self.assertEqual([r.ok for r in results], [True, True, True])
+        self.assertEqual([r.attempts for r in results], [3, 2, 2])
+        self.assertEqual({r.summary for r in results}, {"1 rows"})
+        self.assertEqual(len(self.sleeps), 4)
+        self.assertIn(2.0, self.sleeps)  # Retry-After raises the backoff delay
+        status = sched.job_status()
+        self.assertEqual({name: (s["status"], s["stale"]) for name, s in status.items()},
+                         {name: ("success", False) for name in "ABC"})
+
+    def test_truncated_body_error(self) -> None:
+        StandIn.scripts = {"A": ["truncated"]}
+        (result,) = self.scheduler(retries=1).run([job("A")])
+        self.assertEqual(result.attempts, 2)
+        self.assertTrue(result.error.startswith("ChunkedEncodingError"), result.error)
+
+    def test_gives_up_after_retries(self) -> None:
+        StandIn.scripts = {"A": ["500"]}
+        sched = self.scheduler(retries=2)
+        (result,) = sched.run([job("A")])
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 3)
+        self.assertEqual(StandIn.hits["A"], 3)
+        self.assertEqual(result.error, "HTTP 500")
+        self.assertEqual(sched.job_status()["A"]["consecutive_failures"], 1)
+
+    def test_client_errors_and_handler_failures_are_not_retried(self) -> None:
+        StandIn.scripts = {"A": ["404"], "B": ["ok"]}
+
+        def handler(j: FetchJob, text: str) -> str:
+            raise ValueError("bad CSV")
+
+        results = self.scheduler().run([job("A")]) + self.scheduler(handler=handler).run([job("B")])
+        self.assertEqual([(r.ok, r.attempts) for r in results], [(False, 1), (False, 1)])
+        self.assertIn("404", results[0].error)
+        self.assertEqual(results[1].error, "ValueError: bad CSV")
+
+    def test_connection_refused_is_retried(self) -> None:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]  # closed once the block exits: nothing listens there
+        (result,) = self.scheduler(base=f"http://127.0.0.1:{port}", retries=1).run([job("A")])
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 2)
+        self.assertTrue(result.error.startswith("ConnectionError"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""EventTracker fed in time-ordered batches against batch ``cluster_events`` + ``aggregate_event_features``."""
+from __future__ import annotations
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_frame
+from src.pipeline.events import aggregate_event_features, cluster_events
+from src.pipeline.tracker import EventTracker
+
+
+FLOAT_COLUMNS = ["lat_mean", "lon_mean", "max_frp", "mean_frp", "std_frp", "duration_hours"]
+
+
+class EventTrackerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        df = generate_frame(4000, "viirs", seed=4, days=6)
+        df["timestamp"] = pd.to_datetime(df["acq_date"] + " " + df["acq_time"].astype(str).str.zfill(4))
+        df.loc[df.sample(100, random_state=1).index, "frp"] = np.nan
+        cls.df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+    def chunks(self, n: int):
+        bounds = np.linspace(0, len(self.df), n + 1).astype(int)
+        return [self.df.iloc[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def track(self, batches):
+        tracker = EventTracker()  # same eps and min_samples=2 defaults as cluster_events
+        ids = [tracker.update(batch) for batch in batches]
+        return tracker, pd.concat(ids)
+
+    def batch_events(self) -> pd.DataFrame:
+        labels = cluster_events(self.df)
+        return aggregate_event_features(self.df, labels)
+
+    def assert_same_events(self, tracked: pd.DataFrame, batch: pd.DataFrame) -> None:
+        key = ["start_time", "count", "lat_mean"]
+        tracked = tracked.sort_values(key).reset_index(drop=True)
+        batch = batch.sort_values(key).reset_index(drop=True)
+        self.assertEqual(len(tracked), len(batch))
+        self.assertEqual(tracked["count"].tolist(), batch["count"].tolist())
+        self.assertTrue((tracked["start_time"] == batch["start_time"]).all())
+        self.assertTrue((tracked["end_time"] == batch["end_time"]).all())
+        for col in FLOAT_COLUMNS:
+            np.testing.assert_allclose(tracked[col].to_numpy(float), batch[col].to_numpy(float), rtol=1e-9, atol=1e-9, err_msg=col)
+
+    def test_pass_by_pass_matches_batch(self) -> None:
+        # One update per overpass (detections sharing a timestamp), as the fetcher would deliver them
+        tracker, _ = self.track([g for _, g in self.df.groupby("timestamp", sort=True)])
+        self.assert_same_events(tracker.to_frame(), self.batch_events())
+
+    def test_large_batches_match_batch(self) -> None:
+        tracker, _ = self.track(self.chunks(7))
+        self.assert_same_events(tracker.to_frame(), self.batch_events())
+
+    def test_assigned_ids_agree_with_batch_labels(self) -> None:
+        tracker, ids = self.track(self.chunks(20))
+        labels = cluster_events(self.df)
+        assigned = ids[ids >= 0]
+        resolved = assigned.map(tracker.resolve)
+        pairs = pd.DataFrame({"tracked": resolved, "batch": labels[assigned.index]}).drop_duplicates()
+        self.assertTrue((pairs["batch"] >= 0).all())
+        self.assertFalse(pairs["tracked"].duplicated().any())  # one batch event per tracked event
+        self.assertFalse(pairs["batch"].duplicated().any())  # and vice versa
+
+    def test_quiet_events_close_and_drain(self) -> None:
+        tracker, _ = self.track([g for _, g in self.df.groupby("timestamp", sort=True)])
+        open_ids = set(tracker.open)
+        closed = tracker.drain_closed()
+        self.assertTrue(closed)
+        horizon = tracker.watermark - pd.Timedelta(minutes=tracker.temporal_eps_minutes)
+        self.assertTrue(all(e.end_time < horizon for e in closed))
+        self.assertEqual(tracker.drain_closed(), [])
+        self.assertEqual(set(tracker.to_frame()["event_id"]), open_ids)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,11 @@
+"""WSGI entry point for multi-process serving: ``gunicorn -c gunicorn.conf.py wsgi:app``."""
+import gc
+
+from app import app
+
+# Imported once in the gunicorn master (preload_app). Importing loads no data or model, so workers
+# start serving /health at once; gunicorn.conf.py warms up the master in the background and then
+# re-forks the workers so they share what it loaded.
+# Move the imported objects out of the cyclic GC's reach so collections in workers don't write to
+# (and so un-share) the pages holding them
+gc.freeze()